@@ -0,0 +1,71 @@
+import argparse
+import json
+import logging
+import sys
+import timeit
+from typing import Any, Callable, Dict, List
+
+from generic_api.json_codec import json_codecs, JSONCodec
+
+
+def make_payloads() -> Dict[str, Any]:
+    "builds representative request & response bodies: a small object, and a large list of records"
+    return {
+        "small": {"id": 42, "name": "widget", "active": True, "price": 9.99, "tags": ["a", "b"], "owner": {"id": 7, "email": "user@example.com"}},
+        "large": {
+            "count": 10000,
+            "items": [
+                {"id": i, "name": f"item-{i}", "price": i * 0.25, "active": i % 2 == 0, "tags": ["red", "green", "blue"], "meta": {"created": "2020-01-01T00:00:00Z", "rank": i % 97}}
+                for i in range(10000)
+            ],
+        },
+    }
+
+
+def time_call(func: Callable[[], Any], repeat: int) -> float:
+    "returns the best time in seconds of a single call out of 'repeat' runs"
+    number = max(1, int(0.2 / max(timeit.timeit(func, number=1), 1e-9)))
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def bench_codec(codec: JSONCodec, data: Any, raw: bytes, repeat: int) -> Dict[str, float]:
+    "times encoding the data and decoding its raw body with the codec"
+    return {
+        "dumps": time_call(lambda: codec.dumps(data), repeat),
+        "loads": time_call(lambda: codec.loads(raw), repeat),
+    }
+
+
+def bench_stdlib_text(data: Any, raw: bytes, repeat: int) -> Dict[str, float]:
+    "times the previous behaviour: encoding to text then bytes, and decoding the body to text before parsing it"
+    return {
+        "dumps": time_call(lambda: json.dumps(data).encode("utf-8"), repeat),
+        "loads": time_call(lambda: json.loads(raw.decode("utf-8")), repeat),
+    }
+
+
+def parse_args(args: List[str]) -> argparse.Namespace:
+    "parses the cmd-args"
+    parser = argparse.ArgumentParser(description="Compares the installed JSON codecs on representative payloads")
+    parser.add_argument("--repeat", type=int, default=5, help="the number of timed runs, the best is reported")
+    return parser.parse_args(args)
+
+
+# time every installed codec against the standard library decoding text, as the runner did before codecs
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    settings = parse_args(sys.argv[1:])
+
+    for payload_name, payload in make_payloads().items():
+        raw_body = json.dumps(payload).encode("utf-8")
+        baseline = bench_stdlib_text(payload, raw_body, settings.repeat)
+        logging.info(f"{payload_name} payload, {len(raw_body)} bytes")
+        logging.info(f"  {'json (text)':<12} dumps {baseline['dumps'] * 1e6:10.1f}us  loads {baseline['loads'] * 1e6:10.1f}us")
+
+        for name in json_codecs.names():
+            result = bench_codec(json_codecs.get(name), payload, raw_body, settings.repeat)
+            logging.info(
+                f"  {name:<12} dumps {result['dumps'] * 1e6:10.1f}us ({baseline['dumps'] / result['dumps']:4.1f}x)"
+                f"  loads {result['loads'] * 1e6:10.1f}us ({baseline['loads'] / result['loads']:4.1f}x)"
+            )
@@ -0,0 +1,248 @@
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Tuple
+
+from behave.model import Table
+
+from benchmarks.stub_server import StubServer
+from generic_api.factory import request_factory
+from generic_api.request_timing import RequestTimings
+from features.steps.genericapi_processor import make_template_request, validate_body_contains
+from features.steps.request_template import RequestTemplate
+
+DEFAULT_BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# a stage regresses if its allocations grow by more than this fraction of the baseline, and is warned about if its
+# ops/sec drop by more than it, as throughput depends on whatever else the machine is doing
+DEFAULT_TOLERANCE = 0.25
+# allocations may also grow by this many bytes, so stages allocating little or nothing do not fail on any change
+DEFAULT_ALLOC_SLACK = 256
+DEFAULT_MIN_TIME = 1.0
+# each stage is timed this many times, the best is kept as the others are slowed by whatever else the machine is doing
+DEFAULT_ROUNDS = 5
+DEFAULT_ALLOC_OPS = 50
+
+RAW_TEMPLATE = json.dumps({
+    "method": "POST",
+    "headers": {"Accept": "application/json"},
+    "query_params": {"verbose": "true"},
+    "body": {
+        "id": "{{ID}}",
+        "name": "{{NAME}}",
+        "greeting": "Hello {{ NAME }}, you are user {{ ID }}",
+        "tags": ["a", "b", "{{TAG}}"],
+        "static": {"nested": [1, 2, 3], "flag": True},
+    },
+})
+BODY_VALUES = {"ID": "42", "NAME": "widget", "TAG": "c"}
+RESPONSE_BODY = json.dumps({
+    "id": 42,
+    "name": "widget",
+    "owner": {"id": 7, "email": "user@example.com"},
+    "items": [{"id": i, "name": f"item-{i}", "price": i * 0.25} for i in range(50)],
+}).encode("utf-8")
+CHECKED_PATHS = [("id", "42"), ("name", "widget"), ("owner.email", "user@example.com"), ("items.10.name", "item-10"), ("items.49.id", "49")]
+
+
+def _make_context(url: str) -> SimpleNamespace:
+    "builds the parts of a behave context the request & body assertion steps use"
+    return SimpleNamespace(
+        templates={"bench": RequestTemplate(RAW_TEMPLATE)},
+        table=None,
+        config=SimpleNamespace(userdata={}),
+        url=url + "/items",
+    )
+
+
+def _body_table() -> Table:
+    "the table of a 'response body contains' step checking CHECKED_PATHS"
+    return Table(["label", "values"], rows=[list(row) for row in CHECKED_PATHS])
+
+
+def build_stages(url: str) -> Dict[str, Callable[[], Any]]:
+    "returns a callable per stage of the step pipeline, each running only its own stage on pre-built inputs"
+    runner = request_factory("http", "", "", "")
+    template = RequestTemplate(RAW_TEMPLATE)
+    body = template.render_body(BODY_VALUES)
+    decoded_body = runner._decode_response_body("application/json", RESPONSE_BODY)
+    body_table = _body_table()
+    endpoint = url + "/items"
+
+    def send() -> Any:
+        return runner.run_request(template.method, endpoint, template.content_type, body, template.query_params, template.render_headers(), False,
+                                  timings=RequestTimings(), lazy_decode=True)
+
+    def check() -> None:
+        validate_body_contains(SimpleNamespace(response_body=decoded_body, table=body_table), "json")
+
+    request_table = Table(["label", "values"], rows=[[key, value] for key, value in BODY_VALUES.items()])
+    context = _make_context(url)
+
+    def end_to_end() -> None:
+        context.table = request_table
+        make_template_request(context, "unauthenticated", "http", "bench", context.url)
+        context.table = body_table
+        validate_body_contains(context, "json")
+
+    return {
+        "template_parse": lambda: RequestTemplate(RAW_TEMPLATE),
+        "render": lambda: template.render_body(BODY_VALUES),
+        "factory": lambda: request_factory("http", "", "", ""),
+        "encode": lambda: runner._encode_request_body(template.content_type, body),
+        "send": send,
+        "decode": lambda: runner._decode_response_body("application/json", RESPONSE_BODY),
+        "dot_path_checks": check,
+        "end_to_end": end_to_end,
+    }
+
+
+def measure_stage(func: Callable[[], Any], min_time: float, alloc_ops: int, rounds: int = DEFAULT_ROUNDS) -> Dict[str, float]:
+    """
+    returns the best ops/sec of the stage out of 'rounds' runs lasting 'min_time' seconds in total, and the median peak
+        bytes allocated by one op. Allocations are traced in a separate run, as tracing slows every allocation down
+    """
+    func()
+    best = 0.0
+
+    for _ in range(rounds):
+        count = 0
+        batch = 1
+        start = time.perf_counter()
+
+        while True:
+            for _ in range(batch):
+                func()
+
+            count += batch
+            elapsed = time.perf_counter() - start
+
+            if elapsed >= min_time / rounds:
+                break
+
+            batch = min(batch * 2, 10000)
+
+        best = max(best, count / elapsed)
+
+    peaks: List[int] = []
+    tracemalloc.start()
+
+    try:
+        for _ in range(alloc_ops):
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            func()
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+
+    return {"ops_per_sec": round(best, 1), "alloc_bytes": float(statistics.median(peaks))}
+
+
+def compare_to_baseline(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float,
+                        alloc_slack: float = DEFAULT_ALLOC_SLACK) -> Tuple[List[str], List[str]]:
+    """
+    Returns a regression for every stage allocating more than its baseline by more than the tolerance (or the slack,
+        whichever is larger), and a warning for every stage slower than its baseline by more than the tolerance
+    """
+    regressions = []
+    warnings = []
+
+    for stage, result in results.items():
+        if stage not in baseline:
+            continue
+
+        expected = baseline[stage]
+
+        if result["ops_per_sec"] < expected["ops_per_sec"] * (1 - tolerance):
+            warnings.append(f"{stage}: {result['ops_per_sec']:.1f} ops/sec Is Below The Baseline {expected['ops_per_sec']:.1f}")
+
+        if result["alloc_bytes"] > max(expected["alloc_bytes"] * (1 + tolerance), expected["alloc_bytes"] + alloc_slack):
+            regressions.append(f"{stage}: {result['alloc_bytes']:.0f} Bytes Allocated Is Above The Baseline {expected['alloc_bytes']:.0f}")
+
+    return regressions, warnings
+
+
+def load_baseline(filepath: str) -> Dict[str, Dict[str, float]]:
+    "loads the stored results of each stage, or an empty baseline if none is stored"
+    if not os.path.isfile(filepath):
+        return {}
+
+    try:
+        with open(filepath, "r") as fhandle:
+            return json.load(fhandle)
+    except Exception as ex:
+        raise RuntimeError(f"Ex Reading Baseline {filepath}: {str(ex)}")
+
+
+def save_baseline(filepath: str, results: Dict[str, Dict[str, float]]) -> None:
+    "stores the results as the baseline later runs are compared against"
+    try:
+        with open(filepath, "w") as fhandle:
+            json.dump(results, fhandle, indent=4, sort_keys=True)
+            fhandle.write("\n")
+    except Exception as ex:
+        raise RuntimeError(f"Ex Writing Baseline {filepath}: {str(ex)}")
+
+
+def parse_args(args: List[str]) -> argparse.Namespace:
+    "parses the cmd-args"
+    parser = argparse.ArgumentParser(description="Measures the overhead each stage of the request step pipeline adds on top of network time")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_FILE, help="the file the baseline results are stored in")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline instead of comparing against it")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="the fraction a stage may regress by before failing or warning")
+    parser.add_argument("--alloc-slack", type=float, default=DEFAULT_ALLOC_SLACK, help="the bytes a stage's allocations may grow by before failing")
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME, help="the minimum seconds each stage is timed for")
+    parser.add_argument("--alloc-ops", type=int, default=DEFAULT_ALLOC_OPS, help="the number of ops each stage's allocations are traced over")
+    parser.add_argument("--stage", action="append", default=[], help="only run the named stage, may be given more than once")
+    return parser.parse_args(args)
+
+
+# run every stage against a stub server in this process, so only the framework's own overhead is measured
+# compare each stage with the stored baseline, failing if any allocates more and warning if any is slower
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    settings = parse_args(sys.argv[1:])
+    results: Dict[str, Dict[str, float]] = {}
+
+    with StubServer(RESPONSE_BODY) as server:
+        stages = build_stages(server.url)
+
+        for name in settings.stage:
+            if name not in stages:
+                logging.error(f"Unknown Stage {name}; Available: {', '.join(stages)}")
+                sys.exit(2)
+
+        for name, func in stages.items():
+            if len(settings.stage) and name not in settings.stage:
+                continue
+
+            results[name] = measure_stage(func, settings.min_time, settings.alloc_ops)
+            logging.info(f"{name:<16} {results[name]['ops_per_sec']:>12,.1f} ops/sec {results[name]['alloc_bytes']:>10,.0f} bytes/op")
+
+    if settings.save_baseline:
+        save_baseline(settings.baseline, {**load_baseline(settings.baseline), **results})
+        logging.info(f"Baseline Saved To {settings.baseline}")
+        sys.exit(0)
+
+    baseline = load_baseline(settings.baseline)
+
+    if not len(baseline):
+        logging.warning(f"No Baseline Found At {settings.baseline}, Run With --save-baseline To Store One")
+        sys.exit(0)
+
+    regressions, warnings = compare_to_baseline(results, baseline, settings.tolerance, settings.alloc_slack)
+
+    for warning in warnings:
+        logging.warning(warning)
+
+    for regression in regressions:
+        logging.error(regression)
+
+    sys.exit(1 if len(regressions) else 0)
@@ -0,0 +1,51 @@
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Type
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    "answers every request with the server's fixed JSON body, keeping the connection alive"
+    protocol_version = "HTTP/1.1"
+    # the headers & body are written separately, with Nagle's algorithm on every response would wait on a delayed ACK
+    disable_nagle_algorithm = True
+
+    def _respond(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+
+        if length:
+            self.rfile.read(length)
+
+        body: bytes = self.server.response_body  # type: ignore
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class StubServer():
+    "a local HTTP server run on a background thread of this process, so benchmarks measure no real network time"
+
+    def __init__(self, response_body: bytes, handler: Type[BaseHTTPRequestHandler] = StubHandler):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.response_body = response_body  # type: ignore
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        "the base URL of the server"
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._server.shutdown()
+        self._server.server_close()
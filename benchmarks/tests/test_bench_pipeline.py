@@ -0,0 +1,97 @@
+import os
+import tempfile
+from unittest import main, TestCase
+
+from benchmarks.bench_pipeline import build_stages, measure_stage, compare_to_baseline, load_baseline, save_baseline, RESPONSE_BODY
+from benchmarks.stub_server import StubServer
+
+
+class TestBuildStages(TestCase):
+    "test class for the method 'build_stages'"
+
+    def test_valid_1(self):
+        "every stage runs against the stub server"
+        with StubServer(RESPONSE_BODY) as server:
+            stages = build_stages(server.url)
+
+            self.assertEqual(list(stages), ["template_parse", "render", "factory", "encode", "send", "decode", "dot_path_checks", "end_to_end"])
+
+            for func in stages.values():
+                func()
+
+            _, _, status_code = stages["send"]()
+            self.assertEqual(status_code, 200)
+
+
+class TestMeasureStage(TestCase):
+    "test class for the method 'measure_stage'"
+
+    def test_valid_1(self):
+        "the ops/sec & allocations of the stage are measured"
+        result = measure_stage(lambda: [0] * 10000, 0.05, 5)
+
+        self.assertGreater(result["ops_per_sec"], 0)
+        self.assertGreaterEqual(result["alloc_bytes"], 10000 * 8)
+
+
+class TestCompareToBaseline(TestCase):
+    "test class for the method 'compare_to_baseline'"
+
+    baseline = {"render": {"ops_per_sec": 1000.0, "alloc_bytes": 100.0}}
+
+    def test_valid_1(self):
+        "results within the tolerance, or without a baseline, are not regressions"
+        results = {
+            "render": {"ops_per_sec": 800.0, "alloc_bytes": 120.0},
+            "decode": {"ops_per_sec": 1.0, "alloc_bytes": 1e9},
+        }
+
+        self.assertEqual(compare_to_baseline(results, self.baseline, 0.25), ([], []))
+
+    def test_valid_2(self):
+        "stages allocating more are regressions, slower stages are only warned about"
+        results = {"render": {"ops_per_sec": 700.0, "alloc_bytes": 130.0}}
+
+        regressions, warnings = compare_to_baseline(results, self.baseline, 0.25, alloc_slack=0)
+
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("Bytes Allocated", regressions[0])
+        self.assertEqual(len(warnings), 1)
+        self.assertIn("ops/sec", warnings[0])
+
+    def test_valid_3(self):
+        "stages allocating little or nothing may grow by the slack before they regress"
+        baseline = {"factory": {"ops_per_sec": 1000.0, "alloc_bytes": 0.0}}
+
+        self.assertEqual(compare_to_baseline({"factory": {"ops_per_sec": 1000.0, "alloc_bytes": 53.0}}, baseline, 0.25), ([], []))
+
+        regressions, warnings = compare_to_baseline({"factory": {"ops_per_sec": 1000.0, "alloc_bytes": 300.0}}, baseline, 0.25)
+        self.assertEqual(len(regressions), 1)
+
+
+class TestBaselineFile(TestCase):
+    "test class for the methods 'load_baseline' and 'save_baseline'"
+
+    def test_valid_1(self):
+        "a saved baseline is loaded back, a missing one is empty"
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filepath = os.path.join(tmp_dir, "baseline.json")
+            self.assertEqual(load_baseline(filepath), {})
+
+            save_baseline(filepath, {"render": {"ops_per_sec": 1.0, "alloc_bytes": 2.0}})
+            self.assertEqual(load_baseline(filepath), {"render": {"ops_per_sec": 1.0, "alloc_bytes": 2.0}})
+
+    def test_invalid_1(self):
+        "the baseline file is not valid JSON"
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filepath = os.path.join(tmp_dir, "baseline.json")
+
+            with open(filepath, "w") as fhandle:
+                fhandle.write("not json")
+
+            with self.assertRaises(RuntimeError):
+                load_baseline(filepath)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import argparse
+import heapq
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+from xml.etree import ElementTree
+
+from behave.parser import parse_file
+
+SERIAL_TAG = "serial"
+DEFAULT_HISTORY_FILE = ".behave_durations.json"
+DEFAULT_JUNIT_DIR = "reports"
+MERGED_REPORT_NAME = "TESTS-all.xml"
+
+# the estimated duration of a feature file that has never been run, if there is no history at all
+DEFAULT_DURATION = 1.0
+
+
+def get_feature_files(features_dir: str) -> List[str]:
+    "lists every '.feature' file under the given directory, sorted so runs are repeatable"
+    result = []
+
+    for root, _, filenames in os.walk(features_dir):
+        for filename in filenames:
+            if filename.endswith(".feature"):
+                result.append(os.path.join(root, filename))
+
+    return sorted(result)
+
+
+def get_serial_isolation(filepath: str) -> Tuple[bool, bool]:
+    """
+    returns whether every scenario of the feature file is tagged '@serial' (the feature itself is tagged), and whether
+        any of its scenarios are
+    """
+    try:
+        feature = parse_file(filepath)
+    except Exception as ex:
+        raise RuntimeError(f"Ex Parsing Feature File {filepath}: {str(ex)}")
+
+    if feature is None:
+        return False, False
+
+    if SERIAL_TAG in feature.tags:
+        return True, True
+
+    return False, any(SERIAL_TAG in scenario.effective_tags for scenario in feature.walk_scenarios())
+
+
+def get_report_name(filepath: str, features_dir: str) -> str:
+    "returns the name behave gives the JUnit report of a feature file, e.g. 'features/api/users.feature' is 'api.users'"
+    filename = os.path.relpath(filepath, features_dir).rsplit(".", 1)[0]
+    return filename.replace("\\", "/").replace("/", ".")
+
+
+def load_history(history_filepath: str) -> Dict[str, float]:
+    "loads the duration in seconds each feature file took last time it was run, keyed by its report name"
+    if not os.path.isfile(history_filepath):
+        return {}
+
+    try:
+        with open(history_filepath, "r") as fhandle:
+            return {str(name): float(duration) for name, duration in json.load(fhandle).items()}
+    except Exception as ex:
+        logging.warning(f"Ignoring Invalid Duration History {history_filepath}: {str(ex)}")
+        return {}
+
+
+def save_history(history_filepath: str, history: Dict[str, float]) -> None:
+    "writes the duration history so the next run can balance the workers with it"
+    try:
+        with open(history_filepath, "w") as fhandle:
+            json.dump(history, fhandle, indent=4, sort_keys=True)
+    except Exception as ex:
+        raise RuntimeError(f"Ex Writing Duration History To {history_filepath}: {str(ex)}")
+
+
+def balance_files(filepaths: List[str], durations: Dict[str, float], worker_count: int) -> List[List[str]]:
+    """
+    splits the feature files between the workers so each is expected to take about as long as the others, by giving
+        the longest remaining file to the worker with the least work so far. Empty workers are dropped
+    """
+    if worker_count <= 0:
+        raise ValueError(f"Invalid Worker Count: {worker_count}")
+
+    workers: List[Tuple[float, int]] = [(0.0, i) for i in range(worker_count)]
+    result: List[List[str]] = [[] for _ in range(worker_count)]
+
+    for filepath in sorted(filepaths, key=lambda path: durations[path], reverse=True):
+        load, index = heapq.heappop(workers)
+        result[index].append(filepath)
+        heapq.heappush(workers, (load + durations[filepath], index))
+
+    return [files for files in result if len(files)]
+
+
+def start_worker(filepaths: List[str], behave_args: List[str], tag_expression: str, junit_dir: str) -> subprocess.Popen:
+    "starts a behave process running the given feature files, writing its JUnit reports to 'junit_dir'"
+    cmd = [sys.executable, "-m", "behave", *behave_args, f"--tags={tag_expression}", "--junit", f"--junit-directory={junit_dir}", *filepaths]
+    logging.info(f"Starting Worker: {' '.join(cmd)}")
+    return subprocess.Popen(cmd)
+
+
+def read_report_suites(junit_dir: str) -> Dict[str, ElementTree.Element]:
+    "reads the testsuite of every JUnit report in the directory, keyed by the report name"
+    result: Dict[str, ElementTree.Element] = {}
+
+    if not os.path.isdir(junit_dir):
+        return result
+
+    for filename in sorted(os.listdir(junit_dir)):
+        if filename.startswith("TESTS-") and filename.endswith(".xml"):
+            try:
+                result[filename[len("TESTS-"):-len(".xml")]] = ElementTree.parse(os.path.join(junit_dir, filename)).getroot()
+            except Exception as ex:
+                raise RuntimeError(f"Ex Reading JUnit Report {filename}: {str(ex)}")
+
+    return result
+
+
+def merge_suites(suites: List[ElementTree.Element]) -> ElementTree.Element:
+    """
+    merges the testsuites of the same feature file run by several workers, adding up their counts and times. Each
+        worker reports the scenarios its tags excluded as skipped, so those are dropped if another worker ran them
+    """
+    merged = ElementTree.Element("testsuite", dict(suites[0].attrib))
+    ran = {(case.get("classname"), case.get("name")) for suite in suites for case in suite.iter("testcase") if case.get("status") != "skipped"}
+    dropped = 0
+
+    for suite in suites:
+        for child in suite:
+            if child.tag == "testcase" and child.get("status") == "skipped" and (child.get("classname"), child.get("name")) in ran:
+                dropped += 1
+            else:
+                merged.append(child)
+
+    for attr in ("tests", "errors", "failures", "skipped"):
+        merged.set(attr, str(sum(int(suite.get(attr, "0")) for suite in suites) - (dropped if attr in ("tests", "skipped") else 0)))
+
+    merged.set("time", str(round(sum(float(suite.get("time", "0")) for suite in suites), 6)))
+    return merged
+
+
+def write_merged_report(report_suites: Dict[str, List[ElementTree.Element]], output_filepath: str) -> None:
+    "writes every testsuite into a single JUnit report"
+    root = ElementTree.Element("testsuites")
+
+    for name in sorted(report_suites):
+        root.append(merge_suites(report_suites[name]))
+
+    for attr in ("tests", "errors", "failures", "skipped"):
+        root.set(attr, str(sum(int(suite.get(attr, "0")) for suite in root)))
+
+    root.set("time", str(round(sum(float(suite.get("time", "0")) for suite in root), 6)))
+
+    try:
+        os.makedirs(os.path.dirname(output_filepath) or ".", exist_ok=True)
+        ElementTree.ElementTree(root).write(output_filepath, encoding="UTF-8", xml_declaration=True)
+    except Exception as ex:
+        raise RuntimeError(f"Ex Writing Merged JUnit Report To {output_filepath}: {str(ex)}")
+
+
+def run_phase(worker_files: List[List[str]], behave_args: List[str], tag_expression: str, work_dir: str, phase: str) -> Tuple[bool, List[str]]:
+    "runs every worker at once and waits for them, returns whether they all passed & their JUnit report directories"
+    junit_dirs = [os.path.join(work_dir, f"{phase}-{i}") for i in range(len(worker_files))]
+    workers = [start_worker(files, behave_args, tag_expression, junit_dir) for files, junit_dir in zip(worker_files, junit_dirs)]
+    success = True
+
+    for worker in workers:
+        if worker.wait() != 0:
+            success = False
+
+    return success, junit_dirs
+
+
+def parse_args(args: List[str]) -> argparse.Namespace:
+    "parses the cmd-args, everything after '--' is passed on to behave"
+    parser = argparse.ArgumentParser(description="Runs the behave feature files across parallel worker processes")
+    parser.add_argument("--features-dir", default="features", help="the directory of the generated feature files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="the number of behave processes to run at once")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_FILE, help="the file the duration of each feature file is kept in")
+    parser.add_argument("--junit-directory", default=DEFAULT_JUNIT_DIR, help="the directory the merged JUnit report is written to")
+    parser.add_argument("behave_args", nargs=argparse.REMAINDER, help="args passed on to each behave process, after '--'")
+
+    result = parser.parse_args(args)
+
+    if len(result.behave_args) and result.behave_args[0] == "--":
+        result.behave_args = result.behave_args[1:]
+
+    if result.workers <= 0:
+        parser.error(f"Invalid Worker Count: {result.workers}")
+
+    return result
+
+
+# split the generated feature files between the workers, balanced by how long each took last run
+# run the '@serial' scenarios one after another once the parallel workers finish
+# merge the JUnit reports of every worker into one, recording the durations for the next run
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logging.info("Beginning Script")
+
+    settings = parse_args(sys.argv[1:])
+    feature_files = get_feature_files(settings.features_dir)
+
+    if not len(feature_files):
+        logging.error(f"No '.feature' Files Found In {settings.features_dir}")
+        sys.exit(1)
+
+    history = load_history(settings.history)
+    report_names = {filepath: get_report_name(filepath, settings.features_dir) for filepath in feature_files}
+    known_durations = [history[name] for name in report_names.values() if name in history]
+    default_duration = sum(known_durations) / len(known_durations) if len(known_durations) else DEFAULT_DURATION
+    durations = {filepath: history.get(name, default_duration) for filepath, name in report_names.items()}
+
+    parallel_files = []
+    serial_files = []
+
+    for filepath in feature_files:
+        all_serial, any_serial = get_serial_isolation(filepath)
+
+        if not all_serial:
+            parallel_files.append(filepath)
+        if any_serial:
+            serial_files.append(filepath)
+
+    work_dir = tempfile.mkdtemp(prefix="parallel-behave-")
+    junit_dirs: List[str] = []
+    success = True
+    start = time.monotonic()
+
+    try:
+        if len(parallel_files):
+            worker_files = balance_files(parallel_files, durations, settings.workers)
+            logging.info(f"Running {len(parallel_files)} Feature Files Across {len(worker_files)} Workers")
+            phase_success, phase_dirs = run_phase(worker_files, settings.behave_args, f"~@{SERIAL_TAG}", work_dir, "parallel")
+            success = success and phase_success
+            junit_dirs.extend(phase_dirs)
+
+        if len(serial_files):
+            logging.info(f"Running The @{SERIAL_TAG} Scenarios Of {len(serial_files)} Feature Files Serially")
+            phase_success, phase_dirs = run_phase([serial_files], settings.behave_args, f"@{SERIAL_TAG}", work_dir, "serial")
+            success = success and phase_success
+            junit_dirs.extend(phase_dirs)
+
+        report_suites: Dict[str, List[ElementTree.Element]] = {}
+
+        for junit_dir in junit_dirs:
+            for name, suite in read_report_suites(junit_dir).items():
+                report_suites.setdefault(name, []).append(suite)
+
+        if len(report_suites):
+            write_merged_report(report_suites, os.path.join(settings.junit_directory, MERGED_REPORT_NAME))
+
+            for name, suites in report_suites.items():
+                history[name] = round(sum(float(suite.get("time", "0")) for suite in suites), 6)
+
+            save_history(settings.history, history)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    logging.info(f"Script Complete In {time.monotonic() - start:.1f}s")
+    sys.exit(0 if success else 1)
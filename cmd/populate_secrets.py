@@ -1,14 +1,21 @@
 import os
+import re
 import sys
+import json
+import time
+import hashlib
 import logging
-from typing import List, Dict
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_EXCEPTION, wait
+from typing import List, Dict, Optional, Tuple
 
-from jinja2 import Template
+from jinja2 import Environment, Template
+from jinja2.defaults import DEFAULT_NAMESPACE
 
 
-def populate_template(template: str, input_values: dict) -> str:
-    "populate template renders a given Jinja2 template string with the given input_values"
-    template_obj = Template(template)
+def populate_template(template: str, input_values: dict, env: Optional[Environment] = None) -> str:
+    "populate template renders a given Jinja2 template string with the given input_values, in 'env' if given"
+    template_obj = Template(template) if env is None else env.from_string(template)
     return template_obj.render(input_values)
 
 
@@ -23,6 +30,30 @@ def get_all_files_in_dir(dir_path: str) -> List[str]:
         raise RuntimeError(f"Ex Listing Dir {dir_path}: {str(ex)}")
 
 
+# a '{{ SECRET }}' or a '[[ parameter ]]', both found in a single scan of a feature file
+_TOKEN = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}|\[\[(.*?)\]\]", re.DOTALL)
+# Jinja2 drops a single newline from the end of the template
+_TRAILING_NEWLINE = re.compile(r"\n\Z")
+# text the single scan cannot render exactly as Jinja2 & 'populate_jinja_template_tags' would
+_FULL_RENDER_SYNTAX = ("{{", "{%", "{#", "[[", "]]")
+# names Jinja2 parses as constants, an operator or the template itself, rather than looking up a value
+_JINJA_RESERVED_NAMES = frozenset(("true", "false", "none", "True", "False", "None", "not", "self"))
+
+# written into the output dir, records the inputs each generated file was rendered from
+MANIFEST_FILENAME = ".populate_secrets_manifest.json"
+INCREMENTAL_FLAG = "--incremental"
+JOBS_FLAG = "--jobs"
+
+
+def read_file_content(filepath: str) -> str:
+    "loads the raw content of the file"
+    try:
+        with open(filepath, 'r') as fhandle:
+            return fhandle.read()
+    except Exception as ex:
+        raise RuntimeError(f"Ex Reading File {filepath}: {str(ex)}")
+
+
 def generate_file_content(filepath: str, secrets: dict) -> str:
     "loads the file, populates the templates, returns the content"
     try:
@@ -33,13 +64,61 @@ def generate_file_content(filepath: str, secrets: dict) -> str:
         raise RuntimeError(f"Ex Generating File Content For {filepath}: {str(ex)}")
 
 
+def hash_content(content: str) -> str:
+    "returns the SHA-256 hex digest of the content"
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def hash_secrets(secrets: Dict[str, str]) -> str:
+    "returns a single digest of every secret, so the manifest never holds the secrets themselves"
+    return hash_content(json.dumps(secrets, sort_keys=True))
+
+
+def load_manifest(manifest_filepath: str) -> Dict[str, Dict[str, str]]:
+    "loads the input & secrets hashes each generated file was last rendered from, keyed by filename"
+    if not os.path.isfile(manifest_filepath):
+        return {}
+
+    try:
+        with open(manifest_filepath, 'r') as fhandle:
+            return json.load(fhandle)
+    except Exception as ex:
+        logging.warning(f"Ignoring Invalid Manifest {manifest_filepath}: {str(ex)}")
+        return {}
+
+
+def save_manifest(manifest_filepath: str, manifest: Dict[str, Dict[str, str]]) -> None:
+    "writes the manifest so the next incremental run can skip the files whose inputs are unchanged"
+    try:
+        with open(manifest_filepath, 'w') as fhandle:
+            json.dump(manifest, fhandle, indent=4, sort_keys=True)
+    except Exception as ex:
+        raise RuntimeError(f"Ex Writing Manifest To {manifest_filepath}: {str(ex)}")
+
+
+def is_file_current(output_filepath: str, entry: Dict[str, str], manifest_entry: Dict[str, str]) -> bool:
+    "returns True if the generated file exists and was rendered from the same input content & secrets"
+    return os.path.isfile(output_filepath) and entry == manifest_entry
+
+
 def write_content_to_file(output_filepath: str, content: str) -> bool:
-    "write the given content into the output_filepath"
+    """
+    write the given content into the output_filepath, through a temp file renamed over it so the output is never
+        left half-written
+    """
+    out_dir, filename = os.path.split(output_filepath)
+    temp_filepath = ""
+
     try:
-        with open(output_filepath, 'w') as fhandle:
+        with tempfile.NamedTemporaryFile('w', dir=out_dir or ".", prefix=f".{filename}.", suffix=".tmp", delete=False) as fhandle:
+            temp_filepath = fhandle.name
             fhandle.write(content)
-            return True
+
+        os.replace(temp_filepath, output_filepath)
+        return True
     except Exception as ex:
+        if len(temp_filepath) and os.path.isfile(temp_filepath):
+            os.remove(temp_filepath)
         raise RuntimeError(f"Ex Writing Content To {output_filepath}: {str(ex)}")
 
 
@@ -59,6 +138,10 @@ def get_secrets(args: List[str]) -> Dict[str, str]:
     for i in range(2, len(args)):
         raw_param = args[i]
 
+        # flags such as '--incremental' are not secrets
+        if raw_param.startswith("--"):
+            continue
+
         if len(raw_param):
             tuple_param = raw_param.split("=")
             if len(tuple_param) == 2:
@@ -69,9 +152,167 @@ def get_secrets(args: List[str]) -> Dict[str, str]:
     return result
 
 
+def get_flags(args: List[str]) -> List[str]:
+    "get the '--' flags passed as cmd-args after the repo root"
+    return [arg for arg in args[2:] if arg.startswith("--")]
+
+
+def get_jobs(flags: List[str]) -> int:
+    "get the number of files rendered at once from the '--jobs=N' flag, defaults to the number of CPUs"
+    for flag in flags:
+        if flag.startswith(f"{JOBS_FLAG}="):
+            try:
+                jobs = int(flag.split("=", 1)[1])
+            except ValueError:
+                raise ValueError(f"Invalid Jobs Flag: {flag}")
+
+            if jobs <= 0:
+                raise ValueError(f"Invalid Jobs Flag: {flag}")
+
+            return jobs
+
+    return os.cpu_count() or 1
+
+
+def _needs_full_render(text: str) -> bool:
+    "returns True if the text holds syntax only the Jinja2 render & tag swap passes handle"
+    return any(syntax in text for syntax in _FULL_RENDER_SYNTAX)
+
+
+def substitute_tokens(file_content: str, secrets: dict, env: Optional[Environment] = None) -> Optional[str]:
+    """
+    populates the secrets and swaps the '[[' ']]' parameters for Jinja2 tags in a single scan of the content, the
+        parameters are left for the request templates to substitute. Returns None if the content holds any other
+        Jinja2 syntax, brackets that are not a parameter, or a name Jinja2 reserves or has a global for, which need
+        the full render - malformed tags such as '{{{ A }}' are left to the full render so they raise as they always have
+    """
+    jinja_globals = DEFAULT_NAMESPACE if env is None else env.globals
+
+    # Jinja2 normalises line endings to '\n'
+    if "\r" in file_content:
+        return None
+
+    pieces: List[str] = []
+    pos = 0
+
+    for match in _TOKEN.finditer(file_content):
+        literal = file_content[pos:match.start()]
+        secret, parameter = match.group(1), match.group(2)
+
+        if secret is not None:
+            # a '{' opening the tag is not a secret to Jinja2, but a syntax error
+            if match.start() > 0 and file_content[match.start() - 1] == "{":
+                return None
+
+            # Jinja2 renders literals & globals itself, so only a missing secret of any other name is an empty string
+            if secret in _JINJA_RESERVED_NAMES or (secret not in secrets and secret in jinja_globals):
+                return None
+
+            value = str(secrets[secret]) if secret in secrets else ""
+        else:
+            value = "{{" + parameter + "}}"
+
+            if _needs_full_render(parameter):
+                return None
+
+        # secrets are swapped for the tags too by the full render
+        if _needs_full_render(literal) or (secret is not None and ("[[" in value or "]]" in value)):
+            return None
+
+        pieces.append(literal)
+        pieces.append(value)
+        pos = match.end()
+
+    literal = _TRAILING_NEWLINE.sub("", file_content[pos:])
+
+    if _needs_full_render(literal):
+        return None
+
+    pieces.append(literal)
+    return "".join(pieces)
+
+
+def render_feature_content(env: Environment, file_content: str, secrets: dict, filepath: str) -> str:
+    """
+    populates the secrets of a feature file's content, then swaps its '[[' ']]' parameters for Jinja2 tags. Both are
+        done in one scan of the content unless it needs the full Jinja2 render
+    """
+    result = substitute_tokens(file_content, secrets, env)
+
+    if result is not None:
+        return result
+
+    try:
+        new_content = populate_template(file_content, secrets, env)
+    except Exception as ex:
+        raise RuntimeError(f"Ex Generating File Content For {filepath}: {str(ex)}")
+
+    return populate_jinja_template_tags(new_content)
+
+
+def render_file(env: Environment, file_content: str, secrets: dict, output_filepath: str) -> float:
+    "renders the content of a feature file and writes it to the output_filepath, returns how many seconds it took"
+    start = time.perf_counter()
+    write_content_to_file(output_filepath, render_feature_content(env, file_content, secrets, output_filepath))
+    return time.perf_counter() - start
+
+
+# the Jinja2 Environment of a render worker process, built once per worker by '_init_render_worker'
+_worker_env: Optional[Environment] = None
+
+
+def _init_render_worker() -> None:
+    "builds the Jinja2 Environment shared by every file a worker process renders"
+    global _worker_env
+    _worker_env = Environment()
+
+
+def _render_file_in_worker(file_content: str, secrets: dict, output_filepath: str) -> float:
+    "renders a feature file with the Environment of the worker process it runs in"
+    if _worker_env is None:
+        raise RuntimeError("Render Worker Not Initialised")
+
+    return render_file(_worker_env, file_content, secrets, output_filepath)
+
+
+def render_files(files: List[Tuple[str, str]], secrets: dict, out_dir_path: str, jobs: int) -> Dict[str, float]:
+    """
+    renders the (filename, content) feature files into the out_dir_path, returns how many seconds each file took.
+    Rendering is CPU-bound, so with more than one job the files are split across a pool of 'jobs' processes, each
+        with a Jinja2 Environment of its own. The first failure stops the files not yet started and is raised, with
+        the name of the file
+    """
+    if jobs <= 1 or len(files) <= 1:
+        env = Environment()
+        result: Dict[str, float] = {}
+
+        for filename, content in files:
+            try:
+                result[filename] = render_file(env, content, secrets, f"{out_dir_path}/{filename}")
+            except Exception as ex:
+                raise RuntimeError(f"Ex Populating File {filename}: {str(ex)}")
+
+        return result
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(files)), initializer=_init_render_worker) as executor:
+        futures = {executor.submit(_render_file_in_worker, content, secrets, f"{out_dir_path}/{filename}"): filename for filename, content in files}
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+
+        for future in done:
+            if future.exception() is not None:
+                for pending in futures:
+                    pending.cancel()
+                raise RuntimeError(f"Ex Populating File {futures[future]}: {str(future.exception())}")
+
+        return {filename: future.result() for future, filename in futures.items()}
+
+
 # take the files from /features
 # populate the secrets
 # paste the output into /test-framework/features
+# with '--incremental', only the files whose content or secrets changed since the last run are rendered & rewritten
+# every run rewrites the manifest, so an incremental run after a full one compares against what was last written
+# files are rendered on '--jobs=N' processes at once, each written to a temp file & renamed so none is left half-written
 
 if __name__ == "__main__":
     logging.info("Beginning Script")
@@ -103,11 +344,53 @@ if __name__ == "__main__":
         logging.error(f"No '.feature' Files Found In {dir_path}")
         sys.exit(1)
 
+    incremental = INCREMENTAL_FLAG in get_flags(sys.argv)
+    manifest_filepath = f"{out_dir_path}/{MANIFEST_FILENAME}"
+    old_manifest = load_manifest(manifest_filepath)
+    new_manifest: Dict[str, Dict[str, str]] = {}
+    secrets_hash = hash_secrets(secrets)
+    changed_files: List[Tuple[str, str]] = []
+    jobs = get_jobs(get_flags(sys.argv))
+
     for filename in file_list:
-        new_content = generate_file_content(f"{dir_path}/{filename}", secrets)
-        new_content = populate_jinja_template_tags(new_content)
+        file_content = read_file_content(f"{dir_path}/{filename}")
+        entry = {"content": hash_content(file_content), "secrets": secrets_hash}
+        new_manifest[filename] = entry
+
+        if not incremental or not is_file_current(f"{out_dir_path}/{filename}", entry, old_manifest.get(filename, {})):
+            changed_files.append((filename, file_content))
 
-        if write_content_to_file(f"{out_dir_path}/{filename}", new_content):
-            logging.info(f"File {filename} Populated")
+    start = time.perf_counter()
+
+    try:
+        durations = render_files(changed_files, secrets, out_dir_path, jobs)
+    except RuntimeError as ex:
+        logging.error(str(ex))
+        sys.exit(1)
+
+    for filename in sorted(durations, key=lambda name: durations[name], reverse=True):
+        logging.info(f"File {filename} Populated In {durations[filename] * 1000:.1f}ms")
+
+    logging.info(f"{len(durations)} Files Populated In {time.perf_counter() - start:.2f}s With {jobs} Jobs")
+
+    removed_files = set(old_manifest) - set(new_manifest)
+
+    if incremental:
+        # files removed from the features dir since the last run are removed from the output too
+        for filename in removed_files:
+            if os.path.isfile(f"{out_dir_path}/{filename}"):
+                os.remove(f"{out_dir_path}/{filename}")
+                logging.info(f"Stale File {filename} Removed")
+
+        logging.info(f"{len(file_list) - len(changed_files)} Unchanged Files Skipped")
+    else:
+        # full runs leave the outputs of removed files alone, so they stay in the manifest for the next incremental run
+        new_manifest.update({filename: old_manifest[filename] for filename in removed_files})
+
+    try:
+        save_manifest(manifest_filepath, new_manifest)
+    except RuntimeError as ex:
+        logging.error(str(ex))
+        sys.exit(1)
 
     logging.info("Script Complete")
@@ -2,7 +2,7 @@ import os
 import sys
 import logging
 
-from populate_secrets import get_all_files_in_dir
+from populate_secrets import get_all_files_in_dir, MANIFEST_FILENAME
 
 if __name__ == "__main__":
     logging.info("Beginning Script")
@@ -27,4 +27,8 @@ if __name__ == "__main__":
             os.remove(dir_path + "/" + filename)
             logging.info(filename + " Removed")
 
+    # without the generated files the manifest of an incremental run is stale
+    if MANIFEST_FILENAME in all_files:
+        os.remove(dir_path + "/" + MANIFEST_FILENAME)
+
     logging.info("Script Complete")
@@ -0,0 +1,141 @@
+import os
+import sys
+import logging
+from typing import List, Tuple
+
+from behave.configuration import Configuration
+from behave.parser import parse_feature, ParserError
+from behave.runner import Runner, Context, ConfigError
+from jinja2 import Environment
+
+try:
+    # behave internals, as of the behave version pinned in requirements.txt
+    from behave.formatter._registry import make_formatters
+except ImportError:
+    make_formatters = None  # type: ignore
+
+from populate_secrets import get_all_files_in_dir, get_secrets, read_file_content, render_feature_content
+
+# the framework's own features dir, holding the step definitions & environment hooks
+FRAMEWORK_FEATURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "features")
+
+
+def split_args(args: List[str]) -> Tuple[List[str], List[str]]:
+    "splits the cmd-args into the script's own args and the args after '--', which are passed on to behave"
+    if "--" in args:
+        index = args.index("--")
+        return args[:index], args[index + 1:]
+
+    return args, []
+
+
+def render_features(dir_path: str, secrets: dict) -> List[Tuple[str, str]]:
+    "renders every '.feature' file in the directory with the secrets, returns their (filename, content) held in memory"
+    env = Environment()
+    result = []
+
+    for filename in sorted(get_all_files_in_dir(dir_path)):
+        if filename.endswith(".feature"):
+            file_content = read_file_content(f"{dir_path}/{filename}")
+            result.append((filename, render_feature_content(env, file_content, secrets, f"{dir_path}/{filename}")))
+
+    return result
+
+
+class InMemoryRunner(Runner):
+    """
+    A behave runner given the content of its feature files rather than their paths, so rendered features (and the
+        secrets in them) are never written to disk. Each feature is named as if it was in 'features_dir', so reports
+        look the same as a run of the generated files
+    """
+
+    def __init__(self, config: Configuration, features_dir: str, rendered_features: List[Tuple[str, str]]):
+        super().__init__(config)
+        self.features_dir = os.path.abspath(features_dir)
+        self.rendered_features = rendered_features
+
+    def setup_paths(self) -> None:
+        "uses the features dir as the base dir, which holds the steps but no '.feature' files for behave to find"
+        if not os.path.isdir(os.path.join(self.features_dir, self.config.steps_dir)):
+            raise ConfigError(f"No {self.config.steps_dir} Directory In {self.features_dir}")
+
+        self.base_dir = self.features_dir
+        self.config.base_dir = self.features_dir
+        self.path_manager.add(self.features_dir)
+
+        if self.features_dir != os.getcwd():
+            self.path_manager.add(os.getcwd())
+
+    def run_with_paths(self) -> bool:
+        "parses the rendered features from memory, then runs them as behave would have run the files"
+        self.context = Context(self)
+        self.load_hooks()
+        self.load_step_definitions()
+
+        for filename, content in self.rendered_features:
+            filepath = os.path.join(self.features_dir, filename)
+
+            if self.config.exclude(filepath):
+                continue
+
+            feature = parse_feature(content, language=self.config.lang, filename=filepath)
+
+            if feature is not None:
+                self.features.append(feature)
+
+        self.formatters = make_formatters(self.config, self.config.outputs)
+        return self.run_model()
+
+
+def run_features(rendered_features: List[Tuple[str, str]], behave_args: List[str], features_dir: str = FRAMEWORK_FEATURES_DIR) -> int:
+    "runs the rendered features in this process with the behave args, returns behave's exit code"
+    if make_formatters is None or not all(hasattr(Runner, name) for name in ("setup_paths", "run_with_paths", "run_model")):
+        logging.error("The Installed behave Version Cannot Run Features In Memory; Install The Version Pinned In requirements.txt")
+        return 1
+
+    config = Configuration(command_args=behave_args)
+
+    if not config.format:
+        config.format = [config.default_format]
+
+    try:
+        failed = InMemoryRunner(config, features_dir, rendered_features).run()
+    except (ConfigError, ParserError) as ex:
+        logging.error(f"Ex Running Features: {str(ex)}")
+        return 1
+
+    return 1 if failed else 0
+
+
+# render the feature files from /features with the secrets, held in memory only
+# run them with behave in this process, without writing the generated files to /test-framework/features
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logging.info("Beginning Script")
+
+    script_args, behave_cmd_args = split_args(sys.argv)
+
+    if len(script_args) < 2 or not len(script_args[1]):
+        logging.error("Repo Root Arg Not Supplied")
+        sys.exit(1)
+
+    dir_path = f"{script_args[1]}/features"
+
+    if not os.path.isdir(dir_path):
+        logging.error(dir_path + " Not Found")
+        sys.exit(1)
+
+    secrets = get_secrets(script_args)
+
+    if not len(secrets):
+        logging.warning("No Secrets Specified In Script")
+
+    features = render_features(dir_path, secrets)
+
+    if not len(features):
+        logging.error(f"No '.feature' Files Found In {dir_path}")
+        sys.exit(1)
+
+    logging.info(f"{len(features)} Feature Files Rendered In Memory")
+    sys.exit(run_features(features, behave_cmd_args))
@@ -0,0 +1,178 @@
+import json
+import os
+import tempfile
+from unittest import main, mock, TestCase
+from xml.etree import ElementTree
+
+from cmd.parallel_behave import (balance_files, merge_suites, get_serial_isolation, get_report_name, load_history, parse_args,
+                                 DEFAULT_HISTORY_FILE)
+
+
+def _suite(time: str, cases: list) -> ElementTree.Element:
+    "builds a JUnit testsuite of the given (name, status) test cases, with the counts behave would give it"
+    suite = ElementTree.Element("testsuite", {"name": "api.users", "time": time, "errors": "0"})
+
+    for name, status in cases:
+        ElementTree.SubElement(suite, "testcase", {"classname": "api.users", "name": name, "status": status})
+
+    suite.set("tests", str(len(cases)))
+    suite.set("skipped", str(sum(1 for _, status in cases if status == "skipped")))
+    suite.set("failures", str(sum(1 for _, status in cases if status == "failed")))
+    return suite
+
+
+class TestBalanceFiles(TestCase):
+    "test class for the method 'balance_files'"
+
+    def test_valid_1(self):
+        "the longest remaining file is given to the worker with the least work so far"
+        durations = {"a": 5.0, "b": 4.0, "c": 3.0, "d": 2.0, "e": 1.0}
+
+        result = balance_files(["e", "d", "c", "b", "a"], durations, 2)
+
+        self.assertEqual(result, [["a", "d", "e"], ["b", "c"]])
+        self.assertEqual([sum(durations[path] for path in files) for files in result], [8.0, 7.0])
+
+    def test_valid_2(self):
+        "workers left without any files are dropped"
+        result = balance_files(["a", "b"], {"a": 1.0, "b": 2.0}, 4)
+
+        self.assertEqual(result, [["b"], ["a"]])
+        self.assertEqual(balance_files([], {}, 4), [])
+
+    def test_invalid_1(self):
+        "invalid worker count given"
+        with self.assertRaises(ValueError):
+            balance_files(["a"], {"a": 1.0}, 0)
+
+
+class TestMergeSuites(TestCase):
+    "test class for the method 'merge_suites'"
+
+    def test_valid_1(self):
+        "scenarios skipped by one worker but run by another are dropped, and the counts adjusted to match"
+        parallel = _suite("1.5", [("A", "passed"), ("B", "skipped")])
+        serial = _suite("2.25", [("A", "skipped"), ("B", "failed")])
+
+        result = merge_suites([parallel, serial])
+
+        self.assertEqual([(case.get("name"), case.get("status")) for case in result.iter("testcase")], [("A", "passed"), ("B", "failed")])
+        self.assertEqual(result.get("tests"), "2")
+        self.assertEqual(result.get("skipped"), "0")
+        self.assertEqual(result.get("failures"), "1")
+        self.assertEqual(result.get("errors"), "0")
+        self.assertEqual(result.get("time"), "3.75")
+
+    def test_valid_2(self):
+        "a scenario no worker ran is kept as skipped"
+        result = merge_suites([_suite("1", [("A", "passed"), ("B", "skipped")])])
+
+        self.assertEqual(len(list(result.iter("testcase"))), 2)
+        self.assertEqual(result.get("tests"), "2")
+        self.assertEqual(result.get("skipped"), "1")
+
+
+class TestGetSerialIsolation(TestCase):
+    "test class for the method 'get_serial_isolation'"
+
+    def _feature_file(self, content: str) -> str:
+        "writes the content to a temporary feature file, removed when the test ends"
+        fhandle = tempfile.NamedTemporaryFile("w", suffix=".feature", delete=False)
+        self.addCleanup(os.remove, fhandle.name)
+
+        with fhandle:
+            fhandle.write(content)
+
+        return fhandle.name
+
+    def test_valid_1(self):
+        "a feature tagged '@serial' has every scenario serial"
+        filepath = self._feature_file("@serial\nFeature: Users\n  Scenario: A\n    Given a step\n")
+
+        self.assertEqual(get_serial_isolation(filepath), (True, True))
+
+    def test_valid_2(self):
+        "only some scenarios are tagged '@serial'"
+        filepath = self._feature_file("Feature: Users\n  Scenario: A\n    Given a step\n\n  @serial\n  Scenario: B\n    Given a step\n")
+
+        self.assertEqual(get_serial_isolation(filepath), (False, True))
+
+    def test_valid_3(self):
+        "no scenario is tagged '@serial'"
+        filepath = self._feature_file("@api\nFeature: Users\n  Scenario: A\n    Given a step\n")
+
+        self.assertEqual(get_serial_isolation(filepath), (False, False))
+
+    def test_invalid_1(self):
+        "the feature file cannot be parsed"
+        filepath = self._feature_file("Feature: Users\n  Scenario: A\n    Given a step\n\nFeature: Orders\n")
+
+        with self.assertRaises(RuntimeError):
+            get_serial_isolation(filepath)
+
+
+class TestGetReportName(TestCase):
+    "test class for the method 'get_report_name'"
+
+    def test_valid_1(self):
+        "succesfully get the report name of nested & top level feature files"
+        self.assertEqual(get_report_name(os.path.join("features", "api", "users.feature"), "features"), "api.users")
+        self.assertEqual(get_report_name(os.path.join("features", "users.feature"), "features"), "users")
+
+
+class TestLoadHistory(TestCase):
+    "test class for the method 'load_history'"
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+        self.filepath = os.path.join(self.work_dir.name, DEFAULT_HISTORY_FILE)
+
+    def test_valid_1(self):
+        "succesfully load the durations of a previous run"
+        with open(self.filepath, "w") as fhandle:
+            json.dump({"api.users": 1.5, "api.orders": 2}, fhandle)
+
+        self.assertEqual(load_history(self.filepath), {"api.users": 1.5, "api.orders": 2.0})
+
+    def test_valid_2(self):
+        "no history has been recorded yet"
+        self.assertEqual(load_history(self.filepath), {})
+
+    def test_valid_3(self):
+        "an invalid history is ignored with a warning rather than failing the run"
+        with open(self.filepath, "w") as fhandle:
+            fhandle.write("{not json")
+
+        with self.assertLogs(level="WARNING"):
+            self.assertEqual(load_history(self.filepath), {})
+
+
+class TestParseArgs(TestCase):
+    "test class for the method 'parse_args'"
+
+    def test_valid_1(self):
+        "the defaults are used when no args are given"
+        result = parse_args([])
+
+        self.assertEqual(result.features_dir, "features")
+        self.assertEqual(result.history, DEFAULT_HISTORY_FILE)
+        self.assertGreater(result.workers, 0)
+        self.assertEqual(result.behave_args, [])
+
+    def test_valid_2(self):
+        "everything after '--' is passed on to behave"
+        result = parse_args(["--workers", "3", "--features-dir", "generated", "--", "-k", "--tags", "api"])
+
+        self.assertEqual(result.workers, 3)
+        self.assertEqual(result.features_dir, "generated")
+        self.assertEqual(result.behave_args, ["-k", "--tags", "api"])
+
+    def test_invalid_1(self):
+        "invalid worker count given"
+        with mock.patch("sys.stderr"), self.assertRaises(SystemExit):
+            parse_args(["--workers", "0"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import main, mock, TestCase
+
+from jinja2 import Environment
+
+from cmd.populate_secrets import (load_manifest, save_manifest, is_file_current, get_flags, get_jobs, hash_content, hash_secrets,
+                                  render_files, write_content_to_file, substitute_tokens, render_feature_content, populate_template,
+                                  populate_jinja_template_tags, MANIFEST_FILENAME, INCREMENTAL_FLAG, JOBS_FLAG)
+
+
+class _TempDirTestCase(TestCase):
+    "runs each test in a temporary directory of its own, removed when the test ends"
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.work_dir.name, filename)
+
+    def _read(self, filename: str) -> str:
+        with open(self._path(filename), "r") as fhandle:
+            return fhandle.read()
+
+
+class TestManifest(_TempDirTestCase):
+    "test class for the methods 'load_manifest' & 'save_manifest'"
+
+    def test_valid_1(self):
+        "a saved manifest is loaded back unchanged"
+        manifest = {"users.feature": {"content": hash_content("Feature: Users"), "secrets": hash_secrets({"PASSWORD": "pass"})}}
+
+        save_manifest(self._path(MANIFEST_FILENAME), manifest)
+
+        self.assertEqual(load_manifest(self._path(MANIFEST_FILENAME)), manifest)
+
+    def test_valid_2(self):
+        "no manifest has been written yet, so every file is rendered"
+        self.assertEqual(load_manifest(self._path(MANIFEST_FILENAME)), {})
+
+    def test_valid_3(self):
+        "a corrupt manifest is ignored with a warning, so every file is rendered again"
+        with open(self._path(MANIFEST_FILENAME), "w") as fhandle:
+            fhandle.write('{"users.feature": {"content"')
+
+        with self.assertLogs(level="WARNING"):
+            self.assertEqual(load_manifest(self._path(MANIFEST_FILENAME)), {})
+
+    def test_valid_4(self):
+        "the manifest holds a digest of the secrets, never the secrets themselves"
+        save_manifest(self._path(MANIFEST_FILENAME), {"users.feature": {"content": "", "secrets": hash_secrets({"PASSWORD": "hunter2"})}})
+
+        with open(self._path(MANIFEST_FILENAME), "r") as fhandle:
+            self.assertNotIn("hunter2", fhandle.read())
+
+    def test_invalid_1(self):
+        "the manifest cannot be written"
+        with self.assertRaises(RuntimeError):
+            save_manifest(self._path(os.path.join("missing", MANIFEST_FILENAME)), {})
+
+
+class TestIsFileCurrent(_TempDirTestCase):
+    "test class for the method 'is_file_current'"
+
+    def setUp(self):
+        super().setUp()
+        self.output_filepath = self._path("users.feature")
+        self.entry = {"content": hash_content("Feature: Users"), "secrets": hash_secrets({"PASSWORD": "pass"})}
+
+        with open(self.output_filepath, "w") as fhandle:
+            fhandle.write("Feature: Users")
+
+    def test_valid_1(self):
+        "the output exists & was rendered from the same template and secrets"
+        self.assertTrue(is_file_current(self.output_filepath, self.entry, dict(self.entry)))
+
+    def test_valid_2(self):
+        "the template changed since the output was rendered"
+        changed = {**self.entry, "content": hash_content("Feature: Users & Orders")}
+
+        self.assertFalse(is_file_current(self.output_filepath, changed, self.entry))
+
+    def test_valid_3(self):
+        "a secret changed since the output was rendered"
+        changed = {**self.entry, "secrets": hash_secrets({"PASSWORD": "new-pass"})}
+
+        self.assertFalse(is_file_current(self.output_filepath, changed, self.entry))
+
+    def test_valid_4(self):
+        "the output was deleted since it was rendered"
+        os.remove(self.output_filepath)
+
+        self.assertFalse(is_file_current(self.output_filepath, self.entry, dict(self.entry)))
+
+    def test_valid_5(self):
+        "the file was not in the manifest of the last run"
+        self.assertFalse(is_file_current(self.output_filepath, self.entry, {}))
+
+
+class TestGetFlags(TestCase):
+    "test class for the method 'get_flags'"
+
+    def test_valid_1(self):
+        "only the '--' args after the repo root are flags"
+        args = ["populate_secrets.py", "/repo", "PASSWORD=pass", INCREMENTAL_FLAG, "--jobs=2"]
+
+        self.assertEqual(get_flags(args), [INCREMENTAL_FLAG, "--jobs=2"])
+
+    def test_valid_2(self):
+        "no flags given"
+        self.assertEqual(get_flags(["populate_secrets.py", "/repo", "PASSWORD=pass"]), [])
+        self.assertEqual(get_flags(["populate_secrets.py", "--repo"]), [])
+
+
+class TestSubstituteTokens(TestCase):
+    "test class for the methods 'substitute_tokens' & 'render_feature_content'"
+
+    def test_valid_1(self):
+        "secrets & parameters are substituted in a single scan, the same as the full render"
+        content = "Given {{ PASSWORD }} and {{MISSING}}\n    | [[ value ]] |\n"
+        secrets = {"PASSWORD": "pass"}
+
+        result = substitute_tokens(content, secrets)
+
+        self.assertEqual(result, "Given pass and \n    | {{ value }} |")
+        self.assertEqual(result, populate_jinja_template_tags(populate_template(content, secrets)))
+
+    def test_valid_2(self):
+        "content the single scan cannot render exactly is left to the full render"
+        for content in ("{% if A %}a{% endif %}", "{{ A | upper }}", "a\r\nb", "{{{ A }}", "x {{{A}} y", "{{ A }"):
+            self.assertIsNone(substitute_tokens(content, {"A": "va"}))
+
+    def test_valid_3(self):
+        "Jinja2 literals, globals & values of None render the same as the full render"
+        env = Environment()
+        secrets = {"PASSWORD": None, "range": "r"}
+        names = ("true", "false", "none", "True", "False", "None", "range", "dict", "lipsum", "cycler", "joiner", "namespace",
+                 "self", "PASSWORD", "MISSING")
+
+        for name in names:
+            content = f"Given {{{{ {name} }}}} [[ value ]]"
+            expected = populate_jinja_template_tags(populate_template(content, secrets, env))
+
+            self.assertEqual(render_feature_content(env, content, secrets, "users.feature"), expected)
+
+        self.assertEqual(substitute_tokens("{{ range }} {{ PASSWORD }}", secrets, env), "r None")
+        self.assertIsNone(substitute_tokens("{{ true }}", secrets, env))
+        self.assertIsNone(substitute_tokens("{{ lipsum }}", {}))
+
+    def test_invalid_1(self):
+        "malformed tags raise rather than being rendered, the same as the full render always has"
+        for content in ("{{{ A }}", "Given {{{A}}\n", "{{ A }", "{% if %}", "{{ not }}"):
+            with self.assertRaises(RuntimeError):
+                render_feature_content(Environment(), content, {"A": "va"}, "users.feature")
+
+
+class TestGetJobs(TestCase):
+    "test class for the method 'get_jobs'"
+
+    def test_valid_1(self):
+        "succesfully read the number of jobs from the flags"
+        self.assertEqual(get_jobs([INCREMENTAL_FLAG, f"{JOBS_FLAG}=3"]), 3)
+
+    @mock.patch("cmd.populate_secrets.os.cpu_count", return_value=6)
+    def test_valid_2(self, m_cpu_count):
+        "no jobs flag given, so there is a job per CPU"
+        self.assertEqual(get_jobs([INCREMENTAL_FLAG]), 6)
+
+        m_cpu_count.return_value = None
+        self.assertEqual(get_jobs([]), 1)
+
+    def test_invalid_1(self):
+        "invalid jobs flag given"
+        for flag in (f"{JOBS_FLAG}=0", f"{JOBS_FLAG}=-1", f"{JOBS_FLAG}=many", f"{JOBS_FLAG}="):
+            with self.assertRaises(ValueError):
+                get_jobs([flag])
+
+
+class TestWriteContentToFile(_TempDirTestCase):
+    "test class for the method 'write_content_to_file'"
+
+    def test_valid_1(self):
+        "succesfully write the content, replacing the existing file"
+        write_content_to_file(self._path("users.feature"), "old")
+
+        self.assertTrue(write_content_to_file(self._path("users.feature"), "new"))
+        self.assertEqual(self._read("users.feature"), "new")
+        self.assertEqual(os.listdir(self.work_dir.name), ["users.feature"])
+
+    def test_invalid_1(self):
+        "the write fails, the existing output is left as it was and no temp file is left behind"
+        write_content_to_file(self._path("users.feature"), "old")
+
+        with mock.patch("cmd.populate_secrets.os.replace", side_effect=OSError("Test Error")):
+            with self.assertRaises(RuntimeError):
+                write_content_to_file(self._path("users.feature"), "new")
+
+        self.assertEqual(self._read("users.feature"), "old")
+        self.assertEqual(os.listdir(self.work_dir.name), ["users.feature"])
+
+    def test_invalid_2(self):
+        "the output directory does not exist"
+        with self.assertRaises(RuntimeError):
+            write_content_to_file(self._path(os.path.join("missing", "users.feature")), "new")
+
+
+class TestRenderFiles(_TempDirTestCase):
+    "test class for the method 'render_files'"
+
+    def _files(self, count: int) -> list:
+        return [(f"{i}.feature", f"Feature: {i}\n  Scenario: {{{{ PASSWORD }}}} [[ value ]]\n") for i in range(count)]
+
+    def test_valid_1(self):
+        "succesfully render the files across worker processes, every file is written and timed in the order given"
+        files = self._files(6)
+
+        result = render_files(files, {"PASSWORD": "pass"}, self.work_dir.name, 3)
+
+        self.assertEqual(list(result), [filename for filename, _ in files])
+        self.assertTrue(all(duration >= 0 for duration in result.values()))
+
+        for i in range(6):
+            self.assertEqual(self._read(f"{i}.feature"), f"Feature: {i}\n  Scenario: pass {{{{ value }}}}")
+
+    def test_valid_2(self):
+        "a single job renders the files in the calling process, with the same output as the worker processes"
+        files = self._files(3) + [("jinja.feature", "{% for i in range(2) %}[[ i ]]{{ PASSWORD }}{% endfor %}")]
+
+        result = render_files(files, {"PASSWORD": "pass"}, self.work_dir.name, 1)
+
+        self.assertEqual(list(result), [filename for filename, _ in files])
+        self.assertEqual(self._read("jinja.feature"), "{{ i }}pass{{ i }}pass")
+        self.assertEqual(render_files([], {}, self.work_dir.name, 4), {})
+
+    def test_invalid_1(self):
+        "a file fails to render, the error names the file and no partial output of it is left behind"
+        for jobs in (1, 2):
+            files = self._files(2) + [("broken.feature", "Feature: {% if %}")]
+
+            with self.assertRaisesRegex(RuntimeError, "broken.feature"):
+                render_files(files, {}, self.work_dir.name, jobs)
+
+            self.assertNotIn("broken.feature", os.listdir(self.work_dir.name))
+            self.assertFalse(any(filename.endswith(".tmp") for filename in os.listdir(self.work_dir.name)))
+
+
+class TestScript(_TempDirTestCase):
+    "test class for running the script"
+
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "populate_secrets.py")
+
+    def _run(self, *args: str) -> None:
+        subprocess.run([sys.executable, self.script, self.work_dir.name, *args, "--jobs=1"], check=True, capture_output=True)
+
+    def test_valid_1(self):
+        "a full run between incremental runs rewrites the manifest, so the next incremental run renders with its secrets"
+        os.makedirs(self._path("features"))
+        os.makedirs(self._path(os.path.join("test-framework", "features")))
+
+        with open(self._path(os.path.join("features", "users.feature")), "w") as fhandle:
+            fhandle.write("pw {{ PASSWORD }}")
+
+        self._run("PASSWORD=old", INCREMENTAL_FLAG)
+        self._run("PASSWORD=new")
+        self._run("PASSWORD=old", INCREMENTAL_FLAG)
+
+        self.assertEqual(self._read(os.path.join("test-framework", "features", "users.feature")), "pw old")
+
+    def test_valid_2(self):
+        "a file removed before a full run still has its output removed by the next incremental run"
+        os.makedirs(self._path("features"))
+        os.makedirs(self._path(os.path.join("test-framework", "features")))
+
+        for filename in ("users.feature", "orders.feature"):
+            with open(self._path(os.path.join("features", filename)), "w") as fhandle:
+                fhandle.write("pw {{ PASSWORD }}")
+
+        self._run("PASSWORD=pass", INCREMENTAL_FLAG)
+        os.remove(self._path(os.path.join("features", "orders.feature")))
+        self._run("PASSWORD=pass")
+        self.assertTrue(os.path.isfile(self._path(os.path.join("test-framework", "features", "orders.feature"))))
+
+        self._run("PASSWORD=pass", INCREMENTAL_FLAG)
+        self.assertFalse(os.path.isfile(self._path(os.path.join("test-framework", "features", "orders.feature"))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import io
+import os
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from unittest import main, mock, TestCase
+
+# the scripts of cmd/ import each other as they are run, from their own directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from run_features import run_features, split_args  # noqa: E402
+
+_STEPS = '''from behave import given
+
+
+@given('an in-memory step given {value}')
+def step_impl(context, value):
+    assert value == "pass", value
+'''
+_BEHAVE_ARGS = ["--format=null", "--no-summary"]
+
+
+def _feature(name: str, value: str) -> str:
+    return f"Feature: {name}\n  Scenario: {name}\n    Given an in-memory step given {value}\n"
+
+
+class TestSplitArgs(TestCase):
+    "test class for the method 'split_args'"
+
+    def test_valid_1(self):
+        "the args after '--' are split off for behave"
+        self.assertEqual(split_args(["run_features.py", "/repo", "--", "-k", "--tags", "api"]), (["run_features.py", "/repo"], ["-k", "--tags", "api"]))
+        self.assertEqual(split_args(["run_features.py", "/repo"]), (["run_features.py", "/repo"], []))
+
+
+class TestRunFeatures(TestCase):
+    "test class for the method 'run_features', running a small feature directory in this process"
+
+    @classmethod
+    def setUpClass(cls):
+        # behave registers steps process-wide, so every test shares the one steps directory
+        cls.work_dir = tempfile.TemporaryDirectory()
+        os.mkdir(os.path.join(cls.work_dir.name, "steps"))
+
+        with open(os.path.join(cls.work_dir.name, "steps", "in_memory_steps.py"), "w") as fhandle:
+            fhandle.write(_STEPS)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.work_dir.cleanup()
+
+    def test_valid_1(self):
+        "succesfully run the rendered features, none of them are written to the features dir"
+        features = [("first.feature", _feature("First", "pass")), ("second.feature", _feature("Second", "pass"))]
+
+        self.assertEqual(run_features(features, _BEHAVE_ARGS, self.work_dir.name), 0)
+        self.assertEqual(os.listdir(self.work_dir.name), ["steps"])
+
+    def test_invalid_1(self):
+        "a scenario of the rendered features fails"
+        features = [("first.feature", _feature("First", "pass")), ("second.feature", _feature("Second", "fail"))]
+
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(run_features(features, _BEHAVE_ARGS, self.work_dir.name), 1)
+
+    def test_invalid_2(self):
+        "a rendered feature cannot be parsed"
+        features = [("first.feature", _feature("First", "pass") + "\nFeature: Second\n")]
+
+        with self.assertLogs(level="ERROR"):
+            self.assertEqual(run_features(features, _BEHAVE_ARGS, self.work_dir.name), 1)
+
+    @mock.patch("run_features.make_formatters", None)
+    def test_invalid_3(self):
+        "the installed behave does not have the internals the in-memory run relies on"
+        with self.assertLogs(level="ERROR"):
+            self.assertEqual(run_features([("first.feature", _feature("First", "pass"))], _BEHAVE_ARGS, self.work_dir.name), 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,17 @@ from typing import Dict, Callable
 
 from behave.fixture import fixture, use_fixture_by_tag
 from behave.runner import Context
-from behave.model import Tag, Scenario
+from behave.model import Tag, Scenario, Step
 
 from generic_api.template_constants import template_constants
+from generic_api.json_codec import json_codecs
+from generic_api.cassette import cassette, DEFAULT_CASSETTE_DIR
+from generic_api.metrics import metrics
+from generic_api.profiler import profiler, DEFAULT_PROFILE_DIR, DEFAULT_SAMPLE_INTERVAL_MS
+from generic_api.session_pool import session_pool, DEFAULT_POOL_SIZE, DEFAULT_MAX_PER_HOST
+from generic_api.token_cache import token_cache, DEFAULT_TOKEN_TTL, DEFAULT_REFRESH_MARGIN
+from features.steps.template_cache import template_cache, DEFAULT_CACHE_SIZE
+from features.steps.request_template import compile_request_template
 
 
 @fixture
@@ -15,15 +23,97 @@ def populate_template_constants(context: Context) -> bool:
     if context is None:
         raise RuntimeError("Context Is None")
 
-    context.templates = template_constants
+    # constants are parsed & validated the same as templates registered by a step, they may be held as text or dicts
+    context.templates = {
+        name: compile_request_template(raw if isinstance(raw, str) else json.dumps(raw))
+        for name, raw in template_constants.items()
+    }
     return True
 
 
+@fixture
+def profile_tagged(context: Context):
+    "profiles the tagged scenario or feature, unless a profile is already being taken"
+    if context is None:
+        raise RuntimeError("Context Is None")
+
+    scenario = getattr(context, "scenario", None)
+    started = profiler.start(scenario.name if scenario is not None else context.feature.name)
+    yield started
+
+    if started:
+        profiler.stop()
+
+
+def before_all(context: Context):
+    "runs once before any feature, used to apply run-wide settings passed as behave userdata (-D key=value)"
+    if context is None:
+        raise RuntimeError("Context Is None")
+
+    userdata = context.config.userdata
+    session_pool.configure(
+        int(userdata.get("pool_size", DEFAULT_POOL_SIZE)),
+        int(userdata.get("pool_max_per_host", DEFAULT_MAX_PER_HOST)),
+    )
+    template_cache.configure(
+        int(userdata.get("template_cache_size", DEFAULT_CACHE_SIZE)),
+        userdata.get("template_bytecode_cache_dir", ""),
+    )
+    token_cache.configure(
+        float(userdata.get("auth_token_ttl", DEFAULT_TOKEN_TTL)),
+        float(userdata.get("auth_refresh_margin", DEFAULT_REFRESH_MARGIN)),
+    )
+    json_codecs.configure(userdata.get("json_codec", ""))
+    cassette.configure(
+        userdata.get("cassette_mode", "off"),
+        userdata.get("cassette_dir", DEFAULT_CASSETTE_DIR),
+    )
+    metrics.configure(
+        userdata.get("metrics_file", ""),
+        userdata.get("metrics_format", "jsonl"),
+    )
+    profiler.configure(
+        userdata.get("profile_mode", "off"),
+        userdata.get("profile_dir", DEFAULT_PROFILE_DIR),
+        int(userdata.get("profile_interval_ms", DEFAULT_SAMPLE_INTERVAL_MS)),
+    )
+
+    if profiler.mode == "run":
+        profiler.start("run")
+
+
+def after_all(context: Context):
+    "runs once after every feature, used to write the run's profile and close the pooled connections, the cassette and the metrics file"
+    profiler.stop()
+    session_pool.close()
+    cassette.close()
+    metrics.close()
+
+
+def before_scenario(context: Context, scenario: Scenario):
+    "runs before each scenario, used to start timing & profiling it if enabled"
+    metrics.start_scenario(scenario.feature.name, scenario.name)
+    profiler.start_scenario(f"{scenario.feature.name} {scenario.name}")
+
+
+def before_step(context: Context, step: Step):
+    "runs before each step, used to start timing it if metrics are enabled"
+    metrics.start_step(f"{step.keyword} {step.name}", step.line)
+
+
+def after_step(context: Context, step: Step):
+    "runs after each step, used to record its duration & stages if metrics are enabled"
+    metrics.end_step(step.status.name)
+
+
 def after_scenario(context: Context, scenario: Scenario):
-    "runs after a scenario has finished, used to reset values"
+    "runs after a scenario has finished, used to record its metrics & reset values"
     if context is None:
         raise RuntimeError("Context Is None")
 
+    profiler.stop_scenario()
+    metrics.end_scenario(scenario.status.name)
+
     context.templates = {}
     context.default_values = {}
 
@@ -32,10 +122,11 @@ def before_tag(context: Context, tag: Tag):
     if context is None or tag is None:
         raise RuntimeError("Context Or Tag Is None")
 
-    if tag.startswith("constants"):
+    if tag.startswith("constants") or tag == "profile":
         return use_fixture_by_tag(tag, context, fixture_registry)
 
 
 fixture_registry: Dict[str, Callable] = {
     "constants": populate_template_constants,
+    "profile": profile_tagged,
 }
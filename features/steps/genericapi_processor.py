@@ -1,14 +1,24 @@
-import os
-import json
-from typing import Dict, Any
+import asyncio
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Tuple, Union
 
 from behave.runner import Context
 from behave import given, when, then
-from jinja2 import Template
 
-from generic_api.factory import request_factory
-from generic_api.request_runner import RequestRunner
-from features.steps.processor_utils import get_dot_path_data, get_current_time_ms
+from generic_api.factory import request_factory, async_request_factory
+from generic_api.async_request_runner import AsyncRequestRunner, DEFAULT_MAX_CONCURRENCY, aiohttp
+from generic_api.request_runner import RequestRunner, ResponseTooLargeError
+from generic_api.request_timing import RequestTimings
+from generic_api.lazy_body import LazyResponseBody
+from generic_api.metrics import metrics
+from features.steps.processor_utils import get_dot_paths_data, get_current_time_ms
+from features.steps.request_template import RequestTemplate, compile_request_template, compile_text
+from features.steps.load_results import LoadTestResults
+from features.steps.latency_histogram import LatencyHistogram
+
+LOAD_ENGINES = ("threads", "asyncio")
 
 
 def populate_template(template: str, input_values: dict) -> str:
@@ -16,19 +26,23 @@ def populate_template(template: str, input_values: dict) -> str:
     if not len(input_values):
         return template
 
-    return Template(template).render(input_values)
+    # simple placeholders are substituted directly, anything else is rendered through Jinja2
+    return compile_text(template)(input_values)
 
 
 @given('a request template {req_name} containing')
 def add_request_template(context: Context, req_name: str) -> None:
-    "adds the request template to the request.templates"
+    "parses & validates the request template, then adds it to the request.templates"
     if not len(req_name):
         raise ValueError("req_name Is Empty")
 
     if not hasattr(context, 'templates'):
         context.templates = {}
 
-    context.templates[req_name] = context.text
+    try:
+        context.templates[req_name] = compile_request_template(context.text)
+    except ValueError as ex:
+        raise ValueError(f"Invalid Request Template {req_name}: {str(ex)}")
 
 
 @when('User makes {authenticated} {request_type} request {request_template_name} to endpoint {endpoint} containing')
@@ -45,78 +59,218 @@ def make_template_request(context: Context, authenticated: str, request_type: st
     else:
         auth_enabled = False
 
-    string_req_data: str = context.templates[request_template_name]
+    req_template = _get_request_template(context, request_template_name)
 
     if request_type.lower().find("http") > -1:
-        return _make_http_request(context, request_type, string_req_data, endpoint, auth_enabled, body_values)
+        return _make_http_request(context, request_type, req_template, endpoint, auth_enabled, body_values)
 
 
-def _make_http_request(context: Context, protocol: str, string_req_data: str, endpoint: str, auth_enabled: bool, body_values: dict) -> None:
-    "make an HTTP request through the GenericAPI"
-    req_data: Dict[str, Any] = json.loads(string_req_data)
+# the steps whose tables name the response body paths a scenario checks
+_BODY_ASSERTION_STEP = re.compile(r"^The \S+ response body (includes|contains)$")
 
-    if "method" not in req_data:
-        raise ValueError("No Method In Template")
 
-    method: str = req_data["method"].upper()
+def _get_stream_paths(context: Context) -> Tuple[str, ...]:
+    "returns the dot paths checked by the body assertion steps of the current scenario, the only paths a streamed response keeps"
+    dot_paths: List[str] = []
 
-    if "query_params" in req_data:
-        query_params = req_data["query_params"]
-    else:
-        query_params = {}
+    for step in context.scenario.all_steps:
+        if _BODY_ASSERTION_STEP.match(step.name) and step.table is not None and "label" in step.table.headings:
+            dot_paths.extend(row["label"] for row in step.table)
 
-    if "headers" in req_data:
-        headers = req_data["headers"]
-    else:
-        headers = {}
-
-    if "body" in req_data:
-        parsed_body = json.loads(
-            populate_template(
-                json.dumps(req_data["body"]),
-                body_values
-            )
-        )
-
-        if "content_type" in req_data:
-            content_type = req_data["content_type"]
-        elif "Content-Type" in headers:
-            content_type = headers["Content-Type"]
-        else:
-            # safe default for most cases
-            content_type = "application/json"
-    else:
-        parsed_body = {}
-        content_type = ""
+    return tuple(dict.fromkeys(dot_paths))
 
-    if auth_enabled:
-        for field_to_check in ("Auth URL", "Username", "Password"):
-            if field_to_check not in context.default_values:
-                raise ValueError(f"Authenticated Request Required, But Default Value {field_to_check} Is Missing")
 
-        auth_url: str = context.default_values['Auth URL']
-        username: str = context.default_values['Username']
-        password: str = context.default_values['Password']
-    else:
-        auth_url = ""
-        username = ""
-        password = ""
+def _get_request_template(context: Context, request_template_name: str) -> RequestTemplate:
+    "returns the named request template from the context"
+    req_template: Union[str, RequestTemplate] = context.templates[request_template_name]
+
+    if isinstance(req_template, str):
+        # templates added to the context without the registration step are still raw text
+        req_template = compile_request_template(req_template)
+
+    return req_template
+
+
+def _get_auth_details(context: Context, auth_enabled: bool) -> Tuple[str, str, str]:
+    "returns the auth url, username and password from the default values if the request is authenticated"
+    if not auth_enabled:
+        return "", "", ""
+
+    for field_to_check in ("Auth URL", "Username", "Password"):
+        if field_to_check not in context.default_values:
+            raise ValueError(f"Authenticated Request Required, But Default Value {field_to_check} Is Missing")
+
+    return context.default_values['Auth URL'], context.default_values['Username'], context.default_values['Password']
+
+
+def _make_http_request(context: Context, protocol: str, req_template: RequestTemplate, endpoint: str, auth_enabled: bool, body_values: dict) -> None:
+    "make an HTTP request through the GenericAPI"
+    method = req_template.method
+    query_params = req_template.query_params
+    content_type = req_template.content_type
+
+    with metrics.span("render"):
+        headers = req_template.render_headers()
+        parsed_body = req_template.render_body(body_values)
 
+    auth_url, username, password = _get_auth_details(context, auth_enabled)
     req_run: RequestRunner = request_factory(protocol, auth_url, username, password)
 
-    # make the request
+    stream_paths = _get_stream_paths(context) if req_template.stream_response else None
+    max_response_bytes = _get_max_response_bytes(context, req_template)
+
+    # make the request, the body is left undecoded until a body assertion step needs it
     try:
+        timings = RequestTimings()
         context.start_time = get_current_time_ms()
-        resp_body, resp_headers, resp_status_code = req_run.run_request(method, endpoint, content_type, parsed_body, query_params, headers, auth_enabled)
-        context.end_time = get_current_time_ms()
+        resp_body, resp_headers, resp_status_code = req_run.run_request(method, endpoint, content_type, parsed_body, query_params, headers, auth_enabled,
+                                                                        timings=timings, stream_paths=stream_paths, lazy_decode=True,
+                                                                        max_response_bytes=max_response_bytes, accept_encoding=req_template.accept_encoding,
+                                                                        body_file=req_template.body_file, request_encoding=req_template.request_encoding)
+        # the elapsed time only covers the network phases, not the encoding & decoding around them
+        context.end_time = context.start_time + timings.get_ms("total")
+        context.request_timings = timings
 
         context.response_body = resp_body
         context.response_headers = resp_headers
         context.response_status_code = resp_status_code
+    except ResponseTooLargeError:
+        # reported as the failed assertion it is, rather than an error making the request
+        raise
     except Exception as ex:
         raise RuntimeError(f"Request Error: {ex}")
 
 
+def _get_max_response_bytes(context: Context, req_template: RequestTemplate) -> int:
+    "returns the largest response body the template accepts, falling back to the run-wide 'max_response_bytes' setting"
+    return req_template.max_response_bytes or int(context.config.userdata.get("max_response_bytes", 0))
+
+
+@when('User makes {authenticated} {request_type} request {request_template_name} to endpoint {endpoint} {repeat_count} times after {warmup_count} warm-up requests')
+def make_repeated_template_request(context: Context, authenticated: str, request_type: str, request_template_name: str, endpoint: str,
+                                   repeat_count: str, warmup_count: str) -> None:
+    """
+    make the same request repeatedly, recording the elapsed time of every request after the warm-up requests in
+        context.latency_histogram. The response of the last request is kept on the context the same as a single request
+    """
+    if int(repeat_count) <= 0 or int(warmup_count) < 0:
+        raise ValueError(f"Invalid Repeat Count; Repeats: {repeat_count}; Warm-Up: {warmup_count}")
+
+    histogram = LatencyHistogram()
+
+    for i in range(int(warmup_count) + int(repeat_count)):
+        make_template_request(context, authenticated, request_type, request_template_name, endpoint)
+
+        if i >= int(warmup_count):
+            histogram.record_ns(context.request_timings.durations_ns["total"])
+
+    context.latency_histogram = histogram
+
+
+@when('{users} users make {request_count} {authenticated} {request_type} requests {request_template_name} to endpoint {endpoint} concurrently')
+def make_concurrent_template_requests(context: Context, users: str, request_count: str, authenticated: str, request_type: str,
+                                      request_template_name: str, endpoint: str) -> None:
+    """
+    load test the endpoint, making request_count requests in total spread across the given number of concurrent users.
+    An optional table populates the template the same as a single request, the results are stored on context.load_results
+    """
+    if int(users) <= 0 or int(request_count) <= 0:
+        raise ValueError(f"Invalid Load Test Size; Users: {users}; Requests: {request_count}")
+
+    if request_type.lower().find("http") < 0:
+        raise TypeError(f"Protocol {request_type} Not Supported For Load Tests")
+
+    body_values = {}
+
+    if context.table is not None:
+        for row in context.table:
+            body_values[row["label"]] = row["values"]
+
+    load_engine = _get_load_engine(context)
+    auth_enabled = authenticated.lower() == "authenticated"
+    req_template = _get_request_template(context, request_template_name)
+    parsed_body = req_template.render_body(body_values)
+    # the options of the template sent with every request, the same as a single request
+    request_options: Dict[str, Any] = {
+        "max_response_bytes": _get_max_response_bytes(context, req_template),
+        "accept_encoding": req_template.accept_encoding,
+        "body_file": req_template.body_file,
+        "request_encoding": req_template.request_encoding,
+    }
+    auth_url, username, password = _get_auth_details(context, auth_enabled)
+    req_run: RequestRunner = request_factory(request_type, auth_url, username, password)
+    results = LoadTestResults()
+
+    def run_user(user_request_count: int) -> None:
+        "runs one user's share of the requests one after another"
+        for _ in range(user_request_count):
+            timings = RequestTimings()
+            start = time.perf_counter_ns()
+
+            try:
+                _, _, status_code = req_run.run_request(req_template.method, endpoint, req_template.content_type, parsed_body,
+                                                        req_template.query_params, req_template.render_headers(), auth_enabled, timings=timings,
+                                                        **request_options)
+                results.record(status_code, timings.durations_ns["total"], timings.response_bytes)
+            except Exception as ex:
+                results.record_error(str(ex), time.perf_counter_ns() - start)
+
+    user_count = min(int(users), int(request_count))
+    share, remainder = divmod(int(request_count), user_count)
+    user_request_counts = [share + (1 if i < remainder else 0) for i in range(user_count)]
+
+    start = time.perf_counter_ns()
+
+    if load_engine == "asyncio":
+        # no more requests can be in flight than there are users, so the runner's connections & threads are sized to them
+        max_concurrency = min(int(context.config.userdata.get("async_max_concurrency", DEFAULT_MAX_CONCURRENCY)), user_count)
+        async_run = async_request_factory(request_type, auth_url, username, password, max_concurrency)
+        asyncio.run(_run_async_load_test(async_run, req_template, endpoint, parsed_body, request_options, auth_enabled, user_request_counts, results))
+    else:
+        with ThreadPoolExecutor(max_workers=user_count) as executor:
+            for future in [executor.submit(run_user, user_request_count) for user_request_count in user_request_counts]:
+                future.result()
+
+    results.duration_ns = time.perf_counter_ns() - start
+    context.load_results = results
+
+
+def _get_load_engine(context: Context) -> str:
+    "returns the configured load engine, failing before any request is made if it cannot be used"
+    load_engine = context.config.userdata.get("load_engine", "threads")
+
+    if load_engine not in LOAD_ENGINES:
+        raise ValueError(f"Invalid Load Engine {load_engine}; Available: {', '.join(LOAD_ENGINES)}")
+
+    if load_engine == "asyncio" and aiohttp is None:
+        raise RuntimeError("The asyncio Load Engine Requires The aiohttp Package; Install requirements-async.txt")
+
+    return load_engine
+
+
+async def _run_async_load_test(async_run: AsyncRequestRunner, req_template: RequestTemplate, endpoint: str, parsed_body: Any,
+                               request_options: Dict[str, Any], auth_enabled: bool, user_request_counts: List[int], results: LoadTestResults) -> None:
+    "runs the load test with every user as a coroutine in one event loop, rather than a thread each"
+    async def run_user(user_request_count: int) -> None:
+        "runs one user's share of the requests one after another"
+        for _ in range(user_request_count):
+            timings = RequestTimings()
+            start = time.perf_counter_ns()
+
+            try:
+                _, _, status_code = await async_run.run_request(req_template.method, endpoint, req_template.content_type, parsed_body,
+                                                                req_template.query_params, req_template.render_headers(), auth_enabled, timings=timings,
+                                                                **request_options)
+                results.record(status_code, timings.durations_ns["total"], timings.response_bytes)
+            except Exception as ex:
+                results.record_error(str(ex), time.perf_counter_ns() - start)
+
+    try:
+        await asyncio.gather(*[run_user(user_request_count) for user_request_count in user_request_counts])
+    finally:
+        await async_run.close()
+
+
 @then('The response Status Code is {status_code}')
 def validate_status_code(context: Context, status_code: str) -> None:
     if not hasattr(context, "response_status_code"):
@@ -133,17 +287,20 @@ def validate_body_includes(context: Context, data_type: str) -> None:
         raise RuntimeError("Context Response Body Not Found")
 
     for row in context.table:
-        # exception raised from method if the request field does not exist
         if "label" not in row:
             raise ValueError("Table Formatting Incorrect: Missing Header 'label'")
 
+    # every path of the table is looked up in a single traversal of the body
+    values, errors = get_dot_paths_data(_get_response_body(context), tuple(row["label"] for row in context.table), data_type)
+
+    for row in context.table:
         dot_path = row["label"]
-        data = get_dot_path_data(context.response_body, dot_path, data_type)
 
-        if 'save_value' in row and row['save_value'] in ['True', 'true', 'Yes', 'yes', '1']:
-            if not hasattr(context, 'saved_results'):
-                context.saved_results = {}
-            context.saved_results[dot_path] = data
+        # the error of the first row whose field does not exist is raised
+        if dot_path in errors:
+            raise errors[dot_path]
+
+        _save_row_value(context, row, dot_path, values[dot_path])
 
 
 @then('The {data_type} response body contains')
@@ -153,21 +310,42 @@ def validate_body_contains(context: Context, data_type: str) -> None:
         raise RuntimeError("Context Response Body Not Found")
 
     for row in context.table:
-        # exception raised from method if the request field does not exist
         if "label" not in row or "values" not in row:
             raise ValueError("Table Formatting Incorrect: Missing Headers 'label' Or 'values'")
 
+    # every path of the table is looked up in a single traversal of the body
+    values, errors = get_dot_paths_data(_get_response_body(context), tuple(row["label"] for row in context.table), data_type)
+
+    for row in context.table:
         dot_path = row["label"]
         expected_data = row["values"]
-        data = get_dot_path_data(context.response_body, dot_path, data_type)
+
+        # the error of the first row whose field does not exist is raised
+        if dot_path in errors:
+            raise errors[dot_path]
+
+        data = values[dot_path]
 
         if str(data) != str(expected_data):
             raise ValueError(f"Data Does Not Match; Wanted: {expected_data}; Got: {data}")
 
-        if 'save_value' in row and row['save_value'] in ['True', 'true', 'Yes', 'yes', '1']:
-            if not hasattr(context, 'saved_results'):
-                context.saved_results = {}
-            context.saved_results[dot_path] = data
+        _save_row_value(context, row, dot_path, data)
+
+
+def _get_response_body(context: Context) -> Any:
+    "returns the response body on the context, decoding it the first time it is used"
+    if isinstance(context.response_body, LazyResponseBody):
+        return context.response_body.decode()
+
+    return context.response_body
+
+
+def _save_row_value(context: Context, row: Any, dot_path: str, data: Any) -> None:
+    "saves the data found at the dot path onto the context if the row asks for it"
+    if 'save_value' in row and row['save_value'] in ['True', 'true', 'Yes', 'yes', '1']:
+        if not hasattr(context, 'saved_results'):
+            context.saved_results = {}
+        context.saved_results[dot_path] = data
 
 
 @then('The {req_type} response header includes')
@@ -210,13 +388,180 @@ def validate_header_contains(context: Context, req_type: str) -> None:
 @then('the elapsed time is no more than {max_time} ms')
 def validate_request_time(context: Context, max_time: str) -> None:
     "ensures the time taken for the request is no longer than the given millisecond value"
-    if int(max_time) <= 0:
+    if float(max_time) <= 0:
         raise ValueError("Invalid max_time Value")
 
     if not hasattr(context, "end_time") or not hasattr(context, "start_time"):
         raise RuntimeError("end_time Or start_time Not Set On Context")
 
-    elapsed_time: int = context.end_time - context.start_time
+    elapsed_time: float = context.end_time - context.start_time
 
-    if elapsed_time > int(max_time):
+    if elapsed_time > float(max_time):
         raise ValueError(f"Request Took Too Long; Took: {elapsed_time}ms; Expected: {max_time}ms")
+
+
+@then('the response body is no more than {max_bytes} bytes')
+def validate_response_size(context: Context, max_bytes: str) -> None:
+    "ensures the response body downloaded for the request is no larger than the given number of bytes"
+    if int(max_bytes) < 0:
+        raise ValueError("Invalid max_bytes Value")
+
+    if not hasattr(context, "request_timings"):
+        raise RuntimeError("request_timings Not Set On Context")
+
+    response_bytes: int = context.request_timings.response_bytes
+
+    if response_bytes > int(max_bytes):
+        raise ValueError(f"Response Body Too Large; Got: {response_bytes} Bytes; Expected: {max_bytes} Bytes")
+
+
+@then('the response Content-Encoding is {encoding}')
+def validate_content_encoding(context: Context, encoding: str) -> None:
+    "ensures the response body was compressed with the given encoding, 'identity' if it was not compressed"
+    if not hasattr(context, "response_headers"):
+        raise RuntimeError("Context Response Headers Not Found")
+
+    content_encoding = "identity"
+
+    for field_name, field_value in context.response_headers.items():
+        if field_name.lower() == "content-encoding" and len(str(field_value).strip()):
+            content_encoding = str(field_value).strip()
+
+    if content_encoding.lower() != encoding.lower():
+        raise ValueError(f"Content-Encoding Is Not Equal; Wanted: {encoding}; Got: {content_encoding}")
+
+
+@then('the response compression ratio is at least {min_ratio}')
+def validate_compression_ratio(context: Context, min_ratio: str) -> None:
+    "ensures the response body was at least the given number of times smaller over the wire than after decompression"
+    if float(min_ratio) <= 0:
+        raise ValueError("Invalid min_ratio Value")
+
+    if not hasattr(context, "request_timings"):
+        raise RuntimeError("request_timings Not Set On Context")
+
+    timings: RequestTimings = context.request_timings
+    ratio = timings.compression_ratio()
+
+    if ratio < float(min_ratio):
+        raise ValueError(f"Response Compression Ratio Too Low; Got: {ratio:.2f} ({timings.wire_bytes} Bytes Over The Wire, "
+                         f"{timings.response_bytes} Bytes Decompressed); Expected: {min_ratio}")
+
+
+# the phase names accepted by the step, mapped to the phases recorded in RequestTimings
+timing_phases: Dict[str, str] = {
+    "dns": "dns",
+    "connect": "connect",
+    "tls": "tls",
+    "time to first byte": "ttfb",
+    "ttfb": "ttfb",
+    "download": "download",
+    "decompress": "decompress",
+    "decode": "decode",
+    "total": "total",
+}
+
+
+@then('the request {phase} phase took no more than {max_time} ms')
+def validate_request_phase_time(context: Context, phase: str, max_time: str) -> None:
+    "ensures the time taken for a single phase of the request (e.g. 'time to first byte') is no longer than the given millisecond value"
+    if float(max_time) <= 0:
+        raise ValueError("Invalid max_time Value")
+
+    if phase.lower() not in timing_phases:
+        raise ValueError(f"Unknown Request Phase {phase}; Supported: {', '.join(timing_phases)}")
+
+    if not hasattr(context, "request_timings"):
+        raise RuntimeError("request_timings Not Set On Context")
+
+    elapsed_time: float = context.request_timings.get_ms(timing_phases[phase.lower()])
+
+    if elapsed_time > float(max_time):
+        raise ValueError(f"Request {phase} Phase Took Too Long; Took: {elapsed_time}ms; Expected: {max_time}ms")
+
+
+@then('the load test error rate is no more than {max_rate} %')
+def validate_load_error_rate(context: Context, max_rate: str) -> None:
+    "ensures the percentage of load test requests that errored or returned a 4xx/5xx status code is no more than the given value"
+    if float(max_rate) < 0:
+        raise ValueError("Invalid max_rate Value")
+
+    if not hasattr(context, "load_results"):
+        raise RuntimeError("load_results Not Set On Context")
+
+    error_rate = context.load_results.error_rate()
+
+    if error_rate > float(max_rate):
+        raise ValueError(f"Load Test Error Rate Too High; Got: {error_rate:.2f}%; Expected: {max_rate}%; Errors: {context.load_results.error_messages}")
+
+
+@then('the load test throughput is at least {min_throughput} requests per second')
+def validate_load_throughput(context: Context, min_throughput: str) -> None:
+    "ensures the load test completed at least the given number of requests per second"
+    if float(min_throughput) <= 0:
+        raise ValueError("Invalid min_throughput Value")
+
+    if not hasattr(context, "load_results"):
+        raise RuntimeError("load_results Not Set On Context")
+
+    throughput = context.load_results.throughput()
+
+    if throughput < float(min_throughput):
+        raise ValueError(f"Load Test Throughput Too Low; Got: {throughput:.2f}/s; Expected: {min_throughput}/s")
+
+
+@then('the load test p{percentile} latency is no more than {max_time} ms')
+def validate_load_latency_percentile(context: Context, percentile: str, max_time: str) -> None:
+    "ensures the given latency percentile of the load test (e.g. p99) is no longer than the given millisecond value"
+    if float(max_time) <= 0:
+        raise ValueError("Invalid max_time Value")
+
+    if not hasattr(context, "load_results"):
+        raise RuntimeError("load_results Not Set On Context")
+
+    latency = context.load_results.percentile_ms(float(percentile))
+
+    if latency > float(max_time):
+        raise ValueError(f"Load Test p{percentile} Latency Too High; Got: {latency}ms; Expected: {max_time}ms")
+
+
+@then('the p{percentile} elapsed time is no more than {max_time} ms')
+def validate_request_time_percentile(context: Context, percentile: str, max_time: str) -> None:
+    "ensures the given percentile (e.g. p99) of the elapsed times of repeated requests is no longer than the given millisecond value"
+    if float(max_time) <= 0:
+        raise ValueError("Invalid max_time Value")
+
+    if not hasattr(context, "latency_histogram"):
+        raise RuntimeError("latency_histogram Not Set On Context")
+
+    elapsed_time = context.latency_histogram.value_at_percentile_ms(float(percentile))
+
+    if elapsed_time > float(max_time):
+        raise ValueError(f"p{percentile} Request Time Too Long; Took: {elapsed_time}ms; Expected: {max_time}ms")
+
+
+@then('the mean elapsed time is no more than {max_time} ms')
+def validate_request_time_mean(context: Context, max_time: str) -> None:
+    "ensures the mean elapsed time of repeated requests is no longer than the given millisecond value"
+    if float(max_time) <= 0:
+        raise ValueError("Invalid max_time Value")
+
+    if not hasattr(context, "latency_histogram"):
+        raise RuntimeError("latency_histogram Not Set On Context")
+
+    elapsed_time = context.latency_histogram.mean_ms()
+
+    if elapsed_time > float(max_time):
+        raise ValueError(f"Mean Request Time Too Long; Took: {elapsed_time}ms; Expected: {max_time}ms")
+
+
+@then('the elapsed time histogram is exported to {filepath}')
+def export_request_time_histogram(context: Context, filepath: str) -> None:
+    "writes the elapsed times of repeated requests to the given file as JSON, to track regressions across runs"
+    if not len(filepath):
+        raise ValueError("filepath Is Empty")
+
+    if not hasattr(context, "latency_histogram"):
+        raise RuntimeError("latency_histogram Not Set On Context")
+
+    context.latency_histogram.export(filepath)
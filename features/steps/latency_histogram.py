@@ -0,0 +1,148 @@
+import json
+import math
+from typing import Any, Dict, Tuple
+
+DEFAULT_SIGNIFICANT_FIGURES = 3
+
+# the percentiles written out with an exported histogram
+EXPORTED_PERCENTILES = (50.0, 90.0, 99.0, 99.9, 100.0)
+
+
+class LatencyHistogram():
+    """
+    HDR-style histogram of latencies recorded in microseconds. Values are bucketed so every recorded value keeps the
+        given number of significant figures of precision, in memory bounded by the range of values rather than the
+        number of samples.
+    Buckets double in width as the values grow, each split into the same number of linear sub-buckets
+    """
+
+    def __init__(self, significant_figures: int = DEFAULT_SIGNIFICANT_FIGURES):
+        if not 1 <= int(significant_figures) <= 5:
+            raise ValueError(f"Invalid Significant Figures: {significant_figures}")
+
+        self.significant_figures = int(significant_figures)
+        self._sub_bucket_bits = math.ceil(math.log2(2 * 10 ** self.significant_figures))
+        self._sub_bucket_count = 1 << self._sub_bucket_bits
+        self._sub_bucket_half = self._sub_bucket_count >> 1
+        self.counts: Dict[int, int] = {}
+        self.total_count = 0
+        self.min_us = 0
+        self.max_us = 0
+        self._sum_us = 0
+
+    def record_ns(self, duration_ns: int) -> None:
+        "records a latency given in nanoseconds"
+        self.record_us(duration_ns // 1000)
+
+    def record_us(self, value_us: int, count: int = 1) -> None:
+        "records a latency given in microseconds"
+        if value_us < 0:
+            raise ValueError(f"Invalid Latency: {value_us}")
+
+        index = self._index(value_us)
+        self.counts[index] = self.counts.get(index, 0) + count
+
+        if not self.total_count or value_us < self.min_us:
+            self.min_us = value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+
+        self.total_count += count
+        self._sum_us += value_us * count
+
+    def value_at_percentile_ms(self, percentile: float) -> float:
+        "returns the latency at the given percentile (0-100] in milliseconds"
+        if not 0 < percentile <= 100:
+            raise ValueError(f"Invalid Percentile: {percentile}")
+
+        if not self.total_count:
+            raise ValueError("No Latencies Recorded")
+
+        rank = max(math.ceil(percentile / 100 * self.total_count), 1)
+        seen = 0
+
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+
+            if seen >= rank:
+                # the highest value the bucket could hold, capped at the highest value actually recorded
+                return min(self._value_range(index)[1], self.max_us) / 1000
+
+        return self.max_us / 1000
+
+    def mean_ms(self) -> float:
+        "returns the exact mean latency in milliseconds"
+        if not self.total_count:
+            raise ValueError("No Latencies Recorded")
+
+        return self._sum_us / self.total_count / 1000
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        "adds the recorded values of another histogram with the same precision to this one"
+        if other.significant_figures != self.significant_figures:
+            raise ValueError("Cannot Merge Histograms With Different Significant Figures")
+
+        if not other.total_count:
+            return
+
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+
+        self.min_us = other.min_us if not self.total_count else min(self.min_us, other.min_us)
+        self.max_us = max(self.max_us, other.max_us)
+        self.total_count += other.total_count
+        self._sum_us += other._sum_us
+
+    def to_dict(self) -> Dict[str, Any]:
+        "returns the histogram and its summary figures as a JSON serialisable dict"
+        result: Dict[str, Any] = {
+            "significant_figures": self.significant_figures,
+            "unit": "us",
+            "total_count": self.total_count,
+            "min": self.min_us,
+            "max": self.max_us,
+            "sum": self._sum_us,
+            "counts": {str(index): count for index, count in sorted(self.counts.items())},
+        }
+
+        if self.total_count:
+            result["mean_ms"] = self.mean_ms()
+            result["percentiles_ms"] = {str(p): self.value_at_percentile_ms(p) for p in EXPORTED_PERCENTILES}
+
+        return result
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        "loads a histogram previously exported with 'to_dict'"
+        histogram = cls(data["significant_figures"])
+        histogram.counts = {int(index): int(count) for index, count in data["counts"].items()}
+        histogram.total_count = int(data["total_count"])
+        histogram.min_us = int(data["min"])
+        histogram.max_us = int(data["max"])
+        histogram._sum_us = int(data["sum"])
+        return histogram
+
+    def export(self, filepath: str) -> None:
+        "writes the histogram to the given file as JSON so it can be compared with later runs"
+        try:
+            with open(filepath, "w") as fhandle:
+                json.dump(self.to_dict(), fhandle, indent=4)
+        except Exception as ex:
+            raise RuntimeError(f"Ex Exporting Histogram To {filepath}: {str(ex)}")
+
+    def _index(self, value_us: int) -> int:
+        "returns the bucket index of the value"
+        if value_us < self._sub_bucket_count:
+            return value_us
+
+        bucket = value_us.bit_length() - self._sub_bucket_bits
+        return bucket * self._sub_bucket_half + (value_us >> bucket)
+
+    def _value_range(self, index: int) -> Tuple[int, int]:
+        "returns the lowest & highest values held by the bucket index"
+        if index < self._sub_bucket_count:
+            return index, index
+
+        bucket = (index - self._sub_bucket_count) // self._sub_bucket_half + 1
+        lowest = (index - bucket * self._sub_bucket_half) << bucket
+        return lowest, lowest + (1 << bucket) - 1
@@ -0,0 +1,91 @@
+import threading
+from array import array
+from typing import Dict
+
+from features.steps.latency_histogram import LatencyHistogram
+
+# the number of distinct request error messages kept, the rest are only counted
+MAX_ERROR_MESSAGES = 10
+
+
+class LoadTestResults():
+    """
+    Compact per-request results of a load test: status code and response body size held in typed arrays, latencies
+        in a LatencyHistogram. Requests that raised an error are recorded with a status code of 0
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.status_codes = array("H")
+        self.latencies = LatencyHistogram()
+        self.body_sizes = array("Q")
+        self.error_messages: Dict[str, int] = {}
+        self.duration_ns = 0
+
+    def record(self, status_code: int, latency_ns: int, body_size: int) -> None:
+        "records the result of a single request, safe to call from many threads"
+        with self._lock:
+            self.status_codes.append(status_code)
+            self.latencies.record_ns(max(latency_ns, 0))
+            self.body_sizes.append(body_size)
+
+    def record_error(self, message: str, latency_ns: int) -> None:
+        "records a request that raised an error instead of returning a response"
+        with self._lock:
+            self.status_codes.append(0)
+            self.latencies.record_ns(max(latency_ns, 0))
+            self.body_sizes.append(0)
+
+            if message in self.error_messages or len(self.error_messages) < MAX_ERROR_MESSAGES:
+                self.error_messages[message] = self.error_messages.get(message, 0) + 1
+
+    def __len__(self) -> int:
+        return len(self.status_codes)
+
+    def error_count(self) -> int:
+        "returns the number of requests that raised an error or returned a 4xx/5xx status code"
+        return sum(1 for status_code in self.status_codes if status_code == 0 or status_code >= 400)
+
+    def error_rate(self) -> float:
+        "returns the percentage of requests that were errors"
+        if not len(self):
+            raise ValueError("No Requests Recorded")
+
+        return self.error_count() * 100 / len(self)
+
+    def throughput(self) -> float:
+        "returns the number of requests completed per second over the whole load test"
+        if self.duration_ns <= 0:
+            raise ValueError("Load Test Duration Not Recorded")
+
+        return len(self) * 1_000_000_000 / self.duration_ns
+
+    def percentile_ms(self, percentile: float) -> float:
+        "returns the latency at the given percentile (0-100] in milliseconds, to the precision of the histogram"
+        if not 0 < percentile <= 100:
+            raise ValueError(f"Invalid Percentile: {percentile}")
+
+        if not len(self):
+            raise ValueError("No Requests Recorded")
+
+        return self.latencies.value_at_percentile_ms(percentile)
+
+    def mean_ms(self) -> float:
+        "returns the mean latency in milliseconds"
+        if not len(self):
+            raise ValueError("No Requests Recorded")
+
+        return self.latencies.mean_ms()
+
+    def summary(self) -> Dict[str, float]:
+        "returns the headline figures of the load test"
+        return {
+            "requests": len(self),
+            "errors": self.error_count(),
+            "error_rate": self.error_rate(),
+            "throughput": self.throughput() if self.duration_ns > 0 else 0.0,
+            "mean_ms": self.mean_ms(),
+            "p50_ms": self.percentile_ms(50),
+            "p99_ms": self.percentile_ms(99),
+            "total_bytes": sum(self.body_sizes),
+        }
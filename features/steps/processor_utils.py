@@ -1,37 +1,169 @@
 import time
-from typing import Any
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
+from generic_api.json_stream import PartialJSONBody
 
-def _get_dot_path_json_data(input_data: dict, dot_path: str) -> Any:
-    "traverses down the JSON looking for the given path, returns data at that point or raises exception"
-    split_path = dot_path.split(".")
-    resp_level = input_data
-    count = 1
+# the number of compiled dot paths & dot path tables kept in memory
+DOT_PATH_CACHE_SIZE = 1024
+
+# a dot path segment: the key, and the key parsed as an array index if it is an integer
+Segment = Tuple[str, Optional[int]]
+
+
+def _parse_segment(key: str) -> Segment:
+    "splits out the array index of a dot path segment once, rather than on every traversal"
+    try:
+        return key, int(key)
+    except ValueError:
+        return key, None
+
+
+def _step(level: Any, segment: Segment, dot_path: str) -> Any:
+    "returns the data at the segment of a single JSON level, or raises ValueError if it does not exist"
+    key, index = segment
 
     try:
-        for s_level in split_path:
-            if isinstance(resp_level, list) or isinstance(resp_level, tuple):
-                resp_level = resp_level[int(s_level)]
-            else:
-                resp_level = resp_level[s_level]
-
-            if count == len(split_path):
-                return resp_level
-            else:
-                count = count + 1
+        if isinstance(level, (list, tuple)):
+            if index is None:
+                raise ValueError(f"Invalid Array Index {key} In Path: {dot_path}")
+            return level[index]
+
+        return level[key]
     except KeyError as ex:
         raise ValueError(f"Required Key {str(ex)} Not Found In Response: {dot_path}")
-    except IndexError as ex:
+    except IndexError:
         raise ValueError(f"Required Index Not Found In Response: {dot_path}")
+    except TypeError:
+        raise ValueError(f"Required Key '{key}' Not Found In Response: {dot_path}")
+
+
+class DotPath():
+    "a dot path compiled once into its key & integer index segments, used to look up data in a JSON structure"
+
+    def __init__(self, dot_path: str):
+        self.path = dot_path
+        self.segments: Tuple[Segment, ...] = tuple(_parse_segment(key) for key in dot_path.split("."))
+
+    def get(self, input_data: Any) -> Any:
+        "traverses down the JSON looking for the path, returns data at that point or raises exception"
+        level = input_data
+
+        for segment in self.segments:
+            level = _step(level, segment, self.path)
+
+        return level
+
+
+class _DotPathNode():
+    "a segment of the dot paths in a DotPathTree, shared by every path starting with the same segments"
+
+    def __init__(self, segment: Segment):
+        self.segment = segment
+        self.children: Dict[Segment, "_DotPathNode"] = {}
+        # the paths ending at this node, and every path ending at or below it
+        self.paths: List[str] = []
+        self.subtree_paths: List[str] = []
+
+
+class DotPathTree():
+    """
+    The dot paths of a whole table compiled into a tree of their segments, so paths sharing a prefix are looked up
+        together in a single traversal of the response rather than each from the root
+    """
+
+    def __init__(self, dot_paths: Tuple[str, ...]):
+        self.paths = dot_paths
+        self._root = _DotPathNode(("", None))
+
+        for dot_path in dict.fromkeys(dot_paths):
+            node = self._root
+
+            for segment in compile_dot_path(dot_path).segments:
+                node.subtree_paths.append(dot_path)
+                node = node.children.setdefault(segment, _DotPathNode(segment))
+
+            node.subtree_paths.append(dot_path)
+            node.paths.append(dot_path)
+
+    def resolve(self, input_data: Any) -> Tuple[Dict[str, Any], Dict[str, ValueError]]:
+        "returns the data found at each dot path, and the error for each dot path that could not be found"
+        values: Dict[str, Any] = {}
+        errors: Dict[str, ValueError] = {}
+        self._resolve_node(self._root, input_data, values, errors)
+        return values, errors
+
+    def _resolve_node(self, node: _DotPathNode, level: Any, values: Dict[str, Any], errors: Dict[str, ValueError]) -> None:
+        "resolves the children of the node from the data found at it"
+        for child in node.children.values():
+            try:
+                child_level = _step(level, child.segment, child.subtree_paths[0])
+            except ValueError:
+                # every path below the missing segment is missing too, each reported with its own path
+                for dot_path in child.subtree_paths:
+                    try:
+                        _step(level, child.segment, dot_path)
+                    except ValueError as ex:
+                        errors[dot_path] = ex
+                continue
+
+            for dot_path in child.paths:
+                values[dot_path] = child_level
+
+            self._resolve_node(child, child_level, values, errors)
+
+
+@lru_cache(maxsize=DOT_PATH_CACHE_SIZE)
+def compile_dot_path(dot_path: str) -> DotPath:
+    "returns the compiled dot path, compiled only the first time the path is seen"
+    return DotPath(dot_path)
+
+
+@lru_cache(maxsize=DOT_PATH_CACHE_SIZE)
+def compile_dot_path_tree(dot_paths: Tuple[str, ...]) -> DotPathTree:
+    "returns the compiled tree of the dot paths of a table, compiled only the first time the table is seen"
+    return DotPathTree(dot_paths)
 
 
 def get_dot_path_data(input_data: dict, dot_path: str, data_type: str) -> Any:
     "traverses down the data_type looking for the given path, returns data at that point or raises exception"
     if data_type.lower() == "json":
-        return _get_dot_path_json_data(input_data, dot_path)
+        if isinstance(input_data, PartialJSONBody):
+            return input_data.get(dot_path)
+
+        return compile_dot_path(dot_path).get(input_data)
+
+    raise TypeError(f"Data Type {data_type} Not Supported")
+
+
+def get_dot_paths_data(input_data: dict, dot_paths: Tuple[str, ...], data_type: str) -> Tuple[Dict[str, Any], Dict[str, ValueError]]:
+    """
+    looks up every dot path of a table in one traversal of the data_type, returns the data found at each path and
+        the error for each path that could not be found
+    """
+    if data_type.lower() == "json":
+        if isinstance(input_data, PartialJSONBody):
+            return _get_partial_paths_data(input_data, dot_paths)
+
+        return compile_dot_path_tree(tuple(dot_paths)).resolve(input_data)
 
     raise TypeError(f"Data Type {data_type} Not Supported")
 
 
-def get_current_time_ms() -> int:
-    return int(time.time()) * 1000
+def _get_partial_paths_data(input_data: PartialJSONBody, dot_paths: Tuple[str, ...]) -> Tuple[Dict[str, Any], Dict[str, ValueError]]:
+    "returns the data of each dot path extracted from a streamed body, and the error for each path that was not"
+    values: Dict[str, Any] = {}
+    errors: Dict[str, ValueError] = {}
+
+    for dot_path in dot_paths:
+        try:
+            values[dot_path] = input_data.get(dot_path)
+        except ValueError as ex:
+            errors[dot_path] = ex
+
+    return values, errors
+
+
+def get_current_time_ms() -> float:
+    "returns a monotonic time in milliseconds with sub-millisecond precision, only useful for measuring durations"
+    return time.perf_counter_ns() / 1_000_000
@@ -0,0 +1,246 @@
+import json
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from features.steps.template_cache import template_cache
+from generic_api.request_runner import REQUEST_ENCODINGS
+
+# a '{{ NAME }}' placeholder, substituted without going through Jinja2
+_PLACEHOLDER = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+# Jinja2 drops a single newline from the end of the rendered text
+_TRAILING_NEWLINE = re.compile(r"\n\Z")
+
+# safe default for most cases
+DEFAULT_CONTENT_TYPE = "application/json"
+
+# renders a pre-located placeholder position with the request values
+Renderer = Callable[[Dict[str, Any]], Any]
+
+# a part of a tokenized string: whether it is a placeholder, and its name or literal text
+TextPart = Tuple[bool, str]
+
+
+def _is_template_text(text: str) -> bool:
+    "returns True if the text contains any Jinja2 syntax"
+    return "{{" in text or "{%" in text or "{#" in text
+
+
+def tokenize_text(text: str) -> Optional[List[TextPart]]:
+    """
+    splits the text into its literal parts and '{{ NAME }}' placeholders in a single scan, returns None if it holds
+        any other Jinja2 syntax (filters, expressions, blocks or comments), malformed tags such as '{{{ NAME }}' or
+        names Jinja2 does not look up in the values (e.g. 'true' or 'range'), which need the full engine
+    """
+    # Jinja2 normalises line endings to '\n'
+    if "\r" in text:
+        return None
+
+    parts: List[TextPart] = []
+    pos = 0
+
+    for match in _PLACEHOLDER.finditer(text):
+        # a '{' opening the placeholder is not a placeholder to Jinja2, but a syntax error
+        if match.start() > 0 and text[match.start() - 1] == "{":
+            return None
+
+        if not template_cache.is_plain_name(match.group(1)):
+            return None
+
+        if match.start() > pos:
+            parts.append((False, text[pos:match.start()]))
+
+        parts.append((True, match.group(1)))
+        pos = match.end()
+
+    if pos < len(text):
+        parts.append((False, _TRAILING_NEWLINE.sub("", text[pos:])))
+
+    if any(not is_slot and _is_template_text(part) for is_slot, part in parts):
+        return None
+
+    return parts
+
+
+def _slot_value(values: Dict[str, Any], name: str) -> str:
+    "matches Jinja2, which renders missing values as an empty string"
+    if name not in values:
+        return ""
+
+    return str(values[name])
+
+
+def _compile_text(text: str) -> Renderer:
+    "compiles a string containing placeholders to a renderer"
+    parts = tokenize_text(text)
+
+    if parts is None:
+        def render_text(values: Dict[str, Any]) -> Any:
+            return template_cache.render(text, values)
+
+        return render_text
+
+    if len(parts) == 1:
+        name = parts[0][1]
+
+        def render_slot(values: Dict[str, Any]) -> Any:
+            return _slot_value(values, name)
+
+        return render_slot
+
+    def render_parts(values: Dict[str, Any]) -> Any:
+        return "".join(_slot_value(values, part) if is_slot else part for is_slot, part in parts)
+
+    return render_parts
+
+
+@lru_cache(maxsize=256)
+def compile_text(text: str) -> Renderer:
+    "returns the renderer of a string, the same string is only tokenized once"
+    if not _is_template_text(text):
+        # rendered the same as Jinja2 would, without the single trailing newline
+        rendered = _TRAILING_NEWLINE.sub("", text)
+        return lambda values: rendered
+
+    return _compile_text(text)
+
+
+def _compile_node(node: Any) -> Tuple[bool, Any]:
+    """
+    compiles a parsed JSON node, returns (False, node) if it contains no placeholders so it can be shared as-is,
+        otherwise (True, renderer)
+    """
+    if isinstance(node, str):
+        if _is_template_text(node):
+            return True, _compile_text(node)
+        return False, node
+
+    if isinstance(node, dict):
+        entries: List[Tuple[bool, Any, bool, Any]] = []
+        dynamic = False
+
+        for key, value in node.items():
+            key_dynamic, key_part = _compile_node(key)
+            value_dynamic, value_part = _compile_node(value)
+            dynamic = dynamic or key_dynamic or value_dynamic
+            entries.append((key_dynamic, key_part, value_dynamic, value_part))
+
+        if not dynamic:
+            return False, node
+
+        def render_dict(values: Dict[str, Any]) -> Any:
+            return {
+                (key_part(values) if key_dynamic else key_part): (value_part(values) if value_dynamic else value_part)
+                for key_dynamic, key_part, value_dynamic, value_part in entries
+            }
+
+        return True, render_dict
+
+    if isinstance(node, list):
+        items = [_compile_node(item) for item in node]
+
+        if not any(item_dynamic for item_dynamic, _ in items):
+            return False, node
+
+        def render_list(values: Dict[str, Any]) -> Any:
+            return [item_part(values) if item_dynamic else item_part for item_dynamic, item_part in items]
+
+        return True, render_list
+
+    return False, node
+
+
+class RequestTemplate():
+    """
+    A request template parsed & validated once when it is registered, holding the method, headers, query params and
+        body of the request with the positions of the body placeholders pre-located.
+    Rendering only substitutes the request values into those positions, parts of the body without placeholders are
+        shared between requests and must not be modified
+    """
+
+    def __init__(self, raw_template: str):
+        try:
+            req_data = json.loads(raw_template)
+        except ValueError as ex:
+            raise ValueError(f"Template Is Not Valid JSON: {str(ex)}")
+
+        if not isinstance(req_data, dict):
+            raise ValueError("Template Must Be A JSON Object")
+
+        if "method" not in req_data:
+            raise ValueError("No Method In Template")
+
+        self.data: Dict[str, Any] = req_data
+        self.method: str = str(req_data["method"]).upper()
+        self.query_params: Dict[str, Any] = req_data.get("query_params", {})
+        self.headers: Dict[str, Any] = req_data.get("headers", {})
+        self.has_body = "body" in req_data
+        # opt-in for very large JSON responses, only the paths checked by the scenario are decoded from the response
+        self.stream_response = req_data.get("stream_response", False)
+
+        if not isinstance(self.stream_response, bool):
+            raise ValueError("stream_response Must Be true Or false")
+
+        # the largest response body accepted for the template, 0 falls back to the 'max_response_bytes' run setting
+        self.max_response_bytes = req_data.get("max_response_bytes", 0)
+
+        if not isinstance(self.max_response_bytes, int) or isinstance(self.max_response_bytes, bool) or self.max_response_bytes < 0:
+            raise ValueError("max_response_bytes Must Be A Whole Number Of Bytes")
+
+        # the compressions the server may use for the response, sent as the Accept-Encoding header e.g. "gzip, deflate"
+        accept_encoding = req_data.get("accept_encoding", "")
+
+        if isinstance(accept_encoding, list) and all(isinstance(encoding, str) for encoding in accept_encoding):
+            accept_encoding = ", ".join(accept_encoding)
+
+        if not isinstance(accept_encoding, str):
+            raise ValueError("accept_encoding Must Be A String Or A List Of Strings")
+
+        self.accept_encoding: str = accept_encoding
+
+        # a file whose content is streamed as the body, for payloads too large to hold in memory; it is sent as-is
+        self.body_file = req_data.get("body_file", "")
+
+        if not isinstance(self.body_file, str):
+            raise ValueError("body_file Must Be A File Path")
+
+        if self.has_body and len(self.body_file):
+            raise ValueError("Template Cannot Have Both A body And A body_file")
+
+        # compresses the request body, sent with the matching Content-Encoding header
+        self.request_encoding = req_data.get("request_encoding", "")
+
+        if self.request_encoding not in ("", *REQUEST_ENCODINGS):
+            raise ValueError(f"Unsupported request_encoding {self.request_encoding}; Available: {', '.join(REQUEST_ENCODINGS)}")
+
+        if self.has_body or len(self.body_file):
+            if "content_type" in req_data:
+                self.content_type = req_data["content_type"]
+            elif "Content-Type" in self.headers:
+                self.content_type = self.headers["Content-Type"]
+            else:
+                self.content_type = DEFAULT_CONTENT_TYPE
+        else:
+            self.content_type = ""
+
+        self.body = req_data["body"] if self.has_body else {}
+
+        self._body_dynamic, self._body_part = _compile_node(self.body)
+
+    def render_body(self, values: Dict[str, Any]) -> Any:
+        "returns the body with the given values substituted into its placeholders"
+        if not self._body_dynamic or not len(values):
+            # placeholders are left as-is if there are no values to render, as before templates were pre-parsed
+            return self.body
+
+        return self._body_part(values)
+
+    def render_headers(self) -> Dict[str, Any]:
+        "returns a copy of the headers, the request runner adds to the headers it is given"
+        return dict(self.headers)
+
+
+@lru_cache(maxsize=256)
+def compile_request_template(raw_template: str) -> RequestTemplate:
+    "parses the raw template text, the same text registered again (e.g. by every scenario's Background) is parsed once"
+    return RequestTemplate(raw_template)
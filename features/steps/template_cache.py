@@ -0,0 +1,115 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from jinja2 import BaseLoader, Environment, FileSystemBytecodeCache, Template, TemplateNotFound
+
+DEFAULT_CACHE_SIZE = 256
+# names Jinja2 parses as constants, an operator or the template itself, rather than looking them up in the values the
+# template is rendered with
+JINJA_LITERALS = frozenset(("true", "false", "none", "True", "False", "None", "not", "self"))
+
+
+class _SourceLoader(BaseLoader):
+    "serves the sources being compiled by the TemplateCache, loading through the environment applies its bytecode cache"
+
+    def __init__(self) -> None:
+        self.sources: Dict[str, str] = {}
+
+    def get_source(self, environment: Environment, template: str) -> Tuple[str, Optional[str], Callable[[], bool]]:
+        if template not in self.sources:
+            raise TemplateNotFound(template)
+
+        return self.sources[template], None, lambda: True
+
+
+class TemplateCache():
+    """
+    Bounded LRU cache of compiled Jinja2 templates keyed by their source text, sharing a single Environment.
+    If a bytecode cache directory is configured, compiled templates are also written to disk so later runs skip
+        compilation for sources they have not seen yet in this process
+    """
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE, bytecode_cache_dir: str = ""):
+        self._lock = threading.Lock()
+        self._templates: "OrderedDict[str, Template]" = OrderedDict()
+        self._loader = _SourceLoader()
+        self.max_size = DEFAULT_CACHE_SIZE
+        self.hits = 0
+        self.misses = 0
+        self.environment = Environment(loader=self._loader, cache_size=0)
+        self.configure(max_size, bytecode_cache_dir)
+
+    def configure(self, max_size: int, bytecode_cache_dir: str = "") -> None:
+        "sets the cache size and the optional on-disk bytecode cache, clears any cached templates"
+        if int(max_size) <= 0:
+            raise ValueError(f"Invalid Template Cache Size: {max_size}")
+
+        with self._lock:
+            self.max_size = int(max_size)
+
+            if len(bytecode_cache_dir):
+                os.makedirs(bytecode_cache_dir, exist_ok=True)
+                self.environment.bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+            else:
+                self.environment.bytecode_cache = None
+
+            self._clear()
+
+    def get_template(self, source: str) -> Template:
+        "returns the compiled template for the given source, compiling it on a miss"
+        with self._lock:
+            template = self._templates.get(source)
+
+            if template is not None:
+                self.hits += 1
+                self._templates.move_to_end(source)
+                return template
+
+            self.misses += 1
+            name = hashlib.sha256(source.encode("utf-8")).hexdigest()
+            self._loader.sources[name] = source
+
+            try:
+                template = self.environment.get_template(name)
+            finally:
+                del self._loader.sources[name]
+
+            self._templates[source] = template
+
+            while len(self._templates) > self.max_size:
+                self._templates.popitem(last=False)
+
+            return template
+
+    def is_plain_name(self, name: str) -> bool:
+        "whether '{{ name }}' renders the value of the name, rather than a Jinja2 literal or a global of the environment"
+        return name not in JINJA_LITERALS and name not in self.environment.globals
+
+    def render(self, source: str, values: Dict[str, Any]) -> str:
+        "renders the given template source with the given values"
+        return self.get_template(source).render(values)
+
+    def clear(self) -> None:
+        "removes every cached template and resets the counters"
+        with self._lock:
+            self._clear()
+
+    def info(self) -> Dict[str, int]:
+        "returns the cache counters"
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._templates), "max_size": self.max_size}
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def _clear(self) -> None:
+        "clears the cache, caller must hold the lock"
+        self._templates.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# shared by every step so a template source is only compiled once per run
+template_cache = TemplateCache()
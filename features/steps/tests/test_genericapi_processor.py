@@ -1,9 +1,23 @@
 from unittest import mock, main, TestCase
 import json
 
+from behave.model import Table
 from behave.runner import Context
 
 from features.steps import genericapi_processor as genapi
+from generic_api.request_runner import ResponseTooLargeError
+from generic_api.request_timing import RequestTimings
+from generic_api.lazy_body import LazyResponseBody
+from features.steps.request_template import RequestTemplate
+from features.steps.load_results import LoadTestResults
+from features.steps.latency_histogram import LatencyHistogram
+
+
+def _step(name, table=None):
+    "returns a mocked scenario step with the given text & table"
+    step = mock.MagicMock(table=table)
+    step.name = name
+    return step
 
 
 class TestPopulateTemplate(TestCase):
@@ -31,20 +45,38 @@ class TestAddRequestTemplate(TestCase):
     def test_valid_1(self):
         "succesfully add a request template to the context"
         m_context = Context(mock.MagicMock())
-        m_context.text = "template"
+        m_context.text = json.dumps({"method": "post", "headers": {"X-Test": "1"}, "body": {"foo": "{{FOO}}"}})
 
         self.assertIsNone(genapi.add_request_template(m_context, "test_req"))
 
         self.assertTrue(hasattr(m_context, "templates"))
         self.assertIsInstance(m_context.templates, dict)
         self.assertIn("test_req", m_context.templates)
-        self.assertEqual(m_context.templates["test_req"], "template")
+        self.assertIsInstance(m_context.templates["test_req"], RequestTemplate)
+        self.assertEqual(m_context.templates["test_req"].method, "POST")
+        self.assertEqual(m_context.templates["test_req"].content_type, "application/json")
 
     def test_invalid_1(self):
         "given request name is invalid"
         with self.assertRaises(ValueError):
             genapi.add_request_template(mock.MagicMock(), "")
 
+    def test_invalid_2(self):
+        "given template is not valid JSON"
+        m_context = Context(mock.MagicMock())
+        m_context.text = "template"
+
+        with self.assertRaises(ValueError):
+            genapi.add_request_template(m_context, "test_req")
+
+    def test_invalid_3(self):
+        "given template has no method"
+        m_context = Context(mock.MagicMock())
+        m_context.text = json.dumps({"body": {}})
+
+        with self.assertRaises(ValueError):
+            genapi.add_request_template(m_context, "test_req")
+
 
 class TestMakeTemplateRequest(TestCase):
     "test class for the method 'make_template_request'"
@@ -52,7 +84,9 @@ class TestMakeTemplateRequest(TestCase):
     @mock.patch("features.steps.genericapi_processor.request_factory", return_value=mock.MagicMock())
     def test_valid_1(self, m_factory):
         "succesfully make a template request, POST method, auth enabled"
-        m_context = Context(mock.MagicMock())
+        m_runner = mock.MagicMock()
+        m_runner.config.userdata = {"max_response_bytes": "1024"}
+        m_context = Context(m_runner)
         m_context.table = [{"label": "HELLO", "values": "hello"}, {"label": "WORLD", "values": "world"}]
         m_context.default_values = {
             "Auth URL": "http://localhost/auth/login",
@@ -81,6 +115,10 @@ class TestMakeTemplateRequest(TestCase):
         self.assertIsNone(m_context.response_body)
         self.assertDictEqual(m_context.response_headers, {})
         self.assertEqual(m_context.response_status_code, 201)
+        m_factory.return_value.run_request.assert_called_once_with(
+            "POST", "http://localhost/blob", "application/json", {"hello": "world"}, {}, {}, True, timings=m_context.request_timings,
+            stream_paths=None, lazy_decode=True, max_response_bytes=1024, accept_encoding="",
+            body_file="", request_encoding="")
 
     @mock.patch("features.steps.genericapi_processor.request_factory", return_value=mock.MagicMock())
     def test_valid_2(self, m_factory):
@@ -101,9 +139,11 @@ class TestMakeTemplateRequest(TestCase):
 
         self.assertTrue(hasattr(m_context, "start_time"))
         self.assertTrue(hasattr(m_context, "end_time"))
+        self.assertTrue(hasattr(m_context, "request_timings"))
         self.assertTrue(hasattr(m_context, "response_body"))
         self.assertTrue(hasattr(m_context, "response_headers"))
         self.assertTrue(hasattr(m_context, "response_status_code"))
+        self.assertIs(m_factory.return_value.run_request.call_args.kwargs["timings"], m_context.request_timings)
         self.assertDictEqual(m_context.response_body, {"foo": "bar"})
         self.assertDictEqual(m_context.response_headers, {})
         self.assertEqual(m_context.response_status_code, 200)
@@ -171,6 +211,24 @@ class TestMakeTemplateRequest(TestCase):
         self.assertDictEqual(m_context.response_headers, {})
         self.assertEqual(m_context.response_status_code, 201)
 
+    @mock.patch("features.steps.genericapi_processor.request_factory", return_value=mock.MagicMock())
+    def test_valid_5(self, m_factory):
+        "a streamed response is requested with the paths checked by the scenario's body assertion steps"
+        m_context = Context(mock.MagicMock())
+        m_context.default_values = {}
+        m_context.templates = {"test_template": json.dumps({"method": "GET", "stream_response": True})}
+        m_context.scenario = mock.MagicMock(all_steps=[
+            _step("User makes un-authenticated http request test_template to endpoint x containing"),
+            _step("The json response body includes", Table(["label"], rows=[["items.0.id"], ["total"]])),
+            _step("The json response body contains", Table(["label", "values"], rows=[["total", "2"], ["next", "None"]])),
+            _step("The http response header contains", Table(["label", "values"], rows=[["X-Header", "1"]])),
+        ])
+        m_factory.return_value.run_request.return_value = (None, {}, 200)
+
+        self.assertIsNone(genapi.make_template_request(m_context, "un-authenticated", "http", "test_template", "http://localhost/blob"))
+
+        self.assertEqual(m_factory.return_value.run_request.call_args.kwargs["stream_paths"], ("items.0.id", "total", "next"))
+
     @mock.patch("features.steps.genericapi_processor.request_factory", return_value=mock.MagicMock())
     def test_invalid_1(self, m_factory):
         "exception whilst running request"
@@ -220,6 +278,19 @@ class TestMakeTemplateRequest(TestCase):
         with self.assertRaises(ValueError):
             genapi.make_template_request(m_context, "authenticated", "http", "test_template", "http://localhost/blob")
 
+    @mock.patch("features.steps.genericapi_processor.request_factory", return_value=mock.MagicMock())
+    def test_invalid_4(self, m_factory):
+        "the response is larger than the template allows, reported as a failed assertion rather than a request error"
+        m_context = Context(mock.MagicMock())
+        m_context.default_values = {}
+        m_context.templates = {"test_template": json.dumps({"method": "GET", "max_response_bytes": 10})}
+        m_factory.return_value.run_request.side_effect = ResponseTooLargeError("GET", "http://localhost/blob", 10, 11)
+
+        with self.assertRaises(ResponseTooLargeError):
+            genapi.make_template_request(m_context, "un-authenticated", "http", "test_template", "http://localhost/blob")
+
+        self.assertEqual(m_factory.return_value.run_request.call_args.kwargs["max_response_bytes"], 10)
+
 
 class TestValidateStatusCode(TestCase):
     "test class for the method 'genapi.validate_status_code'"
@@ -269,6 +340,20 @@ class TestValidateBodyIncludes(TestCase):
 
         self.assertFalse(hasattr(m_context, "saved_results"))
 
+    def test_valid_3(self):
+        "a lazily decoded body is decoded once, shared by every body assertion"
+        m_decoder = mock.MagicMock(return_value={"foo": {"bar": 1234}})
+        m_context = Context(mock.MagicMock())
+        m_context.table = [{"label": "foo.bar"}]
+        m_context.response_body = LazyResponseBody(b'{"foo": {"bar": 1234}}', m_decoder)
+
+        self.assertIsNone(genapi.validate_body_includes(m_context, "json"))
+
+        m_context.table = [{"label": "foo.bar", "values": "1234"}]
+        self.assertIsNone(genapi.validate_body_contains(m_context, "json"))
+
+        self.assertEqual(m_decoder.call_count, 1)
+
     def test_invalid_1(self):
         "requested dot path cannot be found"
         m_context = Context(mock.MagicMock())
@@ -375,6 +460,21 @@ class TestValidateBodyContains(TestCase):
         with self.assertRaises(ValueError):
             genapi.validate_body_contains(m_context, "json")
 
+    def test_invalid_4(self):
+        "the error of the first missing row is raised, after the rows before it are saved"
+        m_context = Context(mock.MagicMock())
+        m_context.table = [
+            {"label": "foo.bar", "values": 1234, "save_value": "yes"},
+            {"label": "foo.first", "values": 1, "save_value": "no"},
+            {"label": "foo.second", "values": 2, "save_value": "no"},
+        ]
+        m_context.response_body = {"foo": {"bar": 1234}}
+
+        with self.assertRaisesRegex(ValueError, "foo.first"):
+            genapi.validate_body_contains(m_context, "json")
+
+        self.assertEqual(m_context.saved_results, {"foo.bar": 1234})
+
 
 class TestValidateHeaderIncludes(TestCase):
     "test class for the method 'genapi.validate_header_includes'"
@@ -495,5 +595,418 @@ class TestValidateRequestTime(TestCase):
             genapi.validate_request_time(Context(mock.MagicMock()), -1)
 
 
+class TestValidateRequestPhaseTime(TestCase):
+    "test class for 'genapi.validate_request_phase_time'"
+
+    def test_valid_1(self):
+        "succesfully validate a request phase is within the window"
+        m_context = Context(mock.MagicMock())
+        m_context.request_timings = RequestTimings()
+        m_context.request_timings.add("ttfb", 15_000_000)
+
+        self.assertIsNone(genapi.validate_request_phase_time(m_context, "time to first byte", "20"))
+
+    def test_invalid_1(self):
+        "phase is outside the acceptable window"
+        m_context = Context(mock.MagicMock())
+        m_context.request_timings = RequestTimings()
+        m_context.request_timings.add("dns", 25_000_000)
+
+        with self.assertRaises(ValueError):
+            genapi.validate_request_phase_time(m_context, "DNS", "20")
+
+    def test_invalid_2(self):
+        "unknown phase given"
+        m_context = Context(mock.MagicMock())
+        m_context.request_timings = RequestTimings()
+
+        with self.assertRaises(ValueError):
+            genapi.validate_request_phase_time(m_context, "unknown", "20")
+
+    def test_invalid_3(self):
+        "request_timings not set by prior methods on context"
+        with self.assertRaises(RuntimeError):
+            genapi.validate_request_phase_time(Context(mock.MagicMock()), "tls", "20")
+
+    def test_invalid_4(self):
+        "given max_time value is invalid"
+        with self.assertRaises(ValueError):
+            genapi.validate_request_phase_time(Context(mock.MagicMock()), "tls", "0")
+
+
+class TestValidateResponseSize(TestCase):
+    "test class for 'genapi.validate_response_size'"
+
+    def test_valid_1(self):
+        "succesfully validate the response body is no larger than the maximum size"
+        m_context = Context(mock.MagicMock())
+        m_context.request_timings = RequestTimings()
+        m_context.request_timings.response_bytes = 1024
+
+        self.assertIsNone(genapi.validate_response_size(m_context, "1024"))
+
+    def test_invalid_1(self):
+        "the response body is larger than the maximum size"
+        m_context = Context(mock.MagicMock())
+        m_context.request_timings = RequestTimings()
+        m_context.request_timings.response_bytes = 1025
+
+        with self.assertRaisesRegex(ValueError, "Got: 1025 Bytes; Expected: 1024 Bytes"):
+            genapi.validate_response_size(m_context, "1024")
+
+    def test_invalid_2(self):
+        "request_timings not set by prior methods on context"
+        with self.assertRaises(RuntimeError):
+            genapi.validate_response_size(Context(mock.MagicMock()), "1024")
+
+    def test_invalid_3(self):
+        "given max_bytes value is invalid"
+        with self.assertRaises(ValueError):
+            genapi.validate_response_size(Context(mock.MagicMock()), "-1")
+
+
+class TestValidateContentEncoding(TestCase):
+    "test class for 'genapi.validate_content_encoding'"
+
+    def test_valid_1(self):
+        "succesfully validate the response encoding, whatever the case of the header name"
+        m_context = Context(mock.MagicMock())
+        m_context.response_headers = {"content-encoding": "gzip"}
+
+        self.assertIsNone(genapi.validate_content_encoding(m_context, "GZIP"))
+
+    def test_valid_2(self):
+        "a response without a Content-Encoding header was not compressed"
+        m_context = Context(mock.MagicMock())
+        m_context.response_headers = {"Content-Type": "application/json"}
+
+        self.assertIsNone(genapi.validate_content_encoding(m_context, "identity"))
+
+    def test_invalid_1(self):
+        "the response was compressed with another encoding"
+        m_context = Context(mock.MagicMock())
+        m_context.response_headers = {"Content-Encoding": "gzip"}
+
+        with self.assertRaisesRegex(ValueError, "Wanted: br; Got: gzip"):
+            genapi.validate_content_encoding(m_context, "br")
+
+    def test_invalid_2(self):
+        "response_headers not set by prior methods on context"
+        with self.assertRaises(RuntimeError):
+            genapi.validate_content_encoding(Context(mock.MagicMock()), "gzip")
+
+
+class TestValidateCompressionRatio(TestCase):
+    "test class for 'genapi.validate_compression_ratio'"
+
+    def test_valid_1(self):
+        "succesfully validate the response was compressed enough"
+        m_context = Context(mock.MagicMock())
+        m_context.request_timings = RequestTimings()
+        m_context.request_timings.wire_bytes = 1000
+        m_context.request_timings.response_bytes = 5000
+
+        self.assertIsNone(genapi.validate_compression_ratio(m_context, "5"))
+
+    def test_invalid_1(self):
+        "the response was not compressed enough"
+        m_context = Context(mock.MagicMock())
+        m_context.request_timings = RequestTimings()
+        m_context.request_timings.wire_bytes = 1000
+        m_context.request_timings.response_bytes = 1000
+
+        with self.assertRaisesRegex(ValueError, "Got: 1.00"):
+            genapi.validate_compression_ratio(m_context, "2.5")
+
+    def test_invalid_2(self):
+        "request_timings not set by prior methods on context"
+        with self.assertRaises(RuntimeError):
+            genapi.validate_compression_ratio(Context(mock.MagicMock()), "2")
+
+    def test_invalid_3(self):
+        "given min_ratio value is invalid"
+        with self.assertRaises(ValueError):
+            genapi.validate_compression_ratio(Context(mock.MagicMock()), "0")
+
+
+class TestMakeRepeatedTemplateRequest(TestCase):
+    "test class for the method 'genapi.make_repeated_template_request'"
+
+    @mock.patch("features.steps.genericapi_processor.request_factory", return_value=mock.MagicMock())
+    def test_valid_1(self, m_factory):
+        "succesfully repeat the request, the warm-up requests are not recorded"
+        m_context = Context(mock.MagicMock())
+        m_context.default_values = {}
+        m_context.templates = {"test_template": json.dumps({"method": "GET"})}
+        m_factory.return_value.run_request.return_value = ({"foo": "bar"}, {}, 200)
+
+        self.assertIsNone(genapi.make_repeated_template_request(m_context, "un-authenticated", "http", "test_template", "http://localhost/blob", "5", "2"))
+
+        self.assertEqual(m_factory.return_value.run_request.call_count, 7)
+        self.assertIsInstance(m_context.latency_histogram, LatencyHistogram)
+        self.assertEqual(m_context.latency_histogram.total_count, 5)
+        self.assertEqual(m_context.response_status_code, 200)
+
+    def test_invalid_1(self):
+        "invalid repeat counts given"
+        with self.assertRaises(ValueError):
+            genapi.make_repeated_template_request(Context(mock.MagicMock()), "un-authenticated", "http", "test_template", "http://localhost/blob", "0", "0")
+
+        with self.assertRaises(ValueError):
+            genapi.make_repeated_template_request(Context(mock.MagicMock()), "un-authenticated", "http", "test_template", "http://localhost/blob", "1", "-1")
+
+
+class TestValidateRequestTimeHistogram(TestCase):
+    "test class for the repeated request time assertion steps"
+
+    def _context(self) -> Context:
+        m_context = Context(mock.MagicMock())
+        m_context.latency_histogram = LatencyHistogram()
+
+        for value in range(1, 101):
+            m_context.latency_histogram.record_us(value * 1000)
+
+        return m_context
+
+    def test_valid_1(self):
+        "succesfully validate the percentile and mean elapsed times"
+        m_context = self._context()
+
+        self.assertIsNone(genapi.validate_request_time_percentile(m_context, "99", "100"))
+        self.assertIsNone(genapi.validate_request_time_mean(m_context, "51"))
+
+    def test_valid_2(self):
+        "succesfully export the histogram"
+        m_context = self._context()
+
+        with mock.patch.object(m_context.latency_histogram, "export") as m_export:
+            self.assertIsNone(genapi.export_request_time_histogram(m_context, "/tmp/histogram.json"))
+            m_export.assert_called_once_with("/tmp/histogram.json")
+
+    def test_invalid_1(self):
+        "elapsed times are outside the thresholds"
+        m_context = self._context()
+
+        with self.assertRaises(ValueError):
+            genapi.validate_request_time_percentile(m_context, "99", "50")
+
+        with self.assertRaises(ValueError):
+            genapi.validate_request_time_mean(m_context, "50")
+
+    def test_invalid_2(self):
+        "latency_histogram not set by a prior repeated request"
+        m_context = Context(mock.MagicMock())
+
+        with self.assertRaises(RuntimeError):
+            genapi.validate_request_time_percentile(m_context, "99", "50")
+
+        with self.assertRaises(RuntimeError):
+            genapi.validate_request_time_mean(m_context, "50")
+
+        with self.assertRaises(RuntimeError):
+            genapi.export_request_time_histogram(m_context, "/tmp/histogram.json")
+
+
+class TestMakeConcurrentTemplateRequests(TestCase):
+    "test class for the method 'genapi.make_concurrent_template_requests'"
+
+    @mock.patch("features.steps.genericapi_processor.request_factory", return_value=mock.MagicMock())
+    def test_valid_1(self, m_factory):
+        "succesfully make the requests concurrently, recording each result"
+        m_context = Context(mock.MagicMock())
+        m_context.config.userdata = {}
+        m_context.table = [{"label": "HELLO", "values": "hello"}]
+        m_context.default_values = {}
+        m_context.templates = {"test_template": json.dumps({"method": "POST", "body": {"{{HELLO}}": "world"}})}
+        m_factory.return_value.run_request.side_effect = [({}, {}, 200)] * 9 + [ConnectionError("Test Error")]
+
+        self.assertIsNone(genapi.make_concurrent_template_requests(
+            m_context, "4", "10", "un-authenticated", "http", "test_template", "http://localhost/blob"))
+
+        self.assertIsInstance(m_context.load_results, LoadTestResults)
+        self.assertEqual(len(m_context.load_results), 10)
+        self.assertEqual(m_context.load_results.error_count(), 1)
+        self.assertGreater(m_context.load_results.duration_ns, 0)
+        self.assertEqual(m_factory.return_value.run_request.call_count, 10)
+        self.assertDictEqual(m_factory.return_value.run_request.call_args.args[3], {"hello": "world"})
+
+    @mock.patch("features.steps.genericapi_processor.request_factory", return_value=mock.MagicMock())
+    def test_valid_2(self, m_factory):
+        "more users than requests, only one request per user is made"
+        m_context = Context(mock.MagicMock())
+        m_context.config.userdata = {}
+        m_context.default_values = {}
+        m_context.templates = {"test_template": json.dumps({"method": "GET"})}
+        m_factory.return_value.run_request.return_value = (None, {}, 204)
+
+        self.assertIsNone(genapi.make_concurrent_template_requests(
+            m_context, "10", "3", "un-authenticated", "http", "test_template", "http://localhost/blob"))
+
+        self.assertEqual(len(m_context.load_results), 3)
+
+    @mock.patch("features.steps.genericapi_processor.async_request_factory")
+    def test_valid_3(self, m_factory):
+        "succesfully make the requests as coroutines with the asyncio load engine"
+        m_context = Context(mock.MagicMock())
+        m_context.config.userdata = {"load_engine": "asyncio", "async_max_concurrency": "50"}
+        m_context.default_values = {}
+        m_context.templates = {"test_template": json.dumps({"method": "GET"})}
+        m_runner = m_factory.return_value
+        m_runner.run_request = mock.AsyncMock(side_effect=[(None, {}, 200)] * 9 + [ConnectionError("Test Error")])
+        m_runner.close = mock.AsyncMock()
+
+        self.assertIsNone(genapi.make_concurrent_template_requests(
+            m_context, "4", "10", "un-authenticated", "http", "test_template", "http://localhost/blob"))
+
+        m_factory.assert_called_once_with("http", "", "", "", 4)
+        self.assertEqual(len(m_context.load_results), 10)
+        self.assertEqual(m_context.load_results.error_count(), 1)
+        self.assertEqual(m_runner.run_request.await_count, 10)
+        m_runner.close.assert_awaited_once()
+
+    @mock.patch("features.steps.genericapi_processor.async_request_factory")
+    @mock.patch("features.steps.genericapi_processor.request_factory", return_value=mock.MagicMock())
+    def test_valid_4(self, m_factory, m_async_factory):
+        "the response size limit & accepted encodings of the template, or the run-wide limit, are passed on with every request of either engine"
+        m_context = Context(mock.MagicMock())
+        m_context.default_values = {}
+        m_context.templates = {
+            "global_limit": json.dumps({"method": "GET"}),
+            "template_limit": json.dumps({"method": "GET", "max_response_bytes": 50, "accept_encoding": ["gzip", "deflate"]}),
+        }
+        m_context.config.userdata = {"max_response_bytes": "100"}
+        m_factory.return_value.run_request.side_effect = [(None, {}, 200), ResponseTooLargeError("GET", "http://localhost/blob", 100, 101)]
+
+        genapi.make_concurrent_template_requests(m_context, "2", "2", "un-authenticated", "http", "global_limit", "http://localhost/blob")
+
+        self.assertEqual([c.kwargs["max_response_bytes"] for c in m_factory.return_value.run_request.call_args_list], [100, 100])
+        self.assertEqual([c.kwargs["accept_encoding"] for c in m_factory.return_value.run_request.call_args_list], ["", ""])
+        self.assertEqual(m_context.load_results.error_count(), 1)
+
+        m_context.config.userdata = {"max_response_bytes": "100", "load_engine": "asyncio"}
+        m_runner = m_async_factory.return_value
+        m_runner.run_request = mock.AsyncMock(return_value=(None, {}, 200))
+        m_runner.close = mock.AsyncMock()
+
+        genapi.make_concurrent_template_requests(m_context, "2", "2", "un-authenticated", "http", "template_limit", "http://localhost/blob")
+
+        self.assertEqual([c.kwargs["max_response_bytes"] for c in m_runner.run_request.await_args_list], [50, 50])
+        self.assertEqual([c.kwargs["accept_encoding"] for c in m_runner.run_request.await_args_list], ["gzip, deflate"] * 2)
+
+    @mock.patch("features.steps.genericapi_processor.async_request_factory")
+    @mock.patch("features.steps.genericapi_processor.request_factory", return_value=mock.MagicMock())
+    def test_valid_5(self, m_factory, m_async_factory):
+        "the body file & request encoding of the template are passed on with every request of either engine"
+        m_context = Context(mock.MagicMock())
+        m_context.default_values = {}
+        m_context.templates = {"upload": json.dumps({"method": "POST", "body_file": "/data/bulk.json", "request_encoding": "gzip"})}
+        m_context.config.userdata = {}
+        m_factory.return_value.run_request.return_value = (None, {}, 200)
+
+        genapi.make_concurrent_template_requests(m_context, "2", "2", "un-authenticated", "http", "upload", "http://localhost/blob")
+
+        m_context.config.userdata = {"load_engine": "asyncio"}
+        m_runner = m_async_factory.return_value
+        m_runner.run_request = mock.AsyncMock(return_value=(None, {}, 200))
+        m_runner.close = mock.AsyncMock()
+
+        genapi.make_concurrent_template_requests(m_context, "2", "2", "un-authenticated", "http", "upload", "http://localhost/blob")
+
+        for call in m_factory.return_value.run_request.call_args_list + m_runner.run_request.await_args_list:
+            self.assertEqual(call.args[2], "application/json")
+            self.assertEqual(call.kwargs["body_file"], "/data/bulk.json")
+            self.assertEqual(call.kwargs["request_encoding"], "gzip")
+
+        self.assertEqual(m_factory.return_value.run_request.call_count + m_runner.run_request.await_count, 4)
+
+    def test_invalid_1(self):
+        "invalid load test size given"
+        with self.assertRaises(ValueError):
+            genapi.make_concurrent_template_requests(
+                Context(mock.MagicMock()), "0", "10", "un-authenticated", "http", "test_template", "http://localhost/blob")
+
+    def test_invalid_2(self):
+        "unsupported protocol given"
+        with self.assertRaises(TypeError):
+            genapi.make_concurrent_template_requests(
+                Context(mock.MagicMock()), "1", "10", "un-authenticated", "ftp", "test_template", "ftp://localhost/blob")
+
+    def test_invalid_3(self):
+        "auth request requested, but values not provided"
+        m_context = Context(mock.MagicMock())
+        m_context.default_values = {}
+        m_context.templates = {"test_template": json.dumps({"method": "GET"})}
+
+        with self.assertRaises(ValueError):
+            genapi.make_concurrent_template_requests(m_context, "1", "1", "authenticated", "http", "test_template", "http://localhost/blob")
+
+    @mock.patch("features.steps.genericapi_processor.async_request_factory")
+    def test_invalid_4(self, m_factory):
+        "unknown load engine configured, or the asyncio engine without aiohttp installed"
+        m_context = Context(mock.MagicMock())
+        m_context.default_values = {}
+        m_context.templates = {"test_template": json.dumps({"method": "GET"})}
+        m_context.config.userdata = {"load_engine": "processes"}
+
+        with self.assertRaises(ValueError):
+            genapi.make_concurrent_template_requests(m_context, "1", "1", "un-authenticated", "http", "test_template", "http://localhost/blob")
+
+        m_context.config.userdata = {"load_engine": "asyncio"}
+
+        with mock.patch("features.steps.genericapi_processor.aiohttp", None):
+            with self.assertRaisesRegex(RuntimeError, "aiohttp"):
+                genapi.make_concurrent_template_requests(m_context, "1", "1", "un-authenticated", "http", "test_template", "http://localhost/blob")
+
+        m_factory.assert_not_called()
+
+
+class TestValidateLoadResults(TestCase):
+    "test class for the load test assertion steps"
+
+    def _context(self) -> Context:
+        m_context = Context(mock.MagicMock())
+        m_context.load_results = LoadTestResults()
+
+        for i in range(1, 11):
+            m_context.load_results.record(200 if i < 10 else 503, i * 1_000_000, 1)
+
+        m_context.load_results.duration_ns = 1_000_000_000
+        return m_context
+
+    def test_valid_1(self):
+        "succesfully validate the load test results"
+        m_context = self._context()
+
+        self.assertIsNone(genapi.validate_load_error_rate(m_context, "10"))
+        self.assertIsNone(genapi.validate_load_throughput(m_context, "10"))
+        self.assertIsNone(genapi.validate_load_latency_percentile(m_context, "90", "9.01"))
+
+    def test_invalid_1(self):
+        "load test results are outside the thresholds"
+        m_context = self._context()
+
+        with self.assertRaises(ValueError):
+            genapi.validate_load_error_rate(m_context, "5")
+
+        with self.assertRaises(ValueError):
+            genapi.validate_load_throughput(m_context, "11")
+
+        with self.assertRaises(ValueError):
+            genapi.validate_load_latency_percentile(m_context, "99", "9")
+
+    def test_invalid_2(self):
+        "load_results not set by a prior load test"
+        m_context = Context(mock.MagicMock())
+
+        with self.assertRaises(RuntimeError):
+            genapi.validate_load_error_rate(m_context, "5")
+
+        with self.assertRaises(RuntimeError):
+            genapi.validate_load_throughput(m_context, "5")
+
+        with self.assertRaises(RuntimeError):
+            genapi.validate_load_latency_percentile(m_context, "99", "5")
+
+
 if __name__ == "__main__":
     main()
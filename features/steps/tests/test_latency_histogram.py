@@ -0,0 +1,103 @@
+import json
+import os
+import tempfile
+from unittest import main, TestCase
+
+from features.steps.latency_histogram import LatencyHistogram
+
+
+class TestLatencyHistogram(TestCase):
+    "test class for LatencyHistogram"
+
+    def test_valid_1(self):
+        "small values are recorded exactly"
+        histogram = LatencyHistogram()
+
+        for value in range(1, 101):
+            histogram.record_us(value * 10)
+
+        self.assertEqual(histogram.total_count, 100)
+        self.assertEqual(histogram.value_at_percentile_ms(50), 0.5)
+        self.assertEqual(histogram.value_at_percentile_ms(99), 0.99)
+        self.assertEqual(histogram.value_at_percentile_ms(100), 1.0)
+        self.assertEqual(histogram.mean_ms(), 0.505)
+
+    def test_valid_2(self):
+        "large values keep the configured number of significant figures"
+        histogram = LatencyHistogram(significant_figures=3)
+
+        for value in range(1, 10001):
+            histogram.record_ns(value * 1_234_567)
+
+        for percentile in (50, 90, 99, 99.9):
+            exact = round(percentile / 100 * 10000) * 1_234_567 / 1_000_000
+            self.assertAlmostEqual(histogram.value_at_percentile_ms(percentile), exact, delta=exact / 1000)
+
+        self.assertLess(len(histogram.counts), 10000)
+
+    def test_valid_3(self):
+        "succesfully merge two histograms"
+        first, second = LatencyHistogram(), LatencyHistogram()
+        first.record_us(10)
+        second.record_us(5)
+        second.record_us(20)
+
+        first.merge(second)
+
+        self.assertEqual(first.total_count, 3)
+        self.assertEqual(first.min_us, 5)
+        self.assertEqual(first.max_us, 20)
+
+    def test_valid_4(self):
+        "succesfully export a histogram and load it back"
+        histogram = LatencyHistogram()
+
+        for value in (100, 5000, 250000):
+            histogram.record_us(value)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filepath = os.path.join(tmp_dir, "histogram.json")
+            histogram.export(filepath)
+
+            with open(filepath) as fhandle:
+                data = json.load(fhandle)
+
+        self.assertEqual(data["total_count"], 3)
+        self.assertIn("99.0", data["percentiles_ms"])
+
+        loaded = LatencyHistogram.from_dict(data)
+
+        self.assertEqual(loaded.value_at_percentile_ms(50), histogram.value_at_percentile_ms(50))
+        self.assertEqual(loaded.mean_ms(), histogram.mean_ms())
+
+    def test_invalid_1(self):
+        "invalid significant figures given"
+        with self.assertRaises(ValueError):
+            LatencyHistogram(significant_figures=6)
+
+    def test_invalid_2(self):
+        "no values recorded, or invalid values requested"
+        histogram = LatencyHistogram()
+
+        with self.assertRaises(ValueError):
+            histogram.value_at_percentile_ms(50)
+
+        with self.assertRaises(ValueError):
+            histogram.mean_ms()
+
+        with self.assertRaises(ValueError):
+            histogram.record_us(-1)
+
+    def test_invalid_3(self):
+        "histograms with different precision cannot be merged"
+        with self.assertRaises(ValueError):
+            LatencyHistogram(2).merge(LatencyHistogram(3))
+
+    def test_invalid_4(self):
+        "export path cannot be written"
+        with self.assertRaises(RuntimeError):
+            LatencyHistogram().export("/non/existent/dir/histogram.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+from unittest import main, TestCase
+
+from features.steps.load_results import LoadTestResults, MAX_ERROR_MESSAGES
+
+
+class TestLoadTestResults(TestCase):
+    "test class for LoadTestResults"
+
+    def test_valid_1(self):
+        "succesfully calculate the error rate, throughput and latency figures"
+        results = LoadTestResults()
+
+        for i in range(1, 101):
+            results.record(200 if i <= 95 else 500, i * 1_000_000, 10)
+
+        results.duration_ns = 2_000_000_000
+
+        self.assertEqual(len(results), 100)
+        self.assertEqual(results.error_count(), 5)
+        self.assertEqual(results.error_rate(), 5)
+        self.assertEqual(results.throughput(), 50)
+        self.assertAlmostEqual(results.percentile_ms(50), 50, delta=50 / 1000)
+        self.assertAlmostEqual(results.percentile_ms(99), 99, delta=99 / 1000)
+        self.assertEqual(results.percentile_ms(100), 100)
+        self.assertEqual(results.mean_ms(), 50.5)
+        self.assertEqual(results.summary()["total_bytes"], 1000)
+
+    def test_valid_2(self):
+        "requests raising errors are counted as errors, only a bounded number of messages are kept"
+        results = LoadTestResults()
+
+        for i in range(MAX_ERROR_MESSAGES + 5):
+            results.record_error(f"error {i}", 1)
+        results.record_error("error 0", 1)
+
+        self.assertEqual(results.error_rate(), 100)
+        self.assertEqual(len(results.error_messages), MAX_ERROR_MESSAGES)
+        self.assertEqual(results.error_messages["error 0"], 2)
+
+    def test_invalid_1(self):
+        "no requests recorded"
+        results = LoadTestResults()
+
+        with self.assertRaises(ValueError):
+            results.error_rate()
+
+        with self.assertRaises(ValueError):
+            results.percentile_ms(99)
+
+        with self.assertRaises(ValueError):
+            results.throughput()
+
+    def test_invalid_2(self):
+        "invalid percentile requested"
+        results = LoadTestResults()
+        results.record(200, 1, 1)
+
+        with self.assertRaises(ValueError):
+            results.percentile_ms(0)
+
+        with self.assertRaises(ValueError):
+            results.percentile_ms(101)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,19 @@
 from unittest import mock, main, TestCase
 
-from features.steps.processor_utils import get_dot_path_data, get_current_time_ms
+from generic_api.json_stream import PartialJSONBody
+from features.steps.processor_utils import get_dot_path_data, get_dot_paths_data, get_current_time_ms, compile_dot_path, compile_dot_path_tree
+
+
+class _CountingDict(dict):
+    "dict counting how many times each key is looked up"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lookups = {}
+
+    def __getitem__(self, key):
+        self.lookups[key] = self.lookups.get(key, 0) + 1
+        return super().__getitem__(key)
 
 
 class TestGetDotPathData(TestCase):
@@ -42,19 +55,89 @@ class TestGetDotPathData(TestCase):
         with self.assertRaises(ValueError):
             get_dot_path_data(in_data, "foo.bar", "json")
 
+    def test_valid_2(self):
+        "integer segments index arrays but are keys of objects"
+        in_data = {"0": {"items": ({"id": "a"}, {"id": "b"})}}
+
+        self.assertEqual(get_dot_path_data(in_data, "0.items.-1.id", "json"), "b")
+
     def test_invalid_3(self):
         "invalid data_type arg given"
         with self.assertRaises(TypeError):
             get_dot_path_data({}, "foo.bar", "unsupported data type")
 
+    def test_invalid_4(self):
+        "non-integer segment given for an array, or a path through a value"
+        with self.assertRaises(ValueError):
+            get_dot_path_data({"foo": [1]}, "foo.bar", "json")
+
+        with self.assertRaises(ValueError):
+            get_dot_path_data({"foo": 1}, "foo.bar", "json")
+
+
+class TestCompileDotPath(TestCase):
+    "test class for the method 'compile_dot_path'"
+
+    def test_valid_1(self):
+        "the path is split & its indices parsed once, then re-used"
+        result = compile_dot_path("foo.0.bar")
+
+        self.assertEqual(result.segments, (("foo", None), ("0", 0), ("bar", None)))
+        self.assertIs(compile_dot_path("foo.0.bar"), result)
+
+
+class TestGetDotPathsData(TestCase):
+    "test class for the method 'get_dot_paths_data'"
+
+    def test_valid_1(self):
+        "paths sharing a prefix are resolved in one traversal"
+        items = _CountingDict({"bar": [{"a": 1, "b": 2}], "baz": "blob"})
+        in_data = _CountingDict({"foo": items})
+
+        values, errors = get_dot_paths_data(in_data, ("foo.bar.0.a", "foo.bar.0.b", "foo.baz", "foo.bar"), "json")
+
+        self.assertDictEqual(values, {"foo.bar.0.a": 1, "foo.bar.0.b": 2, "foo.baz": "blob", "foo.bar": [{"a": 1, "b": 2}]})
+        self.assertDictEqual(errors, {})
+        self.assertDictEqual(in_data.lookups, {"foo": 1})
+        self.assertDictEqual(items.lookups, {"bar": 1, "baz": 1})
+
+    def test_valid_2(self):
+        "the tree of a table is compiled once"
+        self.assertIs(compile_dot_path_tree(("foo", "bar")), compile_dot_path_tree(("foo", "bar")))
+
+    def test_valid_3(self):
+        "paths are looked up in a streamed body, paths missing from it or not extracted are errors"
+        in_data = PartialJSONBody({"foo.bar": 1}, ("foo.missing",))
+
+        values, errors = get_dot_paths_data(in_data, ("foo.bar", "foo.missing", "foo.other"), "json")
+
+        self.assertDictEqual(values, {"foo.bar": 1})
+        self.assertEqual(set(errors), {"foo.missing", "foo.other"})
+        self.assertEqual(get_dot_path_data(in_data, "foo.bar", "json"), 1)
+
+    def test_invalid_1(self):
+        "each missing path has its own error, found paths are still returned"
+        in_data = {"foo": {"bar": [], "baz": 1}}
+
+        values, errors = get_dot_paths_data(in_data, ("foo.baz", "foo.bar.0", "foo.missing.a", "foo.missing.b"), "json")
+
+        self.assertDictEqual(values, {"foo.baz": 1})
+        self.assertEqual(set(errors), {"foo.bar.0", "foo.missing.a", "foo.missing.b"})
+        self.assertIn("foo.missing.b", str(errors["foo.missing.b"]))
+
+    def test_invalid_2(self):
+        "invalid data_type arg given"
+        with self.assertRaises(TypeError):
+            get_dot_paths_data({}, ("foo.bar",), "unsupported data type")
+
 
 class TestGetCurrentTimeMs(TestCase):
     "test class for the method 'get_current_time_ms'"
 
-    @mock.patch("features.steps.processor_utils.time.time", return_value=5)
+    @mock.patch("features.steps.processor_utils.time.perf_counter_ns", return_value=5_250_000)
     def test_valid_1(self, m_time):
-        "succesfully get the time in ms"
-        self.assertEqual(get_current_time_ms(), 5000)
+        "succesfully get the time in ms, keeping the sub-millisecond precision"
+        self.assertEqual(get_current_time_ms(), 5.25)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,228 @@
+from unittest import main, mock, TestCase
+import json
+
+from jinja2 import Template
+from jinja2.exceptions import TemplateSyntaxError
+
+from features.steps.request_template import RequestTemplate, compile_request_template, tokenize_text, compile_text
+
+
+class TestRequestTemplate(TestCase):
+    "test class for RequestTemplate"
+
+    def test_valid_1(self):
+        "succesfully parse a template with a body, the content type defaults to json"
+        template = RequestTemplate(json.dumps({
+            "method": "put",
+            "query_params": {"foo": "bar"},
+            "headers": {"X-Tenant-ID": "1"},
+            "body": {"value": "{{VALUE}}"},
+        }))
+
+        self.assertEqual(template.method, "PUT")
+        self.assertDictEqual(template.query_params, {"foo": "bar"})
+        self.assertDictEqual(template.render_headers(), {"X-Tenant-ID": "1"})
+        self.assertIsNot(template.render_headers(), template.headers)
+        self.assertEqual(template.content_type, "application/json")
+
+    def test_valid_2(self):
+        "the content type is taken from the template, then the headers"
+        template = RequestTemplate(json.dumps({"method": "POST", "content_type": "text/plain", "body": "x"}))
+        self.assertEqual(template.content_type, "text/plain")
+
+        template = RequestTemplate(json.dumps({"method": "POST", "headers": {"Content-Type": "application/xml"}, "body": "x"}))
+        self.assertEqual(template.content_type, "application/xml")
+
+    def test_valid_3(self):
+        "no body in the template"
+        template = RequestTemplate(json.dumps({"method": "GET"}))
+
+        self.assertFalse(template.has_body)
+        self.assertDictEqual(template.render_body({"FOO": "bar"}), {})
+        self.assertEqual(template.content_type, "")
+        self.assertFalse(template.stream_response)
+        self.assertEqual(template.max_response_bytes, 0)
+        self.assertEqual(template.accept_encoding, "")
+
+    def test_valid_4(self):
+        "response streaming enabled in the template"
+        self.assertTrue(RequestTemplate(json.dumps({"method": "GET", "stream_response": True})).stream_response)
+
+    def test_valid_5(self):
+        "maximum response size set in the template"
+        self.assertEqual(RequestTemplate(json.dumps({"method": "GET", "max_response_bytes": 4096})).max_response_bytes, 4096)
+
+    def test_valid_6(self):
+        "accepted encodings set in the template as a string or a list"
+        self.assertEqual(RequestTemplate(json.dumps({"method": "GET", "accept_encoding": "br;q=1.0, gzip"})).accept_encoding, "br;q=1.0, gzip")
+        self.assertEqual(RequestTemplate(json.dumps({"method": "GET", "accept_encoding": ["br", "gzip"]})).accept_encoding, "br, gzip")
+
+    def test_valid_7(self):
+        "the body is streamed from a file, compressed with gzip"
+        template = RequestTemplate(json.dumps({"method": "POST", "body_file": "fixtures/bulk.json", "request_encoding": "gzip"}))
+
+        self.assertFalse(template.has_body)
+        self.assertEqual(template.body_file, "fixtures/bulk.json")
+        self.assertEqual(template.request_encoding, "gzip")
+        self.assertEqual(template.content_type, "application/json")
+
+    def test_valid_render_body_1(self):
+        "succesfully substitute values into keys, values and lists, parts without placeholders are left as-is"
+        template = RequestTemplate(json.dumps({
+            "method": "POST",
+            "body": {
+                "{{KEY}}": "{{ VALUE }}",
+                "list": ["{{VALUE}}", 1, True, None],
+                "static": {"foo": ["bar"]},
+                "missing": "{{MISSING}}",
+            },
+        }))
+
+        result = template.render_body({"KEY": "key", "VALUE": "value"})
+
+        self.assertDictEqual(result, {
+            "key": "value",
+            "list": ["value", 1, True, None],
+            "static": {"foo": ["bar"]},
+            "missing": "",
+        })
+        self.assertIs(result["static"], template.body["static"])
+
+    def test_valid_render_body_2(self):
+        "text around placeholders is substituted directly, other Jinja2 syntax is rendered through Jinja2"
+        template = RequestTemplate(json.dumps({
+            "method": "POST",
+            "body": {"name": "Hello {{NAME}}", "upper": "{{ NAME | upper }}"},
+        }))
+
+        self.assertDictEqual(template.render_body({"NAME": "world"}), {"name": "Hello world", "upper": "WORLD"})
+
+    def test_valid_render_body_3(self):
+        "no values given, the placeholders are left as-is"
+        template = RequestTemplate(json.dumps({"method": "POST", "body": {"foo": "{{FOO}}"}}))
+
+        self.assertDictEqual(template.render_body({}), {"foo": "{{FOO}}"})
+
+    @mock.patch("features.steps.request_template.template_cache")
+    def test_valid_render_body_4(self, m_cache):
+        "text with several simple placeholders renders as Jinja2 would, without going through Jinja2"
+        text = "{{A}}-{{ B }} and {{A}} {{MISSING}}!\n"
+        template = RequestTemplate(json.dumps({"method": "POST", "body": {"text": text}}))
+
+        result = template.render_body({"A": "a", "B": 2})
+
+        self.assertEqual(result["text"], Template(text).render({"A": "a", "B": 2}))
+        m_cache.render.assert_not_called()
+
+    def test_invalid_1(self):
+        "template is not valid JSON"
+        with self.assertRaises(ValueError):
+            RequestTemplate("{")
+
+    def test_invalid_2(self):
+        "template is not a JSON object"
+        with self.assertRaises(ValueError):
+            RequestTemplate("[]")
+
+    def test_invalid_3(self):
+        "template has no method"
+        with self.assertRaises(ValueError):
+            RequestTemplate("{}")
+
+    def test_invalid_4(self):
+        "stream_response is not a boolean"
+        with self.assertRaises(ValueError):
+            RequestTemplate(json.dumps({"method": "GET", "stream_response": "yes"}))
+
+    def test_invalid_5(self):
+        "max_response_bytes is not a whole number of bytes"
+        for max_response_bytes in (-1, 1.5, "1024", True):
+            with self.assertRaises(ValueError):
+                RequestTemplate(json.dumps({"method": "GET", "max_response_bytes": max_response_bytes}))
+
+    def test_invalid_6(self):
+        "accept_encoding is not a string or a list of strings"
+        for accept_encoding in (1, ["gzip", 2], {"gzip": 1}):
+            with self.assertRaises(ValueError):
+                RequestTemplate(json.dumps({"method": "GET", "accept_encoding": accept_encoding}))
+
+
+    def test_invalid_7(self):
+        "the template has both a body and a body file, or the body file is not a path"
+        with self.assertRaises(ValueError):
+            RequestTemplate(json.dumps({"method": "POST", "body": {"a": 1}, "body_file": "fixtures/bulk.json"}))
+
+        with self.assertRaises(ValueError):
+            RequestTemplate(json.dumps({"method": "POST", "body_file": ["fixtures/bulk.json"]}))
+
+    def test_invalid_8(self):
+        "the request encoding is not supported"
+        with self.assertRaises(ValueError):
+            RequestTemplate(json.dumps({"method": "POST", "body_file": "fixtures/bulk.json", "request_encoding": "br"}))
+
+
+class TestCompileRequestTemplate(TestCase):
+    "test class for the method 'compile_request_template'"
+
+    def test_valid_1(self):
+        "the same template text is only parsed once"
+        raw = json.dumps({"method": "GET", "query_params": {"compile": "once"}})
+
+        self.assertIs(compile_request_template(raw), compile_request_template(raw))
+
+
+class TestTokenizeText(TestCase):
+    "test class for the method 'tokenize_text'"
+
+    def test_valid_1(self):
+        "literal text & simple placeholders are split in one scan"
+        self.assertEqual(tokenize_text("Hello {{ NAME }}, id {{ID}}"), [(False, "Hello "), (True, "NAME"), (False, ", id "), (True, "ID")])
+        self.assertEqual(tokenize_text("{{NAME}}"), [(True, "NAME")])
+
+    def test_valid_2(self):
+        "text with other Jinja2 syntax needs the full engine"
+        for text in ("{{ NAME | upper }}", "{% if A %}a{% endif %}", "{# comment #} {{A}}", "{{ 'a' }}"):
+            self.assertIsNone(tokenize_text(text))
+
+    def test_valid_3(self):
+        "malformed tags are left to the full engine, rather than rendered as placeholders"
+        for text in ("{{{ NAME }}", "a {{{NAME}}", "{{ NAME }"):
+            self.assertIsNone(tokenize_text(text))
+
+    def test_valid_4(self):
+        "Jinja2 literals & globals are left to the full engine, rather than looked up in the values"
+        for text in ("{{ true }}", "a {{ none }}", "{{True}}", "{{ range }}", "{{ lipsum }} b", "{{namespace}}"):
+            self.assertIsNone(tokenize_text(text))
+
+
+class TestCompileText(TestCase):
+    "test class for the method 'compile_text'"
+
+    def test_valid_1(self):
+        "the same text is only tokenized once, and text without placeholders is returned without tokenizing it"
+        self.assertIs(compile_text("{{A}} b"), compile_text("{{A}} b"))
+        self.assertEqual(compile_text("{{A}} b")({"A": "a"}), "a b")
+        self.assertEqual(compile_text("plain")({"A": "a"}), "plain")
+
+    def test_valid_2(self):
+        "a single trailing newline is dropped whether or not the text holds placeholders, the same as Jinja2"
+        for text, values in (("plain\n", {}), ("{{A}}\n", {"A": "plain"}), ("plain\n\n", {}), ("{{A}}\n\n", {"A": "plain"})):
+            self.assertEqual(compile_text(text)(values), Template(text).render(values))
+
+    def test_valid_3(self):
+        "literals, globals, missing names and None values render the same as Jinja2"
+        values = {"A": None, "dict": "shadowed", "true": "ignored"}
+
+        for text in ("{{ true }}", "{{ false }}", "{{ none }}", "{{ True }}", "{{ None }}", "{{ range }}", "{{ dict }}", "{{ cycler }}",
+                     "{{ joiner }}", "{{ A }}", "{{ MISSING }}", "x {{ true }} {{ A }}"):
+            self.assertEqual(compile_text(text)(values), Template(text).render(values), text)
+
+    def test_invalid_1(self):
+        "malformed tags raise, the same as Jinja2"
+        for text in ("{{{ A }}", "{{ A }", "{{ not }}"):
+            with self.assertRaises(TemplateSyntaxError):
+                compile_text(text)({"A": "a"})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import tempfile
+import os
+from unittest import main, TestCase
+
+from features.steps.template_cache import TemplateCache
+
+
+class TestTemplateCache(TestCase):
+    "test class for TemplateCache"
+
+    def test_valid_render_1(self):
+        "succesfully render a template, the second render is a cache hit"
+        cache = TemplateCache()
+
+        self.assertEqual(cache.render("{{HELLO}} World", {"HELLO": "Hello"}), "Hello World")
+        self.assertEqual(cache.render("{{HELLO}} World", {"HELLO": "Goodbye"}), "Goodbye World")
+
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(len(cache), 1)
+
+    def test_valid_get_template_1(self):
+        "the least recently used template is evicted once max_size is exceeded"
+        cache = TemplateCache(max_size=2)
+
+        first = cache.get_template("one")
+        cache.get_template("two")
+        cache.get_template("one")
+        cache.get_template("three")
+
+        self.assertEqual(len(cache), 2)
+        self.assertIs(cache.get_template("one"), first)
+        self.assertDictEqual(cache.info(), {"hits": 2, "misses": 3, "size": 2, "max_size": 2})
+
+    def test_valid_configure_1(self):
+        "compiled templates are written to the bytecode cache directory"
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = TemplateCache(bytecode_cache_dir=tmp_dir)
+
+            self.assertEqual(cache.render("{{FOO}}", {"FOO": "bar"}), "bar")
+            self.assertEqual(len(os.listdir(tmp_dir)), 1)
+
+            # a new cache, as in a later run, loads the bytecode rather than compiling again
+            self.assertEqual(TemplateCache(bytecode_cache_dir=tmp_dir).render("{{FOO}}", {"FOO": "baz"}), "baz")
+
+    def test_valid_clear_1(self):
+        "clearing the cache removes the templates and resets the counters"
+        cache = TemplateCache()
+        cache.get_template("one")
+        cache.get_template("one")
+
+        cache.clear()
+
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(cache.misses, 0)
+
+    def test_valid_is_plain_name_1(self):
+        "only names Jinja2 looks up in the values are plain, not its literals or the globals of the environment"
+        cache = TemplateCache()
+
+        self.assertTrue(cache.is_plain_name("PASSWORD"))
+
+        for name in ("true", "None", "not", "self", "range", "lipsum"):
+            self.assertFalse(cache.is_plain_name(name))
+
+    def test_invalid_configure_1(self):
+        "invalid cache size given"
+        with self.assertRaises(ValueError):
+            TemplateCache(max_size=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from unittest import mock, main, TestCase
 
-from features.environment import populate_template_constants, after_scenario, before_tag
+from features.steps.request_template import RequestTemplate
+from features.environment import populate_template_constants, profile_tagged, before_all, after_all, before_scenario, before_step, after_step, after_scenario, before_tag
 
 
 class TestPopulateTemplateConstants(TestCase):
@@ -14,12 +15,176 @@ class TestPopulateTemplateConstants(TestCase):
         self.assertTrue(hasattr(m_context, "templates"))
         self.assertIsInstance(m_context.templates, dict)
 
+    @mock.patch.dict("features.environment.template_constants", {"text": '{"method": "get"}', "dict": {"method": "POST", "body": {}}})
+    def test_valid_2(self):
+        "succesfully parse the template constants, held as either text or dicts"
+        m_context = mock.MagicMock()
+
+        self.assertTrue(populate_template_constants(m_context))
+
+        self.assertIsInstance(m_context.templates["text"], RequestTemplate)
+        self.assertEqual(m_context.templates["text"].method, "GET")
+        self.assertIsInstance(m_context.templates["dict"], RequestTemplate)
+        self.assertEqual(m_context.templates["dict"].method, "POST")
+
+    @mock.patch.dict("features.environment.template_constants", {"invalid": '{"body": {}}'})
+    def test_invalid_2(self):
+        "a template constant is invalid"
+        with self.assertRaises(ValueError):
+            populate_template_constants(mock.MagicMock())
+
     def test_invalid_1(self):
         "given context is invalid"
         with self.assertRaises(RuntimeError):
             populate_template_constants(None)
 
 
+class TestProfileTagged(TestCase):
+    "test class for the fixture 'profile_tagged'"
+
+    @mock.patch("features.environment.profiler")
+    def test_valid_1(self, m_profiler):
+        "succesfully profile the tagged scenario until it ends"
+        m_context = mock.MagicMock()
+        m_context.scenario.name = "Scenario"
+        m_profiler.start.return_value = True
+
+        fixture_func = profile_tagged(m_context)
+        self.assertTrue(next(fixture_func))
+        m_profiler.start.assert_called_once_with("Scenario")
+        m_profiler.stop.assert_not_called()
+
+        with self.assertRaises(StopIteration):
+            next(fixture_func)
+
+        m_profiler.stop.assert_called_once()
+
+    @mock.patch("features.environment.profiler")
+    def test_valid_2(self, m_profiler):
+        "a profile is already being taken, so it is not stopped when the tagged scenario ends"
+        m_profiler.start.return_value = False
+
+        fixture_func = profile_tagged(mock.MagicMock())
+        self.assertFalse(next(fixture_func))
+
+        with self.assertRaises(StopIteration):
+            next(fixture_func)
+
+        m_profiler.stop.assert_not_called()
+
+
+class TestBeforeAll(TestCase):
+    "test class for the method 'before_all'"
+
+    @mock.patch("features.environment.profiler")
+    @mock.patch("features.environment.metrics")
+    @mock.patch("features.environment.cassette")
+    @mock.patch("features.environment.json_codecs")
+    @mock.patch("features.environment.token_cache")
+    @mock.patch("features.environment.template_cache")
+    @mock.patch("features.environment.session_pool")
+    def test_valid_1(self, m_pool, m_cache, m_tokens, m_codecs, m_cassette, m_metrics, m_profiler):
+        "succesfully configure the session pool, template cache, token cache, json codec, cassette and metrics from the userdata"
+        m_context = mock.MagicMock()
+        m_context.config.userdata = {
+            "pool_size": "4",
+            "pool_max_per_host": "2",
+            "template_cache_size": "8",
+            "template_bytecode_cache_dir": "/tmp/jinja",
+            "auth_token_ttl": "60",
+            "auth_refresh_margin": "5",
+            "json_codec": "json",
+            "cassette_mode": "replay",
+            "cassette_dir": "/tmp/cassettes",
+            "metrics_file": "/tmp/metrics.prom",
+            "metrics_format": "prometheus",
+            "profile_mode": "run",
+            "profile_dir": "/tmp/profiles",
+            "profile_interval_ms": "10",
+        }
+        m_profiler.mode = "run"
+
+        self.assertIsNone(before_all(m_context))
+
+        m_pool.configure.assert_called_once_with(4, 2)
+        m_cache.configure.assert_called_once_with(8, "/tmp/jinja")
+        m_tokens.configure.assert_called_once_with(60, 5)
+        m_codecs.configure.assert_called_once_with("json")
+        m_cassette.configure.assert_called_once_with("replay", "/tmp/cassettes")
+        m_metrics.configure.assert_called_once_with("/tmp/metrics.prom", "prometheus")
+        m_profiler.configure.assert_called_once_with("run", "/tmp/profiles", 10)
+        m_profiler.start.assert_called_once_with("run")
+
+    @mock.patch("features.environment.profiler")
+    @mock.patch("features.environment.metrics")
+    @mock.patch("features.environment.cassette")
+    @mock.patch("features.environment.json_codecs")
+    @mock.patch("features.environment.token_cache")
+    @mock.patch("features.environment.template_cache")
+    @mock.patch("features.environment.session_pool")
+    def test_valid_2(self, m_pool, m_cache, m_tokens, m_codecs, m_cassette, m_metrics, m_profiler):
+        "no userdata given, everything is configured with the defaults"
+        m_context = mock.MagicMock()
+        m_context.config.userdata = {}
+
+        self.assertIsNone(before_all(m_context))
+
+        m_pool.configure.assert_called_once_with(10, 10)
+        m_cache.configure.assert_called_once_with(256, "")
+        m_tokens.configure.assert_called_once_with(300, 30)
+        m_codecs.configure.assert_called_once_with("")
+        m_cassette.configure.assert_called_once_with("off", "cassettes")
+        m_metrics.configure.assert_called_once_with("", "jsonl")
+        m_profiler.configure.assert_called_once_with("off", "profiles", 5)
+        m_profiler.start.assert_not_called()
+
+    def test_invalid_1(self):
+        "invalid context arg given"
+        with self.assertRaises(RuntimeError):
+            before_all(None)
+
+
+class TestAfterAll(TestCase):
+    "test class for the method 'after_all'"
+
+    @mock.patch("features.environment.profiler")
+    @mock.patch("features.environment.metrics")
+    @mock.patch("features.environment.cassette")
+    @mock.patch("features.environment.session_pool")
+    def test_valid_1(self, m_pool, m_cassette, m_metrics, m_profiler):
+        "succesfully write the run's profile, close the session pool, the cassette and the metrics file"
+        self.assertIsNone(after_all(mock.MagicMock()))
+
+        m_pool.close.assert_called_once()
+        m_cassette.close.assert_called_once()
+        m_metrics.close.assert_called_once()
+        m_profiler.stop.assert_called_once()
+
+
+class TestStepHooks(TestCase):
+    "test class for the methods 'before_scenario', 'before_step' and 'after_step'"
+
+    @mock.patch("features.environment.profiler")
+    @mock.patch("features.environment.metrics")
+    def test_valid_1(self, m_metrics, m_profiler):
+        "succesfully time & profile the scenario, and time the step with their names, line and status"
+        m_scenario = mock.MagicMock()
+        m_scenario.feature.name = "Feature"
+        m_scenario.name = "Scenario"
+        m_step = mock.MagicMock(keyword="Given", line=4)
+        m_step.name = "a step"
+        m_step.status.name = "passed"
+
+        self.assertIsNone(before_scenario(mock.MagicMock(), m_scenario))
+        self.assertIsNone(before_step(mock.MagicMock(), m_step))
+        self.assertIsNone(after_step(mock.MagicMock(), m_step))
+
+        m_metrics.start_scenario.assert_called_once_with("Feature", "Scenario")
+        m_profiler.start_scenario.assert_called_once_with("Feature Scenario")
+        m_metrics.start_step.assert_called_once_with("Given a step", 4)
+        m_metrics.end_step.assert_called_once_with("passed")
+
+
 class TestAfterScenario(TestCase):
     "test class for the method 'after_scenario'"
 
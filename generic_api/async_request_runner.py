@@ -0,0 +1,347 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import AsyncIterator, BinaryIO, Dict, Callable, Any, Iterator, List, Tuple, Optional, Union
+
+try:
+    import aiohttp
+except ImportError:  # optional dependency, only required by the asyncio request engine
+    aiohttp = None  # type: ignore
+
+from generic_api.cassette import cassette, CassetteEntry
+from generic_api.json_codec import json_codecs
+from generic_api.metrics import metrics
+from generic_api.request_runner import (RequestRunner, ResponseTooLargeError, prepare_request, get_cassette_key, encode_request_body, open_body_file,
+                                        replay_response, use_cassette, get_declared_size, get_content_decoder, get_response_content_type,
+                                        decode_response_body, with_default_accept_encoding, STREAM_CHUNK_SIZE)
+from generic_api.request_timing import RequestTimings
+from generic_api.token_cache import token_cache
+
+DEFAULT_MAX_CONCURRENCY = 1000
+
+
+async def _on_dns_start(session: Any, trace_ctx: SimpleNamespace, params: Any) -> None:
+    trace_ctx.dns_start = time.perf_counter_ns()
+
+
+async def _on_dns_end(session: Any, trace_ctx: SimpleNamespace, params: Any) -> None:
+    trace_ctx.dns_ns = time.perf_counter_ns() - trace_ctx.dns_start
+
+
+async def _on_connection_start(session: Any, trace_ctx: SimpleNamespace, params: Any) -> None:
+    trace_ctx.dns_ns = 0
+    trace_ctx.connect_start = time.perf_counter_ns()
+
+
+async def _on_connection_end(session: Any, trace_ctx: SimpleNamespace, params: Any) -> None:
+    timings: RequestTimings = trace_ctx.trace_request_ctx
+    timings.add("dns", trace_ctx.dns_ns)
+    # aiohttp does not separate the TLS handshake from connecting, so it is included in the connect phase
+    timings.add("connect", time.perf_counter_ns() - trace_ctx.connect_start - trace_ctx.dns_ns)
+
+
+async def _iter_chunks(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    "yields the chunks to aiohttp, which sends a body of unknown size with chunked transfer-encoding"
+    for chunk in chunks:
+        yield chunk
+
+
+class AsyncRequestRunner():
+    """
+    asyncio counterpart of RequestRunner built on aiohttp, with the same 'authenticate', 'set_request_token' and
+        'run_request' contract as coroutines. To derive from this class you must implement 'authenticate' and
+        'set_request_token', existing RequestRunner classes can be used through the SyncRunnerAdapter instead.
+    At most 'max_concurrency' requests are in flight at once. A session is opened for each event loop the runner is
+        used in, so 'close' should be awaited before the loop ends
+    """
+
+    def __init__(self, auth_url: str = "", username: str = "", password: str = "", max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        if int(max_concurrency) <= 0:
+            raise ValueError(f"Invalid max_concurrency: {max_concurrency}")
+
+        self.auth_url = auth_url
+        self.username = username
+        self.password = password
+        self.max_concurrency = int(max_concurrency)
+        self.supported_methods = ("GET", "POST", "DELETE", "PUT")
+        self.supported_content_types: Dict[str, Dict[str, Callable]] = {
+            "application/json": {
+                "encode": self._encode_data_to_json,
+                "decode": self._decode_json_to_data,
+            },
+            "application/json; charset=UTF-8": {
+                "encode": self._encode_data_to_json,
+                "decode": self._decode_json_to_data,
+            }
+        }
+        # bound to the event loop the runner is used in, see '_bind_loop'
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session: Any = None
+        self._semaphore: Any = None
+        self._auth_lock: Any = None
+
+    async def authenticate(self) -> str:
+        """
+        Method for authenticating with the configured authentication schema - derived classes should override this
+        Must return a string authentication token.
+        """
+        return ""
+
+    async def set_request_token(self, request_headers: Dict[str, Any], auth_token: str) -> Dict[str, Any]:
+        """
+        Method to set the authentication token in the request headers.
+        Should be overridden by derived classes
+        Must return the expected request header as a dict, with the authentication token set.
+        """
+        return request_headers
+
+    async def run_request(self, method: str, url: str, content_type: str = "", body: Dict[str, Any] = {}, query_params: Dict[str, Any] = {},
+                          header_params: Dict[str, Any] = {}, authenticate: bool = True, timings: Optional[RequestTimings] = None,
+                          max_response_bytes: int = 0, accept_encoding: str = "", body_file: str = "",
+                          request_encoding: str = "", lazy_decode: bool = False) -> Tuple[Any, dict, int]:
+        """
+        run an HTTP/1.1 request, the duration of each phase is recorded into 'timings' if given. Requests are
+            validated, logged in through the shared token cache and timed into the run's metrics the same as RequestRunner.
+        If 'lazy_decode' is set the body is returned as a LazyResponseBody, only decoded when its data is first needed.
+        If 'max_response_bytes' is given, a ResponseTooLargeError is raised as soon as more of the body than that has
+            downloaded, the same as RequestRunner.
+        If 'accept_encoding' is given it is sent as the Accept-Encoding header, compressed bodies are decompressed as
+            they download with the bytes read over the wire and the time spent decompressing recorded into 'timings'.
+        If 'body_file' is given its content is sent as the body instead of 'body', streamed from disk in chunks rather
+            than loaded into memory. If 'request_encoding' is given the body is compressed with it as it is sent.
+        Requests are recorded to & replayed from the cassette the same as RequestRunner, under the same keys
+        """
+        if timings is None:
+            timings = RequestTimings()
+
+        content_type, header_params = prepare_request(self, method, url, content_type, body, header_params, authenticate, max_response_bytes,
+                                                      accept_encoding, body_file, request_encoding)
+        self._bind_loop()
+        # keyed before the auth token is added, so a replayed request never needs to log in
+        cassette_key = get_cassette_key(method, url, query_params, header_params, body, body_file)
+
+        if authenticate and not cassette.replaying:
+            # logins are shared with every other runner through the token cache, until the token is about to expire
+            with metrics.span("auth"):
+                auth_token = await token_cache.get_token_async(self, self._auth_lock)
+
+            if not len(auth_token):
+                raise ValueError("Returned Auth Token Is Empty")
+
+            header_params = await self.set_request_token(header_params, auth_token)
+
+        request_kwargs: Dict[str, Any] = {
+            "headers": dict(with_default_accept_encoding(header_params)),
+            "params": query_params,
+            "trace_request_ctx": timings,
+        }
+
+        if len(body):
+            request_kwargs["data"] = encode_request_body(self._encode_request_body, content_type, body, request_encoding)
+
+        if len(body) or len(body_file):
+            request_kwargs["headers"]["Content-Type"] = content_type
+
+        replayed: Optional[CassetteEntry] = None
+
+        if cassette.replaying:
+            replayed = replay_response(cassette_key, method, url)
+            content, resp_headers, status_code = replayed.content, replayed.headers, replayed.status_code
+            timings.response_bytes = len(content)
+
+            if max_response_bytes > 0 and len(content) > max_response_bytes:
+                raise ResponseTooLargeError(method, url, max_response_bytes, len(content))
+        else:
+            content, resp_headers, status_code = await self._send_request(method, url, request_kwargs, timings, max_response_bytes, body_file,
+                                                                          request_encoding)
+
+        use_cassette(cassette_key, replayed, method, url, query_params, status_code, resp_headers, content, timings)
+
+        if authenticate and status_code == 401:
+            # the cached token was rejected, so the next request logs in again
+            token_cache.invalidate(self)
+
+        resp_content_type = get_response_content_type(resp_headers)
+        resp_body = decode_response_body(lambda raw: self._decode_response_body(resp_content_type, raw), content, lazy_decode, timings)
+
+        metrics.add_timings(timings)
+        return resp_body, resp_headers, status_code
+
+    async def _send_request(self, method: str, url: str, request_kwargs: Dict[str, Any], timings: RequestTimings, max_bytes: int,
+                            body_file: str = "", request_encoding: str = "") -> Tuple[bytes, Dict[str, Any], int]:
+        """
+        sends the request once a slot is free, returns its body, headers and status code. A 'body_file' is only opened
+            once the slot is free, so no more files are open than requests in flight
+        """
+        async with self._semaphore:
+            body_handle: Optional[BinaryIO] = None
+
+            try:
+                if len(body_file):
+                    body_handle, data = open_body_file(body_file, request_encoding)
+                    # aiohttp sends a body of unknown size from an async iterator, with chunked transfer-encoding
+                    request_kwargs = {**request_kwargs, "data": data if data is body_handle else _iter_chunks(data)}
+
+                start = time.perf_counter_ns()
+
+                async with self._session.request(method, url, **request_kwargs) as resp:
+                    first_byte = time.perf_counter_ns()
+                    timings.add("ttfb", first_byte - start - timings.connection_ns())
+
+                    content = await self._read_response_body(resp, method, url, max_bytes, timings)
+                    downloaded = time.perf_counter_ns()
+                    timings.add("download", downloaded - first_byte - timings.durations_ns["decompress"])
+                    timings.add("total", downloaded - start)
+                    timings.response_bytes = len(content)
+                    # bodies that were not compressed are the same size over the wire
+                    timings.wire_bytes = timings.wire_bytes or timings.response_bytes
+
+                    return content, dict(resp.headers), resp.status
+            except ResponseTooLargeError:
+                raise
+            except Exception as ex:
+                raise RuntimeError(str(ex))
+            finally:
+                if body_handle is not None:
+                    body_handle.close()
+
+    async def _read_response_body(self, resp: Any, method: str, url: str, max_bytes: int, timings: RequestTimings) -> bytes:
+        """
+        reads the whole response body, decompressing it as it downloads the same as RequestRunner. If 'max_bytes' is
+            given the download stops and the connection is dropped as soon as the body is larger than it
+        """
+        declared_size = get_declared_size(resp.headers)
+
+        if max_bytes > 0 and declared_size is not None and declared_size > max_bytes:
+            resp.close()
+            raise ResponseTooLargeError(method, url, max_bytes, declared_size)
+
+        try:
+            decoder = get_content_decoder(resp.headers, timings)
+        except RuntimeError:
+            resp.close()
+            raise
+
+        chunks: List[bytes] = []
+        size = 0
+
+        async for raw_chunk in resp.content.iter_chunked(STREAM_CHUNK_SIZE):
+            chunk = raw_chunk if decoder is None else decoder.decompress(raw_chunk)
+            size += len(chunk)
+
+            if max_bytes > 0 and size > max_bytes:
+                resp.close()
+                raise ResponseTooLargeError(method, url, max_bytes, size)
+
+            chunks.append(chunk)
+
+        if decoder is not None:
+            chunks.append(decoder.flush())
+
+            if max_bytes > 0 and size + len(chunks[-1]) > max_bytes:
+                raise ResponseTooLargeError(method, url, max_bytes, size + len(chunks[-1]))
+
+        return b"".join(chunks)
+
+    async def close(self) -> None:
+        "closes the session of the current event loop"
+        if self._session is not None:
+            await self._session.close()
+
+        self._loop = None
+        self._session = None
+
+    def _bind_loop(self) -> None:
+        "opens the session, semaphore & auth lock for the running event loop, they cannot be shared between loops"
+        loop = asyncio.get_running_loop()
+
+        if self._loop is loop:
+            return
+
+        if aiohttp is None:
+            raise RuntimeError("The aiohttp Package Is Required By AsyncRequestRunner")
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_dns_resolvehost_start.append(_on_dns_start)
+        trace_config.on_dns_resolvehost_end.append(_on_dns_end)
+        trace_config.on_connection_create_start.append(_on_connection_start)
+        trace_config.on_connection_create_end.append(_on_connection_end)
+
+        self._loop = loop
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+            trace_configs=[trace_config],
+            # decompressed as each body is read, so the bytes over the wire & time spent decompressing are recorded
+            auto_decompress=False,
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._auth_lock = asyncio.Lock()
+
+    def _encode_request_body(self, content_type: str, request_data: Dict[str, Any]) -> Union[bytes, str]:
+        "encodes and returns the body for the request if the content_type is supported"
+        if content_type not in self.supported_content_types:
+            raise ValueError(f"Unsupported Content Type: {content_type}")
+
+        return self.supported_content_types[content_type]['encode'](request_data)
+
+    def _decode_response_body(self, resp_content_type: str, resp_data: bytes) -> Dict[str, Any]:
+        "decodes a response body from the returned MIME type to a Python data structure"
+        if resp_content_type not in self.supported_content_types:
+            raise ValueError(f"Response Content-Type Is Not Supported: {resp_content_type}")
+
+        return self.supported_content_types[resp_content_type]['decode'](resp_data)
+
+    def _encode_data_to_json(self, data: Dict[str, Any]) -> bytes:
+        "encodes the given dict to UTF-8 json with the configured json codec, the standard library's unless one is set"
+        try:
+            return json_codecs.encoder.dumps(data)
+        except Exception as ex:
+            raise ValueError(f"Ex Dumps JSON: {data}")
+
+    def _decode_json_to_data(self, raw_json: bytes) -> Dict[str, Any]:
+        "decodes the given json bytes to a dict with the configured json codec, without decoding them to text first"
+        try:
+            return json_codecs.default.loads(raw_json)
+        except Exception as ex:
+            raise ValueError(f"Ex Decoding JSON: {str(ex)}")
+
+
+class SyncRunnerAdapter(AsyncRequestRunner):
+    """
+    Runs an existing, blocking RequestRunner (e.g. a custom runner with its own auth hooks) behind the
+        AsyncRequestRunner contract, each request runs on a worker thread of its own pool of 'max_concurrency' threads
+    """
+
+    def __init__(self, runner: RequestRunner, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        super().__init__(auth_url=runner.auth_url, username=runner.username, password=runner.password, max_concurrency=max_concurrency)
+        self.runner = runner
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def authenticate(self) -> str:
+        return await self._run_in_thread(self.runner.authenticate)
+
+    async def set_request_token(self, request_headers: Dict[str, Any], auth_token: str) -> Dict[str, Any]:
+        return self.runner.set_request_token(request_headers, auth_token)
+
+    async def run_request(self, method: str, url: str, content_type: str = "", body: Dict[str, Any] = {}, query_params: Dict[str, Any] = {},
+                          header_params: Dict[str, Any] = {}, authenticate: bool = True, timings: Optional[RequestTimings] = None,
+                          max_response_bytes: int = 0, accept_encoding: str = "", body_file: str = "",
+                          request_encoding: str = "", lazy_decode: bool = False) -> Tuple[Any, dict, int]:
+        return await self._run_in_thread(
+            lambda: self.runner.run_request(method, url, content_type, body, query_params, header_params, authenticate, timings=timings,
+                                            max_response_bytes=max_response_bytes, accept_encoding=accept_encoding, body_file=body_file,
+                                            request_encoding=request_encoding, lazy_decode=lazy_decode))
+
+    async def close(self) -> None:
+        "shuts down the worker threads, the wrapped runner keeps its pooled connections"
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def _run_in_thread(self, func: Callable[[], Any]) -> Any:
+        "runs the blocking function on a worker thread"
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func)
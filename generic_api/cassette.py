@@ -0,0 +1,222 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from generic_api.request_timing import RequestTimings
+
+CASSETTE_MODES = ("off", "record", "replay")
+DEFAULT_CASSETTE_DIR = "cassettes"
+CASSETTE_FILENAME = "cassette.jsonl"
+INDEX_FILENAME = "cassette.index.json"
+
+# headers left out of the request key, as they change between runs without changing the response
+IGNORED_HEADERS = ("authorization",)
+# the phases of a recorded exchange restored on replay, decoding is still timed as it happens
+NETWORK_PHASES = ("dns", "connect", "tls", "ttfb", "download", "decompress", "total")
+# every line of the cassette starts with its key, so the index is rebuilt without decoding the recorded bodies
+_KEY_PREFIX = b'{"key": "'
+_KEY_LENGTH = 64
+
+
+def request_key(method: str, url: str, query_params: Dict[str, Any], headers: Dict[str, Any], body: Any) -> str:
+    "returns the hash identifying a request, the same request always has the same key whatever order its params are in"
+    canonical = json.dumps({
+        "method": method.upper(),
+        "url": url,
+        "query_params": query_params,
+        "headers": {str(key).lower(): value for key, value in headers.items() if str(key).lower() not in IGNORED_HEADERS},
+        "body": body,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CassetteEntry():
+    "a recorded response, replayed in place of making the request"
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+
+    @property
+    def status_code(self) -> int:
+        return int(self.data["status_code"])
+
+    @property
+    def headers(self) -> Dict[str, Any]:
+        return dict(self.data["headers"])
+
+    @property
+    def content(self) -> bytes:
+        "the recorded response body"
+        if "body_base64" in self.data:
+            return base64.b64decode(self.data["body_base64"])
+
+        return self.data["body"].encode("utf-8")
+
+    def restore_timings(self, timings: RequestTimings) -> None:
+        "replaces the network phases & wire size of the timings with those recorded, bodies are recorded decompressed"
+        for phase in NETWORK_PHASES:
+            timings.durations_ns[phase] = int(self.data["timings"].get(phase, 0))
+
+        timings.wire_bytes = int(self.data.get("wire_bytes", timings.wire_bytes))
+
+
+class Cassette():
+    """
+    Process-wide on-disk store of request/response exchanges, keyed by the hash of each request
+    In 'record' mode every request still goes to the network and its response is appended to the cassette, in
+        'replay' mode responses are answered from the cassette without any network at all. Each exchange is a line of
+        the cassette file, found with an in-memory index of key to file offset - so a lookup is one hash lookup & seek
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.mode = "off"
+        self.directory = DEFAULT_CASSETTE_DIR
+        self._index: Dict[str, int] = {}
+        self._recorded: Dict[str, bool] = {}
+        self._handle: Any = None
+
+    @property
+    def recording(self) -> bool:
+        "whether responses are being recorded to the cassette"
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        "whether responses are being answered from the cassette"
+        return self.mode == "replay"
+
+    def configure(self, mode: str = "off", directory: str = DEFAULT_CASSETTE_DIR) -> None:
+        "sets the mode & directory of the cassette, loading its index if it is recorded to or replayed from"
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Invalid Cassette Mode {mode}; Available: {', '.join(CASSETTE_MODES)}")
+
+        with self._lock:
+            self._close()
+            self.mode = mode
+            self.directory = directory or DEFAULT_CASSETTE_DIR
+            self._index = {}
+            self._recorded = {}
+
+            if mode == "off":
+                return
+
+            cassette_filepath = os.path.join(self.directory, CASSETTE_FILENAME)
+
+            if mode == "replay" and not os.path.isfile(cassette_filepath):
+                raise RuntimeError(f"Cassette Not Found To Replay: {cassette_filepath}")
+
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                self._handle = open(cassette_filepath, "a+b")
+            except Exception as ex:
+                raise RuntimeError(f"Ex Opening Cassette {cassette_filepath}: {str(ex)}")
+
+            self._index = self._load_index()
+
+    def replay(self, key: str) -> Optional[CassetteEntry]:
+        "returns the recorded exchange of the request, or None if it was never recorded"
+        with self._lock:
+            offset = self._index.get(key)
+
+            if offset is None or self._handle is None:
+                return None
+
+            self._handle.seek(offset)
+            line = self._handle.readline()
+
+        return CassetteEntry(json.loads(line))
+
+    def record(self, key: str, method: str, url: str, query_params: Dict[str, Any], status_code: int, headers: Dict[str, Any], content: bytes,
+               timings: RequestTimings) -> None:
+        "appends the exchange to the cassette, a request made more than once in a run is recorded once"
+        with self._lock:
+            if self._handle is None or key in self._recorded:
+                return
+
+            data: Dict[str, Any] = {
+                "key": key,
+                "request": {"method": method.upper(), "url": url, "query_params": query_params},
+                "status_code": status_code,
+                "headers": dict(headers),
+                "timings": {phase: timings.durations_ns[phase] for phase in NETWORK_PHASES},
+                "wire_bytes": timings.wire_bytes,
+            }
+
+            try:
+                data["body"] = content.decode("utf-8")
+            except UnicodeDecodeError:
+                data["body_base64"] = base64.b64encode(content).decode("ascii")
+
+            self._handle.seek(0, os.SEEK_END)
+            offset = self._handle.tell()
+            self._handle.write(json.dumps(data).encode("utf-8") + b"\n")
+            self._index[key] = offset
+            self._recorded[key] = True
+
+    def close(self) -> None:
+        "writes the index of a recorded cassette, so the next run need not rebuild it, and closes the cassette file"
+        with self._lock:
+            self._close()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _close(self) -> None:
+        if self._handle is None:
+            return
+
+        if self.recording:
+            self._handle.flush()
+            self._save_index()
+
+        self._handle.close()
+        self._handle = None
+
+    def _load_index(self) -> Dict[str, int]:
+        "loads the saved index if it matches the cassette file, otherwise rebuilds it with one scan of the file"
+        self._handle.seek(0, os.SEEK_END)
+        size = self._handle.tell()
+        index_filepath = os.path.join(self.directory, INDEX_FILENAME)
+
+        if os.path.isfile(index_filepath):
+            try:
+                with open(index_filepath, "r") as fhandle:
+                    saved = json.load(fhandle)
+
+                if saved["size"] == size:
+                    return {str(key): int(offset) for key, offset in saved["offsets"].items()}
+            except Exception:
+                pass
+
+        # later lines of the same request replace earlier ones
+        result: Dict[str, int] = {}
+        self._handle.seek(0)
+        offset = 0
+
+        for line in self._handle:
+            if line.startswith(_KEY_PREFIX):
+                result[line[len(_KEY_PREFIX):len(_KEY_PREFIX) + _KEY_LENGTH].decode("ascii")] = offset
+            elif len(line.strip()):
+                result[json.loads(line)["key"]] = offset
+
+            offset += len(line)
+
+        return result
+
+    def _save_index(self) -> None:
+        self._handle.seek(0, os.SEEK_END)
+        index_filepath = os.path.join(self.directory, INDEX_FILENAME)
+
+        try:
+            with open(index_filepath, "w") as fhandle:
+                json.dump({"size": self._handle.tell(), "offsets": self._index}, fhandle)
+        except Exception as ex:
+            raise RuntimeError(f"Ex Writing Cassette Index {index_filepath}: {str(ex)}")
+
+
+# shared by every request runner, set up from the run settings in 'before_all'
+cassette = Cassette()
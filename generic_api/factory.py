@@ -1,5 +1,86 @@
+import hashlib
+import threading
+from typing import Dict, Tuple, Type
+
 from generic_api.request_runner import RequestRunner
 from generic_api.example_request_runner import ExampleRequestRunner
+from generic_api.async_request_runner import AsyncRequestRunner, SyncRunnerAdapter, DEFAULT_MAX_CONCURRENCY
+
+# the request runner class used for each protocol, custom protocols add themselves with 'register_runner'
+runner_registry: Dict[str, Type[RequestRunner]] = {
+    "http": RequestRunner,
+    "http_example": ExampleRequestRunner,
+}
+
+# protocols with a native asyncio runner, any other protocol runs its RequestRunner through the SyncRunnerAdapter
+async_runner_registry: Dict[str, Type[AsyncRequestRunner]] = {
+    "http": AsyncRequestRunner,
+}
+
+# runner instances re-used for the life of the run, keyed by (lowercase protocol, auth_url, username, password digest)
+RunnerKey = Tuple[str, str, str, str]
+_runners: Dict[RunnerKey, RequestRunner] = {}
+_async_runners: Dict[RunnerKey, AsyncRequestRunner] = {}
+_runners_lock = threading.Lock()
+
+
+def _runner_key(protocol: str, auth_url: str, username: str, password: str) -> RunnerKey:
+    "the password is only held as a digest so it is not kept in the cache in plain text"
+    return protocol, auth_url, username, hashlib.sha256(password.encode()).hexdigest()
+
+
+def register_runner(protocol: str, runner_class: Type[RequestRunner]) -> Type[RequestRunner]:
+    """
+    registers a request runner class for a custom protocol, replacing any class already registered for it.
+    The protocol MUST contain the verb 'http' to be supported as HTTP requests
+    """
+    protocol = protocol.lower()
+
+    if protocol.find("http") < 0:
+        raise ValueError(f"Protocol {protocol} Must Contain 'http'")
+
+    if not isinstance(runner_class, type) or not issubclass(runner_class, RequestRunner):
+        raise TypeError(f"Runner For Protocol {protocol} Must Derive From RequestRunner")
+
+    with _runners_lock:
+        runner_registry[protocol] = runner_class
+
+        # drop instances of a previously registered class
+        for key in [key for key in _runners if key[0] == protocol]:
+            del _runners[key]
+
+        # a registered protocol now has its own RequestRunner, so must no longer use the native asyncio runner
+        async_runner_registry.pop(protocol, None)
+        for key in [key for key in _async_runners if key[0] == protocol]:
+            del _async_runners[key]
+
+    return runner_class
+
+
+def register_async_runner(protocol: str, runner_class: Type[AsyncRequestRunner]) -> Type[AsyncRequestRunner]:
+    "registers a native asyncio request runner class for a protocol, replacing any class already registered for it"
+    protocol = protocol.lower()
+
+    if protocol.find("http") < 0:
+        raise ValueError(f"Protocol {protocol} Must Contain 'http'")
+
+    if not isinstance(runner_class, type) or not issubclass(runner_class, AsyncRequestRunner):
+        raise TypeError(f"Async Runner For Protocol {protocol} Must Derive From AsyncRequestRunner")
+
+    with _runners_lock:
+        async_runner_registry[protocol] = runner_class
+
+        for key in [key for key in _async_runners if key[0] == protocol]:
+            del _async_runners[key]
+
+    return runner_class
+
+
+def clear_runner_cache() -> None:
+    "removes every cached runner instance"
+    with _runners_lock:
+        _runners.clear()
+        _async_runners.clear()
 
 
 def request_factory(protocol: str, auth_url: str, username: str, password: str) -> RequestRunner:
@@ -7,12 +88,54 @@ def request_factory(protocol: str, auth_url: str, username: str, password: str)
     factory for creating request runner classes. Custom auth hooks can be added by changing the protocol in the test
     e.g: 'http' becomes 'http_openstack' or similar - They MUST all contain the verb 'http' to be supported as HTTP
         requests
+    Runner instances are cached for the life of the run, so the pooled connections and auth state they hold survive
+        across scenarios
+    """
+    protocol = protocol.lower()
+    key = _runner_key(protocol, auth_url, username, password)
+    runner = _runners.get(key)
+
+    if runner is not None:
+        return runner
+
+    with _runners_lock:
+        # another thread may have created the runner whilst this one waited for the lock
+        runner = _runners.get(key)
+
+        if runner is not None:
+            return runner
+
+        runner_class = runner_registry.get(protocol)
+
+        if runner_class is None:
+            raise TypeError("Protocol " + protocol + " Not Supported")
+
+        runner = runner_class(auth_url=auth_url, username=username, password=password)
+        _runners[key] = runner
+        return runner
+
+
+def async_request_factory(protocol: str, auth_url: str, username: str, password: str,
+                          max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> AsyncRequestRunner:
+    """
+    factory for creating asyncio request runners. Protocols with a native runner in async_runner_registry get a
+        cached instance of it, any other protocol wraps its RequestRunner from 'request_factory' in a new
+        SyncRunnerAdapter - so custom runners with their own auth hooks keep working.
+    The caller must await 'close' on the runner before its event loop ends
     """
     protocol = protocol.lower()
+    key = _runner_key(protocol, auth_url, username, password)
+
+    with _runners_lock:
+        runner_class = async_runner_registry.get(protocol)
+
+        if runner_class is not None:
+            runner = _async_runners.get(key)
+
+            if runner is None or runner.max_concurrency != max_concurrency:
+                runner = runner_class(auth_url=auth_url, username=username, password=password, max_concurrency=max_concurrency)
+                _async_runners[key] = runner
 
-    if protocol == "http":
-        return RequestRunner(auth_url=auth_url, username=username, password=password)
-    elif protocol == "http_example":
-        return ExampleRequestRunner(auth_url=auth_url, username=username, password=password)
+            return runner
 
-    raise TypeError("Protocol " + protocol + " Not Supported")
+    return SyncRunnerAdapter(request_factory(protocol, auth_url, username, password), max_concurrency=max_concurrency)
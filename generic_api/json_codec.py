@@ -0,0 +1,119 @@
+import json
+import threading
+from typing import Any, Callable, Dict, Union
+
+try:
+    import orjson
+except ImportError:  # optional dependency, the fastest backend
+    orjson = None  # type: ignore
+
+try:
+    import ujson
+except ImportError:  # optional dependency
+    ujson = None  # type: ignore
+
+# the backend used when none is configured is the first of these that is installed
+CODEC_PREFERENCE = ("orjson", "ujson", "json")
+
+
+class JSONCodec():
+    "a JSON backend, encoding straight to UTF-8 bytes and decoding straight from bytes (or text)"
+
+    def __init__(self, name: str, dumps: Callable[[Any], bytes], loads: Callable[[Union[bytes, str]], Any]):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+    def __repr__(self) -> str:
+        return f"JSONCodec({self.name})"
+
+
+def _json_dumps(data: Any) -> bytes:
+    return json.dumps(data).encode("utf-8")
+
+
+def _ujson_dumps(data: Any) -> bytes:
+    try:
+        return ujson.dumps(data, ensure_ascii=False).encode("utf-8")
+    except OverflowError:
+        return _json_dumps(data)
+
+
+def _ujson_loads(raw: Union[bytes, str]) -> Any:
+    try:
+        return ujson.loads(raw)
+    except ValueError:
+        # e.g. integers wider than 64 bits, which the standard library can still decode
+        return json.loads(raw)
+
+
+def _orjson_dumps(data: Any) -> bytes:
+    try:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        # e.g. integers wider than 64 bits, which the standard library can still encode
+        return _json_dumps(data)
+
+
+def _orjson_loads(raw: Union[bytes, str]) -> Any:
+    try:
+        return orjson.loads(raw)
+    except ValueError:
+        # e.g. NaN or integers wider than 64 bits, which the standard library can still decode
+        return json.loads(raw)
+
+
+class JSONCodecRegistry():
+    """
+    The installed JSON backends by name, the one response bodies are decoded with and the one request bodies are
+        encoded with. The fast backends lay out JSON differently to the standard library, so request bodies keep the
+        standard library's bytes unless a backend is configured by name
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._codecs: Dict[str, JSONCodec] = {"json": JSONCodec("json", _json_dumps, json.loads)}
+
+        if ujson is not None:
+            self._codecs["ujson"] = JSONCodec("ujson", _ujson_dumps, _ujson_loads)
+        if orjson is not None:
+            self._codecs["orjson"] = JSONCodec("orjson", _orjson_dumps, _orjson_loads)
+
+        self.default = self._preferred()
+        self.encoder = self._codecs["json"]
+
+    def register(self, codec: JSONCodec) -> JSONCodec:
+        "adds a backend, replacing any registered with the same name. It is not used unless configured"
+        with self._lock:
+            self._codecs[codec.name] = codec
+
+        return codec
+
+    def configure(self, name: str = "") -> None:
+        "sets the backend used by name, or decodes with the fastest installed backend if no name is given"
+        with self._lock:
+            if not len(name):
+                self.default = self._preferred()
+                self.encoder = self._codecs["json"]
+            elif name in self._codecs:
+                self.default = self.encoder = self._codecs[name]
+            else:
+                raise ValueError(f"JSON Codec {name} Not Installed; Available: {', '.join(sorted(self._codecs))}")
+
+    def get(self, name: str) -> JSONCodec:
+        "returns the backend with the given name"
+        if name not in self._codecs:
+            raise ValueError(f"JSON Codec {name} Not Installed")
+
+        return self._codecs[name]
+
+    def names(self) -> list:
+        "returns the names of every installed backend"
+        return sorted(self._codecs)
+
+    def _preferred(self) -> JSONCodec:
+        return next(self._codecs[name] for name in CODEC_PREFERENCE if name in self._codecs)
+
+
+# shared by every request runner, selected with the 'json_codec' run setting
+json_codecs = JSONCodecRegistry()
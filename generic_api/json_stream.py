@@ -0,0 +1,352 @@
+import codecs
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Pattern, Tuple
+
+_NOT_WHITESPACE = re.compile(r"[^ \t\n\r]")
+# the rest of a string after its opening quote, up to & including the closing quote
+_STRING_REST = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+# a number, true, false or null up to the character that ends it
+_SCALAR = re.compile(r"[^ \t\n\r,\]}]+")
+_VALID_SCALAR = re.compile(r"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?|true|false|null")
+_DECODER = json.JSONDecoder()
+
+# objects & arrays skipped over are decoded whole (and thrown away) up to this size, larger ones are walked member by member
+MAX_SKIP_DECODE_SIZE = 1024 * 1024
+
+
+class PartialJSONBody():
+    """
+    The data found at the dot paths requested when a JSON response body was streamed, in place of the whole body.
+    'missing' holds the requested paths that are not in the body, any path that was never requested is unknown
+    """
+
+    def __init__(self, values: Dict[str, Any], missing: Tuple[str, ...]):
+        self.values = values
+        self.missing = missing
+
+    def get(self, dot_path: str) -> Any:
+        "returns the data found at the dot path, or raises ValueError if it was not found or not requested"
+        if dot_path in self.values:
+            return self.values[dot_path]
+
+        if dot_path in self.missing:
+            raise ValueError(f"Required Path Not Found In Response: {dot_path}")
+
+        raise ValueError(f"Path Was Not Extracted From The Streamed Response: {dot_path}")
+
+    def __repr__(self) -> str:
+        return f"PartialJSONBody({self.values!r})"
+
+
+class _PathNode():
+    "a key of the requested dot paths, shared by every path starting with the same keys"
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_PathNode"] = {}
+        # the paths ending at this node, and every path below it with its keys relative to this node
+        self.paths: List[str] = []
+        self.descendants: List[Tuple[str, Tuple[str, ...]]] = []
+
+
+class _Done(Exception):
+    "raised once every requested path has been found, so the rest of the body is never read"
+
+
+class _StreamReader():
+    "decodes the body chunk by chunk, only keeping the text that has not been parsed yet (or is being captured)"
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks: Iterator[bytes] = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._eof = False
+        self._capture: Optional[List[str]] = None
+        self._capture_start = 0
+        self.buf = ""
+        self.pos = 0
+
+    def more(self) -> bool:
+        "reads more of the body into the buffer, returns False at the end of the body"
+        text = ""
+
+        while not len(text):
+            if self._eof:
+                return False
+
+            chunk = next(self._chunks, None)
+
+            if chunk is None:
+                self._eof = True
+                text = self._decoder.decode(b"", final=True)
+            else:
+                text = self._decoder.decode(chunk)
+
+        if self._capture is not None:
+            self._capture.append(self.buf[self._capture_start:self.pos])
+            self._capture_start = 0
+
+        self.buf = self.buf[self.pos:] + text
+        self.pos = 0
+        return True
+
+    @property
+    def eof(self) -> bool:
+        "whether the whole body has been read into the buffer"
+        return self._eof
+
+    def peek(self) -> str:
+        "skips whitespace, returns the next character without consuming it or '' at the end of the body"
+        while True:
+            found = _NOT_WHITESPACE.search(self.buf, self.pos)
+
+            if found is not None:
+                self.pos = found.start()
+                return found.group()
+
+            self.pos = len(self.buf)
+
+            if not self.more():
+                return ""
+
+    def expect(self, char: str) -> None:
+        "consumes the next character, which must be the one given"
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' At Position {self.pos}")
+
+        self.pos += 1
+
+    def match(self, pattern: Pattern) -> str:
+        "consumes the pattern at the current position, reading more of the body if it could run past the buffer"
+        while True:
+            result = pattern.match(self.buf, self.pos)
+
+            # a match reaching the end of the buffer may continue in the next chunk
+            if result is not None and (result.end() < len(self.buf) or self._eof):
+                self.pos = result.end()
+                return result.group()
+
+            if not self.more():
+                if result is None:
+                    raise ValueError(f"Invalid JSON At Position {self.pos}")
+
+    def start_capture(self) -> None:
+        "starts keeping the text parsed from the current position"
+        self._capture = []
+        self._capture_start = self.pos
+
+    def end_capture(self) -> str:
+        "returns the text parsed since 'start_capture'"
+        pieces = self._capture or []
+        pieces.append(self.buf[self._capture_start:self.pos])
+        self._capture = None
+        return "".join(pieces)
+
+
+class _PathExtractor():
+    "walks the JSON body once, parsing only the values at the requested paths and skipping over everything else"
+
+    def __init__(self, reader: _StreamReader, root: _PathNode, wanted: int):
+        self.reader = reader
+        self.root = root
+        self.values: Dict[str, Any] = {}
+        self._remaining = wanted
+
+    def extract(self) -> bool:
+        "extracts the values, returns False if the body was empty"
+        if not len(self.reader.peek()):
+            return False
+
+        try:
+            self._value(self.root)
+        except _Done:
+            return True
+
+        if len(self.reader.peek()):
+            raise ValueError(f"Extra Data At Position {self.reader.pos}")
+
+        return True
+
+    def _value(self, node: Optional[_PathNode]) -> None:
+        "parses the value at the node, or skips it if no requested path goes through it"
+        if node is None:
+            self._skip()
+        elif len(node.paths):
+            self._capture(node)
+        else:
+            char = self.reader.peek()
+
+            if char == "{":
+                self._object(node)
+            elif char == "[":
+                self._array(node)
+            else:
+                self._skip()
+
+    def _capture(self, node: _PathNode) -> None:
+        "parses the whole value at the node, the paths below it are looked up in the parsed value"
+        self.reader.peek()
+        self.reader.start_capture()
+        self._skip()
+        value = json.loads(self.reader.end_capture())
+
+        for dot_path in node.paths:
+            self.values[dot_path] = value
+
+        for dot_path, keys in node.descendants:
+            found, data = _lookup(value, keys)
+
+            if found:
+                self.values[dot_path] = data
+
+        self._remaining -= 1
+
+        if not self._remaining:
+            raise _Done()
+
+    def _object(self, node: _PathNode) -> None:
+        "walks the members of an object, parsing those a requested path goes through"
+        reader = self.reader
+        reader.expect("{")
+
+        if reader.peek() == "}":
+            reader.pos += 1
+            return
+
+        while True:
+            reader.expect('"')
+            raw_key = reader.match(_STRING_REST)
+            key = json.loads('"' + raw_key) if "\\" in raw_key else raw_key[:-1]
+            reader.expect(":")
+            self._value(node.children.get(key))
+
+            char = reader.peek()
+            reader.pos += 1
+
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError(f"Expected ',' Or '}}' At Position {reader.pos - 1}")
+
+    def _array(self, node: _PathNode) -> None:
+        "walks the items of an array, parsing those a requested path goes through"
+        reader = self.reader
+        reader.expect("[")
+
+        if reader.peek() == "]":
+            reader.pos += 1
+            return
+
+        index = 0
+
+        while True:
+            self._value(node.children.get(str(index)))
+            index += 1
+
+            char = reader.peek()
+            reader.pos += 1
+
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"Expected ',' Or ']' At Position {reader.pos - 1}")
+
+    def _skip(self) -> None:
+        "consumes the next value without parsing it"
+        reader = self.reader
+        char = reader.peek()
+
+        if char == '"':
+            reader.pos += 1
+            reader.match(_STRING_REST)
+        elif char in ("{", "["):
+            self._skip_container()
+        elif len(char):
+            if _VALID_SCALAR.fullmatch(reader.match(_SCALAR)) is None:
+                raise ValueError(f"Invalid Value At Position {reader.pos}")
+        else:
+            raise ValueError("Unexpected End Of JSON")
+
+    def _skip_container(self) -> None:
+        "consumes an object or array, decoding it in one go if it is small enough or else walking its members"
+        reader = self.reader
+
+        while True:
+            try:
+                reader.pos = _DECODER.raw_decode(reader.buf, reader.pos)[1]
+                return
+            except ValueError:
+                # the container may carry on in the next chunk
+                if reader.eof or len(reader.buf) - reader.pos > MAX_SKIP_DECODE_SIZE or not reader.more():
+                    break
+
+        if reader.peek() == "{":
+            self._object(_SKIPPED)
+        else:
+            self._array(_SKIPPED)
+
+
+# a node no requested path goes through
+_SKIPPED = _PathNode()
+
+
+def _lookup(data: Any, keys: Tuple[str, ...]) -> Tuple[bool, Any]:
+    "looks up the keys below an already parsed value, returns whether they were found and the data at them"
+    for key in keys:
+        try:
+            if isinstance(data, list):
+                data = data[int(key)]
+            else:
+                data = data[key]
+        except (KeyError, IndexError, TypeError, ValueError):
+            return False, None
+
+    return True, data
+
+
+def _build_path_tree(dot_paths: Iterable[str]) -> Tuple[_PathNode, int]:
+    "builds the tree of the requested paths, returns it and the number of values to capture"
+    root = _PathNode()
+
+    for dot_path in dict.fromkeys(dot_paths):
+        node = root
+        keys = tuple(dot_path.split("."))
+
+        for depth, key in enumerate(keys):
+            node.descendants.append((dot_path, keys[depth:]))
+            node = node.children.setdefault(key, _PathNode())
+
+        node.paths.append(dot_path)
+
+    # a path below another requested path is looked up in that path's value, rather than captured itself
+    wanted = 0
+    pending = [root]
+
+    while len(pending):
+        node = pending.pop()
+
+        if len(node.paths):
+            wanted += 1
+        else:
+            pending.extend(node.children.values())
+
+    return root, wanted
+
+
+def extract_json_paths(chunks: Iterable[bytes], dot_paths: Iterable[str]) -> Optional[PartialJSONBody]:
+    """
+    parses a UTF-8 JSON body from an iterable of byte chunks, keeping only the data at the given dot paths. Memory is
+        bounded by the size of the requested values and a chunk, not the size of the body, and the body is only read
+        until every requested path has been found. Returns None if the body is empty.
+    Negative array indices cannot be streamed, so are always reported missing
+    """
+    root, wanted = _build_path_tree(dot_paths)
+    extractor = _PathExtractor(_StreamReader(chunks), root, wanted)
+
+    try:
+        if not extractor.extract():
+            return None
+    except (ValueError, UnicodeDecodeError) as ex:
+        raise ValueError(f"Ex Decoding JSON: {str(ex)}")
+
+    missing = tuple(dot_path for dot_path, _ in root.descendants if dot_path not in extractor.values)
+    return PartialJSONBody(extractor.values, missing)
@@ -0,0 +1,47 @@
+import time
+from typing import Any, Callable, Optional
+
+from generic_api.metrics import metrics
+from generic_api.request_timing import RequestTimings
+
+
+class LazyResponseBody():
+    """
+    The raw bytes of a response body, only decoded the first time the data is needed. The decoded data is kept, so
+        every assertion on the body shares a single decode, and the raw bytes are dropped once it has run
+    """
+
+    def __init__(self, raw: bytes, decoder: Callable[[bytes], Any], timings: Optional[RequestTimings] = None):
+        self.raw: Optional[bytes] = raw
+        self._size = len(raw)
+        self._decoder: Optional[Callable[[bytes], Any]] = decoder
+        self._timings = timings
+        self._data: Any = None
+
+    @property
+    def decoded(self) -> bool:
+        "whether the body has been decoded yet"
+        return self._decoder is None
+
+    def decode(self) -> Any:
+        "returns the decoded body, decoding it on the first call & adding the time taken to the request's decode phase"
+        if self._decoder is not None and self.raw is not None:
+            start = time.perf_counter_ns()
+            self._data = self._decoder(self.raw)
+            # the decoded data replaces the raw bytes, and the decoder holds the response, so both are dropped
+            self.raw = None
+            self._decoder = None
+
+            duration_ns = time.perf_counter_ns() - start
+            metrics.add_stage("decode", duration_ns)
+
+            if self._timings is not None:
+                self._timings.add("decode", duration_ns)
+
+        return self._data
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __repr__(self) -> str:
+        return f"LazyResponseBody({self._size} bytes{', decoded' if self.decoded else ''})"
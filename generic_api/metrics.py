@@ -0,0 +1,233 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from generic_api.request_timing import RequestTimings
+
+METRICS_FORMATS = ("jsonl", "prometheus")
+# the request phases recorded as stages, 'total' overlaps the others so is left out
+REQUEST_STAGES = ("dns", "connect", "tls", "ttfb", "download", "decompress", "decode")
+
+
+def _escape_label(value: str) -> str:
+    "escapes a Prometheus label value"
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    "formats the labels of a Prometheus sample"
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels) + "}"
+
+
+class _Record():
+    "the duration & per-stage time of the step or scenario currently running"
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start_ns = time.perf_counter_ns()
+        self.stages_ns: Dict[str, int] = {}
+
+    def add(self, stage: str, duration_ns: int) -> None:
+        "adds time spent in the stage"
+        self.stages_ns[stage] = self.stages_ns.get(stage, 0) + duration_ns
+
+    def stages_ms(self) -> Dict[str, float]:
+        "returns the time spent in each stage in milliseconds"
+        return {stage: duration_ns / 1_000_000 for stage, duration_ns in self.stages_ns.items()}
+
+
+class MetricsRecorder():
+    """
+    Opt-in, process-wide recorder of where the time of a run goes: the duration of every step & scenario, and the time
+        spent in each stage (render, encode, the request phases, decode) during them.
+    Records are appended to a JSON-lines file as each step & scenario ends, or summed into a Prometheus text-format
+        file written when the run ends. When no file is configured every call returns straight away
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.filepath = ""
+        self.format = "jsonl"
+        self.run_id = ""
+        self._feature = ""
+        self._scenario: Optional[_Record] = None
+        self._step: Optional[_Record] = None
+        self._step_line = 0
+        self._handle: Any = None
+        # the Prometheus summaries: metric name -> labels -> [sum of seconds, count]
+        self._summaries: Dict[str, Dict[Tuple[Tuple[str, str], ...], List[float]]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        "whether metrics are being recorded"
+        return len(self.filepath) > 0
+
+    def configure(self, filepath: str = "", metrics_format: str = "jsonl") -> None:
+        "sets the file metrics are written to, an empty filepath disables recording"
+        if metrics_format not in METRICS_FORMATS:
+            raise ValueError(f"Invalid Metrics Format {metrics_format}; Available: {', '.join(METRICS_FORMATS)}")
+
+        with self._lock:
+            self._close()
+            self.filepath = filepath
+            self.format = metrics_format
+            self.run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+            self._summaries = {}
+
+            if self.enabled and metrics_format == "jsonl":
+                try:
+                    os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+                    # appended to, so the records of many runs build up in one file
+                    self._handle = open(filepath, "a")
+                except Exception as ex:
+                    raise RuntimeError(f"Ex Opening Metrics File {filepath}: {str(ex)}")
+
+    def start_scenario(self, feature: str, scenario: str) -> None:
+        "starts timing a scenario"
+        if self.enabled:
+            with self._lock:
+                self._feature = feature
+                self._scenario = _Record(scenario)
+
+    def end_scenario(self, status: str) -> None:
+        "records the duration & stages of the current scenario"
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if self._scenario is not None:
+                self._write("scenario", self._scenario, status, {})
+                self._scenario = None
+
+    def start_step(self, step: str, line: int = 0) -> None:
+        "starts timing a step"
+        if self.enabled:
+            with self._lock:
+                self._step = _Record(step)
+                self._step_line = line
+
+    def end_step(self, status: str) -> None:
+        "records the duration & stages of the current step"
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if self._step is not None:
+                self._write("step", self._step, status, {"line": self._step_line})
+                self._step = None
+
+    def add_stage(self, stage: str, duration_ns: int) -> None:
+        "adds time spent in a stage to the current step & scenario, from whichever thread it was spent on"
+        if not self.enabled:
+            return
+
+        with self._lock:
+            for record in (self._step, self._scenario):
+                if record is not None:
+                    record.add(stage, duration_ns)
+
+    def add_timings(self, timings: RequestTimings) -> None:
+        "adds the phases of a request as stages"
+        if not self.enabled:
+            return
+
+        for stage in REQUEST_STAGES:
+            if timings.durations_ns[stage]:
+                self.add_stage(stage, timings.durations_ns[stage])
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        "adds the time spent in the block to the stage"
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter_ns()
+
+        try:
+            yield
+        finally:
+            self.add_stage(stage, time.perf_counter_ns() - start)
+
+    def close(self) -> None:
+        "closes the JSON-lines file, or writes the Prometheus file"
+        with self._lock:
+            self._close()
+
+    def _write(self, record_type: str, record: _Record, status: str, extra: Dict[str, Any]) -> None:
+        "writes a JSON-lines record, or adds it to the Prometheus summaries"
+        duration_ns = time.perf_counter_ns() - record.start_ns
+        scenario = self._scenario.name if self._scenario is not None else ""
+
+        if self.format == "jsonl":
+            data = {
+                "type": record_type,
+                "run_id": self.run_id,
+                "timestamp": time.time(),
+                "feature": self._feature,
+                "scenario": scenario,
+                "status": status,
+                "duration_ms": duration_ns / 1_000_000,
+                "stages_ms": record.stages_ms(),
+            }
+
+            if record_type == "step":
+                data["step"] = record.name
+
+            data.update(extra)
+            self._handle.write(json.dumps(data) + "\n")
+            return
+
+        labels: Tuple[Tuple[str, str], ...] = (("feature", self._feature), ("scenario", scenario))
+
+        if record_type == "step":
+            labels += (("step", record.name),)
+
+        self._observe(f"behave_{record_type}_duration_seconds", labels + (("status", status),), duration_ns)
+
+        for stage, stage_ns in record.stages_ns.items():
+            self._observe(f"behave_{record_type}_stage_duration_seconds", labels + (("stage", stage),), stage_ns)
+
+    def _observe(self, name: str, labels: Tuple[Tuple[str, str], ...], duration_ns: int) -> None:
+        "adds a duration to the summary with the given name & labels"
+        summary = self._summaries.setdefault(name, {}).setdefault(labels, [0.0, 0])
+        summary[0] += duration_ns / 1_000_000_000
+        summary[1] += 1
+
+    def _close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+        if self.enabled and self.format == "prometheus" and len(self._summaries):
+            self._write_prometheus()
+
+    def _write_prometheus(self) -> None:
+        "writes every summary in the Prometheus text format, through a temp file so scrapers never read half a file"
+        lines = []
+
+        for name in sorted(self._summaries):
+            lines.append(f"# TYPE {name} summary")
+
+            for labels, (total, count) in self._summaries[name].items():
+                lines.append(f"{name}_sum{_labels(labels)} {total:.9f}")
+                lines.append(f"{name}_count{_labels(labels)} {count:.0f}")
+
+        temp_filepath = f"{self.filepath}.tmp"
+
+        try:
+            os.makedirs(os.path.dirname(self.filepath) or ".", exist_ok=True)
+
+            with open(temp_filepath, "w") as fhandle:
+                fhandle.write("\n".join(lines) + "\n")
+
+            os.replace(temp_filepath, self.filepath)
+        except Exception as ex:
+            raise RuntimeError(f"Ex Writing Metrics File {self.filepath}: {str(ex)}")
+
+
+# shared by the environment hooks & request runners, set up from the run settings in 'before_all'
+metrics = MetricsRecorder()
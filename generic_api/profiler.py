@@ -0,0 +1,157 @@
+import cProfile
+import os
+import re
+import sys
+import threading
+from types import FrameType
+from typing import Dict, List, Optional
+
+PROFILE_MODES = ("off", "scenario", "run")
+DEFAULT_PROFILE_DIR = "profiles"
+DEFAULT_SAMPLE_INTERVAL_MS = 5
+
+# the root frames of the collapsed stacks, splitting time spent waiting on the network from time spent running code
+NETWORK_WAIT = "network-wait"
+CPU = "cpu"
+# a thread whose innermost Python frame is one of these is blocked in a socket call the sampler cannot see into
+_NETWORK_FILES = ("socket.py", "ssl.py", "selectors.py")
+_NETWORK_FUNCTIONS = ("create_connection", "getaddrinfo")
+# a thread whose innermost Python frame is in these is blocked on a lock, e.g. the behave thread waiting in
+# 'future.result()' or 'thread.join()' on the worker threads of a load test, which wait on the network in turn
+_THREAD_WAIT_FILES = ("threading.py",)
+_UNSAFE_FILENAME = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def is_network_wait(frame: FrameType) -> bool:
+    "whether the innermost frame of a thread is waiting on the network, or on threads that are"
+    filename = os.path.basename(frame.f_code.co_filename)
+    return filename in _NETWORK_FILES or filename in _THREAD_WAIT_FILES or frame.f_code.co_name in _NETWORK_FUNCTIONS
+
+
+def collapse_stack(frame: FrameType) -> str:
+    "returns the stack of the frame outermost first, in the collapsed format read by flamegraph tools"
+    names: List[str] = []
+    root = NETWORK_WAIT if is_network_wait(frame) else CPU
+    current: Optional[FrameType] = frame
+
+    while current is not None:
+        code = current.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)})".replace(";", ":"))
+        current = current.f_back
+
+    names.append(root)
+    return ";".join(reversed(names))
+
+
+class StackSampler(threading.Thread):
+    "samples the stack of another thread at a fixed interval, counting how often each stack is seen"
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Dict[str, int] = {}
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+
+            if frame is not None:
+                stack = collapse_stack(frame)
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def stop(self) -> None:
+        "stops sampling, waiting for the sample being taken to finish"
+        self._stop_event.set()
+        self.join()
+
+
+class Profiler():
+    """
+    Opt-in, process-wide profiler of either each scenario or the whole run, set up from the run settings in
+        'before_all'. A scenario or feature tagged '@profile' is profiled whatever the mode.
+    Each profile writes a '.pstats' file of the deterministic cProfile of the thread running behave, and a '.folded'
+        file of its sampled stacks for flamegraph tools, rooted at 'network-wait' or 'cpu'. Only one profile runs at a
+        time, so a scenario is not profiled on its own while the whole run is
+    """
+
+    def __init__(self) -> None:
+        self.mode = "off"
+        self.directory = DEFAULT_PROFILE_DIR
+        self.sample_interval = DEFAULT_SAMPLE_INTERVAL_MS / 1000
+        self._count = 0
+        self._name = ""
+        self._scenario_started = False
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+
+    @property
+    def active(self) -> bool:
+        "whether a profile is being taken"
+        return self._profile is not None
+
+    def configure(self, mode: str = "off", directory: str = DEFAULT_PROFILE_DIR, sample_interval_ms: int = DEFAULT_SAMPLE_INTERVAL_MS) -> None:
+        "sets what is profiled, where the profiles are written and how often stacks are sampled"
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Invalid Profile Mode {mode}; Available: {', '.join(PROFILE_MODES)}")
+        if sample_interval_ms <= 0:
+            raise ValueError("Profile Sample Interval Must Be Greater Than 0")
+
+        self.stop()
+        self.mode = mode
+        self.directory = directory or DEFAULT_PROFILE_DIR
+        self.sample_interval = sample_interval_ms / 1000
+        self._count = 0
+
+    def start(self, name: str) -> bool:
+        "starts profiling the calling thread, returns False if a profile is already being taken"
+        if self.active:
+            return False
+
+        self._count += 1
+        self._name = f"{self._count:04d}-{_UNSAFE_FILENAME.sub('_', name).strip('_')}"
+        self._sampler = StackSampler(threading.get_ident(), self.sample_interval)
+        self._sampler.start()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        return True
+
+    def stop(self) -> str:
+        "stops the profile being taken and writes its files, returns their path without the extension"
+        if self._profile is None or self._sampler is None:
+            return ""
+
+        self._profile.disable()
+        self._sampler.stop()
+        filepath = os.path.join(self.directory, self._name)
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self._profile.dump_stats(f"{filepath}.pstats")
+
+            with open(f"{filepath}.folded", "w") as fhandle:
+                for stack, count in sorted(self._sampler.stacks.items()):
+                    fhandle.write(f"{stack} {count}\n")
+        except Exception as ex:
+            raise RuntimeError(f"Ex Writing Profile {filepath}: {str(ex)}")
+        finally:
+            self._profile = None
+            self._sampler = None
+
+        return filepath
+
+    def start_scenario(self, name: str) -> None:
+        "starts profiling a scenario if every scenario is profiled"
+        if self.mode == "scenario":
+            self._scenario_started = self.start(name)
+
+    def stop_scenario(self) -> None:
+        "stops profiling a scenario if it was started by 'start_scenario', rather than a tag on it or its feature"
+        if self._scenario_started:
+            self._scenario_started = False
+            self.stop()
+
+
+# shared by the environment hooks & the 'profile' fixture, set up from the run settings in 'before_all'
+profiler = Profiler()
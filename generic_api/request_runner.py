@@ -1,6 +1,333 @@
+import os
 import requests
-import json
-from typing import Dict, Callable, Any, Tuple, Optional
+import time
+import zlib
+from typing import BinaryIO, Dict, Callable, Any, Iterable, Iterator, List, Mapping, Tuple, Optional, Union
+
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.response import HTTPResponse
+
+from generic_api.cassette import cassette, request_key, CassetteEntry
+from generic_api.json_codec import json_codecs
+from generic_api.json_stream import extract_json_paths, PartialJSONBody
+from generic_api.lazy_body import LazyResponseBody
+from generic_api.metrics import metrics
+from generic_api.session_pool import session_pool
+from generic_api.request_timing import RequestTimings, timing_scope
+from generic_api.token_cache import token_cache
+
+# the size of the chunks a streamed response body is read in
+STREAM_CHUNK_SIZE = 64 * 1024
+# the encodings request bodies can be compressed with, mapped to the zlib window bits producing them
+REQUEST_ENCODINGS: Dict[str, int] = {
+    "gzip": 16 + zlib.MAX_WBITS,
+    "deflate": zlib.MAX_WBITS,
+}
+# the content encodings ContentDecoder decompresses as a body downloads, mapped to the zlib window bits reading them
+DECODER_ENCODINGS: Dict[str, int] = {
+    "gzip": 16 + zlib.MAX_WBITS,
+    "x-gzip": 16 + zlib.MAX_WBITS,
+    "deflate": zlib.MAX_WBITS,
+}
+# the content encodings either runner asks for, only those ContentDecoder decompresses so the size over the wire and the
+# decompress phase are always recorded. '*' leaves the choice to the server
+SUPPORTED_ENCODINGS = ("identity",) + tuple(DECODER_ENCODINGS)
+# asked for when no encodings are given, rather than the defaults of requests & aiohttp, which ask for brotli when it is installed
+DEFAULT_ACCEPT_ENCODING = "gzip, deflate"
+
+
+def parse_encodings(header_value: str) -> List[str]:
+    "returns the encodings named in an Accept-Encoding or Content-Encoding header, without their q-values"
+    return [part.split(";")[0].strip().lower() for part in header_value.split(",") if len(part.split(";")[0].strip())]
+
+
+def validate_accept_encoding(accept_encoding: str) -> None:
+    "raises a ValueError if an Accept-Encoding header asks for an encoding that cannot be decompressed"
+    for encoding in parse_encodings(accept_encoding):
+        if encoding not in SUPPORTED_ENCODINGS and encoding != "*":
+            raise ValueError(f"Unsupported Content Encoding {encoding}; Available: {', '.join(SUPPORTED_ENCODINGS)}")
+
+
+def with_default_accept_encoding(headers: Dict[str, Any]) -> Dict[str, Any]:
+    "returns the headers, asking for the DEFAULT_ACCEPT_ENCODING if they do not ask for any encodings"
+    if any(str(key).lower() == "accept-encoding" for key in headers):
+        return headers
+
+    return {**headers, "Accept-Encoding": DEFAULT_ACCEPT_ENCODING}
+
+
+def read_file_chunks(fhandle: BinaryIO) -> Iterator[bytes]:
+    "yields the rest of the file in chunks, so only one chunk is held in memory at a time"
+    while True:
+        chunk = fhandle.read(STREAM_CHUNK_SIZE)
+
+        if not len(chunk):
+            return
+
+        yield chunk
+
+
+def compress_chunks(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    "yields the chunks compressed with the given request encoding as they are read"
+    compressor = zlib.compressobj(wbits=REQUEST_ENCODINGS[encoding])
+
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+
+        if len(data):
+            yield data
+
+    yield compressor.flush()
+
+
+class _ZlibDecoder():
+    "decompresses a body compressed with one of the DECODER_ENCODINGS chunk by chunk"
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        self._decompressor = zlib.decompressobj(DECODER_ENCODINGS[encoding])
+        # deflate bodies should be zlib wrapped but some servers send them raw, which is only known from their first bytes
+        self._detecting = encoding == "deflate"
+        self._buffer = b""
+
+    def decompress(self, data: bytes) -> bytes:
+        if not len(data):
+            return b""
+
+        if self._detecting:
+            self._buffer += data
+
+            try:
+                result = self._decompressor.decompress(data)
+            except zlib.error:
+                self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+                data, self._buffer, self._detecting = self._buffer, b"", False
+                return self._decompressor.decompress(data)
+
+            if len(result):
+                self._buffer, self._detecting = b"", False
+
+            return result
+
+        result = self._decompressor.decompress(data)
+
+        # a gzip body can be several members one after another, each is decompressed in turn
+        while self.encoding != "deflate" and self._decompressor.eof and len(self._decompressor.unused_data):
+            data = self._decompressor.unused_data
+            self._decompressor = zlib.decompressobj(DECODER_ENCODINGS[self.encoding])
+            result += self._decompressor.decompress(data)
+
+        return result
+
+    def flush(self) -> bytes:
+        return self._decompressor.flush()
+
+
+class ContentDecoder():
+    """
+    decompresses a response body chunk by chunk as it downloads, undoing each of its Content-Encodings in turn. The
+        bytes read over the wire and the time spent decompressing them are recorded into 'timings'
+    """
+
+    def __init__(self, encodings: List[str], timings: RequestTimings):
+        if not ContentDecoder.supports(encodings):
+            raise ValueError(f"Unsupported Content Encoding {', '.join(encodings)}; Available: {', '.join(DECODER_ENCODINGS)}")
+
+        self.timings = timings
+        # the encodings are listed in the order they were applied, so are undone in reverse
+        self._decoders = [_ZlibDecoder(encoding) for encoding in reversed(encodings) if encoding != "identity"]
+
+    @staticmethod
+    def supports(encodings: List[str]) -> bool:
+        "whether every one of the encodings can be decompressed"
+        return all(encoding in DECODER_ENCODINGS or encoding == "identity" for encoding in encodings)
+
+    def decompress(self, data: bytes) -> bytes:
+        "returns as much of the body as the chunk read over the wire decompresses to"
+        self.timings.wire_bytes += len(data)
+        return self._run(data, False)
+
+    def flush(self) -> bytes:
+        "returns the rest of the body, once the whole of it has been read over the wire"
+        return self._run(b"", True)
+
+    def _run(self, data: bytes, flush: bool) -> bytes:
+        start = time.perf_counter_ns()
+
+        try:
+            for decoder in self._decoders:
+                data = decoder.decompress(data) + (decoder.flush() if flush else b"")
+        except zlib.error as ex:
+            raise RuntimeError(f"Ex Decompressing Response Body: {str(ex)}")
+        finally:
+            self.timings.add("decompress", time.perf_counter_ns() - start)
+
+        return data
+
+
+class ResponseTooLargeError(AssertionError):
+    "raised when a response body is larger than the maximum size allowed for the request, behave reports it as a failed assertion"
+
+    def __init__(self, method: str, url: str, max_bytes: int, got_bytes: int):
+        super().__init__(f"Response Body Too Large; Max: {max_bytes} Bytes; Got: At Least {got_bytes} Bytes; Request: {method.upper()} {url}")
+        self.max_bytes = max_bytes
+        self.got_bytes = got_bytes
+
+
+# the request preparation & response handling below is shared by RequestRunner and AsyncRequestRunner, so both send
+# the same requests, key them the same in the cassette and time them the same
+
+def prepare_request(runner: Any, method: str, url: str, content_type: str, body: Dict[str, Any], header_params: Dict[str, Any],
+                    authenticate: bool, max_response_bytes: int, accept_encoding: str, body_file: str,
+                    request_encoding: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    validates the arguments of a 'run_request' call of either runner, returns the content type of the body and the
+        headers of the request before its auth token is added
+    """
+    if not len(method) or method not in runner.supported_methods:
+        raise ValueError(f"Method {method} Not Supported Or Invalid")
+    if not len(url):
+        raise ValueError("Invalid URL")
+
+    if len(body) and len(body_file):
+        raise ValueError("Body And Body File Given, Only One Can Be Sent")
+
+    if len(body_file) and not os.path.isfile(body_file):
+        raise ValueError(f"Body File Not Found: {body_file}")
+
+    if request_encoding not in ("", *REQUEST_ENCODINGS):
+        raise ValueError(f"Unsupported Request Encoding {request_encoding}; Available: {', '.join(REQUEST_ENCODINGS)}")
+
+    if (len(body) or len(body_file)) and not len(content_type):
+        if "Content-Type" in header_params:
+            content_type = header_params["Content-Type"]
+        else:
+            raise ValueError("No Content Type Given For Body")
+
+    if authenticate:
+        if not len(runner.auth_url) or not len(runner.username) or not len(runner.password):
+            raise ValueError("Authentication Details Not Populated")
+
+    if max_response_bytes < 0:
+        raise ValueError(f"Invalid max_response_bytes: {max_response_bytes}")
+
+    if len(accept_encoding):
+        validate_accept_encoding(accept_encoding)
+        header_params = {**header_params, "Accept-Encoding": accept_encoding}
+
+    if len(request_encoding) and (len(body) or len(body_file)):
+        header_params = {**header_params, "Content-Encoding": request_encoding}
+
+    return content_type, header_params
+
+
+def get_cassette_key(method: str, url: str, query_params: Dict[str, Any], header_params: Dict[str, Any], body: Dict[str, Any],
+                     body_file: str) -> str:
+    "returns the key of the request in the cassette, or an empty string if the cassette is off"
+    if cassette.mode == "off":
+        return ""
+
+    # a body file is keyed by its path & size rather than read an extra time
+    key_body = {"body_file": body_file, "size": os.path.getsize(body_file)} if len(body_file) else body
+    return request_key(method, url, query_params, header_params, key_body)
+
+
+def encode_request_body(encoder: Callable[[str, Dict[str, Any]], Union[bytes, str]], content_type: str, body: Dict[str, Any],
+                        request_encoding: str) -> Union[bytes, str]:
+    "encodes the body with the runner's encoder, compressing it with the 'request_encoding' if given"
+    with metrics.span("encode"):
+        data = encoder(content_type, body)
+
+        if len(request_encoding):
+            data = b"".join(compress_chunks([data.encode("utf-8") if isinstance(data, str) else data], request_encoding))
+
+    return data
+
+
+def open_body_file(body_file: str, request_encoding: str) -> Tuple[BinaryIO, Union[BinaryIO, Iterator[bytes]]]:
+    """
+    opens the body file, returning it and the body to send - the file itself, sent in blocks with its size as the
+        Content-Length, or if 'request_encoding' is given its chunks compressed as they are read, as the compressed size
+        is unknown until it is sent
+    """
+    try:
+        body_handle = open(body_file, "rb")
+    except Exception as ex:
+        raise RuntimeError(f"Ex Opening Body File {body_file}: {str(ex)}")
+
+    if len(request_encoding):
+        return body_handle, compress_chunks(read_file_chunks(body_handle), request_encoding)
+
+    return body_handle, body_handle
+
+
+def replay_response(cassette_key: str, method: str, url: str) -> CassetteEntry:
+    "returns the recorded response of the request, a request missing from the cassette fails rather than using the network"
+    replayed = cassette.replay(cassette_key)
+
+    if replayed is None:
+        raise RuntimeError(f"No Recorded Response In Cassette For {method.upper()} {url}")
+
+    return replayed
+
+
+def use_cassette(cassette_key: str, replayed: Optional[CassetteEntry], method: str, url: str, query_params: Dict[str, Any],
+                 status_code: int, resp_headers: Dict[str, Any], content: Optional[bytes], timings: RequestTimings) -> None:
+    "restores the recorded network timings of a replayed response, or records the response if the cassette is recording"
+    if replayed is not None:
+        replayed.restore_timings(timings)
+    elif cassette.recording:
+        cassette.record(cassette_key, method, url, query_params, status_code, resp_headers, content or b"", timings)
+
+
+def get_declared_size(resp_headers: Mapping[str, Any]) -> Optional[int]:
+    "returns the Content-Length of an uncompressed body, the length of a compressed body is its size before decompression"
+    headers = CaseInsensitiveDict(resp_headers)
+    content_length = str(headers.get("Content-Length", ""))
+
+    if headers.get("Content-Encoding") or not content_length.isdigit():
+        return None
+
+    return int(content_length)
+
+
+def get_content_decoder(resp_headers: Mapping[str, Any], timings: RequestTimings) -> Optional[ContentDecoder]:
+    """
+    returns the decoder of a body sent with the Content-Encoding of the headers, or None if the body is not
+        compressed. A body in an encoding ContentDecoder cannot decompress raises a RuntimeError
+    """
+    encodings = parse_encodings(CaseInsensitiveDict(resp_headers).get("Content-Encoding", ""))
+
+    if not len(encodings) or encodings == ["identity"]:
+        return None
+
+    if not ContentDecoder.supports(encodings):
+        raise RuntimeError(f"Unsupported Content Encoding {', '.join(encodings)}; Available: {', '.join(SUPPORTED_ENCODINGS)}")
+
+    return ContentDecoder(encodings, timings)
+
+
+def get_response_content_type(resp_headers: Dict[str, Any]) -> str:
+    "returns the Content-Type of the response, assumed to be json as its most common mime type"
+    return resp_headers.get("Content-Type", "application/json")
+
+
+def decode_response_body(decoder: Callable[[bytes], Any], content: bytes, lazy_decode: bool, timings: RequestTimings) -> Any:
+    """
+    returns the body decoded by the runner's decoder, or None if it is empty. If 'lazy_decode' is set it is returned
+        as a LazyResponseBody, only decoded when its data is first needed. The time spent decoding is the decode phase
+    """
+    if not len(content):
+        return None
+
+    if lazy_decode:
+        return LazyResponseBody(content, decoder, timings)
+
+    start = time.perf_counter_ns()
+    resp_body = decoder(content)
+    timings.add("decode", time.perf_counter_ns() - start)
+    return resp_body
 
 
 class RequestRunner():
@@ -20,14 +347,18 @@ class RequestRunner():
             "DELETE": self._delete_request,
             "PUT": self._put_request,
         }
-        self.supported_content_types: Dict[str, Dict[str, Callable]] = {
+        self.supported_content_types: Dict[str, Dict[str, Any]] = {
             "application/json": {
                 "encode": self._encode_data_to_json,
                 "decode": self._decode_json_to_data,
+                "decode_bytes": True,
+                "stream_decode": self._stream_json_to_data,
             },
             "application/json; charset=UTF-8": {
                 "encode": self._encode_data_to_json,
                 "decode": self._decode_json_to_data,
+                "decode_bytes": True,
+                "stream_decode": self._stream_json_to_data,
             }
         }
 
@@ -47,58 +378,241 @@ class RequestRunner():
         return request_headers
 
     def run_request(self, method: str, url: str, content_type: str = "", body: Dict[str, Any] = {}, query_params: Dict[str, Any] = {},
-                    header_params: Dict[str, Any] = {}, authenticate: bool = True) -> Tuple[Optional[dict], dict, int]:
-        "run an HTTP/1.1 request"
-        if not len(method) or method not in self.supported_methods:
-            raise ValueError(f"Method {method} Not Supported Or Invalid")
-        if not len(url):
-            raise ValueError("Invalid URL")
-
-        if len(body) and not len(content_type):
-            if "Content-Type" in header_params:
-                content_type = header_params["Content-Type"]
-            else:
-                raise ValueError("No Content Type Given For Body")
+                    header_params: Dict[str, Any] = {}, authenticate: bool = True, timings: Optional[RequestTimings] = None,
+                    stream_paths: Optional[Tuple[str, ...]] = None, lazy_decode: bool = False, max_response_bytes: int = 0,
+                    accept_encoding: str = "", body_file: str = "", request_encoding: str = "") -> Tuple[Any, dict, int]:
+        """
+        run an HTTP/1.1 request, the duration of each phase is recorded into 'timings' if given.
+        If 'stream_paths' are given and the response content type supports it, the body is decoded as it downloads and
+            only the data at those dot paths is kept, returned as a PartialJSONBody rather than the whole body.
+        If 'lazy_decode' is set the body is returned as a LazyResponseBody, only decoded when its data is first needed.
+        If 'max_response_bytes' is given, a ResponseTooLargeError is raised as soon as more of the body than that has
+            downloaded, so an oversized response is never held in memory whole.
+        If 'accept_encoding' is given it is sent as the Accept-Encoding header, compressed bodies are decompressed as
+            they download with the bytes read over the wire and the time spent decompressing recorded into 'timings'.
+        If 'body_file' is given its content is sent as the body instead of 'body', streamed from disk in chunks rather
+            than loaded into memory. If 'request_encoding' is given the body is compressed with it as it is sent.
+        If the cassette is replaying, the recorded response of the request is returned without any network
+        """
+        if timings is None:
+            timings = RequestTimings()
 
-        if authenticate:
-            if not len(self.auth_url) or not len(self.username) or not len(self.password):
-                raise ValueError("Authentication Details Not Populated")
+        content_type, header_params = prepare_request(self, method, url, content_type, body, header_params, authenticate, max_response_bytes,
+                                                      accept_encoding, body_file, request_encoding)
+        # keyed before the auth token is added, so a replayed request never needs to log in
+        cassette_key = get_cassette_key(method, url, query_params, header_params, body, body_file)
 
-            auth_token = self.authenticate()
+        if authenticate and not cassette.replaying:
+            # logins are shared across requests & runners until the token is about to expire
+            with metrics.span("auth"):
+                auth_token = token_cache.get_token(self)
 
             if not len(auth_token):
                 raise ValueError("Returned Auth Token Is Empty")
 
             header_params = self.set_request_token(header_params, auth_token)
 
-        runner_kwargs = {
+        runner_kwargs: Dict[str, Any] = {
             "url": url,
             "query_params": query_params,
         }
 
+        body_handle: Optional[BinaryIO] = None
+
         if len(body):
-            runner_kwargs["body"] = self._encode_request_body(content_type, body)
+            runner_kwargs["body"] = encode_request_body(self._encode_request_body, content_type, body, request_encoding)
+            header_params["Content-Type"] = content_type
+        elif len(body_file):
             header_params["Content-Type"] = content_type
 
+            # a replayed request is never sent, so the file is not opened
+            if not cassette.replaying:
+                body_handle, runner_kwargs["body"] = open_body_file(body_file, request_encoding)
+
         runner_kwargs["content_type"] = content_type
-        runner_kwargs["headers"] = header_params
+        runner_kwargs["headers"] = with_default_accept_encoding(header_params)
 
         runner: Callable = self.supported_methods[method.upper()]
-        resp: requests.Response = runner(**runner_kwargs)
-        resp_headers = dict(resp.headers)
+        replayed: Optional[CassetteEntry] = None
+        resp: Optional[requests.Response] = None
+        # the whole response body, once it has been read
+        content: Optional[bytes] = None
 
-        if len(resp.text):
-            if "Content-Type" in resp_headers:
-                resp_body: Optional[Dict[str, Any]] = self._decode_response_body(resp_headers["Content-Type"], resp.text)
+        with timing_scope(timings):
+            start = time.perf_counter_ns()
+
+            if cassette.replaying:
+                replayed = replay_response(cassette_key, method, url)
+                status_code, resp_headers, content = replayed.status_code, replayed.headers, replayed.content
             else:
-                # assume it is json as its most common mime type
-                resp_body = self._decode_response_body("application/json", resp.text)
-        else:
-            resp_body = None
+                # responses are streamed, so the runner returns once the headers arrive and the body is read below
+                try:
+                    resp = runner(**runner_kwargs)
+                finally:
+                    # the whole request body has been sent by the time the response headers arrive
+                    if body_handle is not None:
+                        body_handle.close()
+
+                status_code, resp_headers = resp.status_code, dict(resp.headers)
+
+            first_byte = time.perf_counter_ns()
+            timings.add("ttfb", first_byte - start - timings.connection_ns())
+
+            if cassette.recording:
+                # the whole body is kept to be recorded, even if it is streamed below
+                content = self._read_response_body(resp, content, resp_headers, method, url, max_response_bytes, timings)
+
+        if authenticate and status_code == 401:
+            # the cached token was rejected, so the next request logs in again
+            token_cache.invalidate(self)
+
+        resp_content_type = get_response_content_type(resp_headers)
+        stream_decoder = self.supported_content_types.get(resp_content_type, {}).get("stream_decode")
+
+        if stream_paths is not None and stream_decoder is not None:
+            partial_body = self._stream_response_body(resp, content, stream_decoder, stream_paths, timings, method, url, max_response_bytes)
+            timings.add("total", first_byte - start + timings.durations_ns["download"] + timings.durations_ns["decompress"])
+            timings.wire_bytes = timings.wire_bytes or timings.response_bytes
+            use_cassette(cassette_key, replayed, method, url, query_params, status_code, resp_headers, content, timings)
+            metrics.add_timings(timings)
+            return partial_body, resp_headers, status_code
+
+        content = self._read_response_body(resp, content, resp_headers, method, url, max_response_bytes, timings)
+        timings.response_bytes = len(content)
+        # bodies that were not compressed are the same size over the wire
+        timings.wire_bytes = timings.wire_bytes or timings.response_bytes
+        downloaded = time.perf_counter_ns()
+        timings.add("download", downloaded - first_byte - timings.durations_ns["decompress"])
+        timings.add("total", downloaded - start)
+        use_cassette(cassette_key, replayed, method, url, query_params, status_code, resp_headers, content, timings)
+
+        # even converting the bytes to text is left to the decoder, so a lazy body does neither until it is first used
+        resp_body = decode_response_body(
+            lambda raw: self._decode_response_body(resp_content_type, self._get_response_data(resp_content_type, raw, resp_headers)),
+            content, lazy_decode, timings)
+
+        metrics.add_timings(timings)
+        return resp_body, resp_headers, status_code
 
-        return resp_body, resp_headers, resp.status_code
+    def _read_response_body(self, resp: Optional[requests.Response], content: Optional[bytes], resp_headers: Dict[str, Any], method: str,
+                            url: str, max_bytes: int, timings: RequestTimings) -> bytes:
+        """
+        reads the whole response body and returns it, or the 'content' already read (e.g. replayed from the cassette).
+            If 'max_bytes' is given the download stops and the connection is dropped as soon as the body is larger than it
+        """
+        declared_size = get_declared_size(resp_headers)
+
+        # fail without downloading any of the body if the server says up front that it is too large
+        if max_bytes > 0 and declared_size is not None and declared_size > max_bytes:
+            self._close_response(resp)
+            raise ResponseTooLargeError(method, url, max_bytes, declared_size)
+
+        chunks: List[bytes] = []
+        size = 0
+
+        for chunk in self._iter_body(resp, content, timings):
+            size += len(chunk)
+
+            if max_bytes > 0 and size > max_bytes:
+                self._close_response(resp)
+                raise ResponseTooLargeError(method, url, max_bytes, size)
+
+            chunks.append(chunk)
+
+        return b"".join(chunks)
+
+    def _iter_body(self, resp: Optional[requests.Response], content: Optional[bytes], timings: RequestTimings) -> Iterator[bytes]:
+        """
+        yields the response body in chunks as it downloads, or the 'content' already read whole. Compressed bodies are
+            decompressed here rather than in urllib3, so the bytes read over the wire and the time spent decompressing
+            are recorded into 'timings'
+        """
+        if content is not None or resp is None:
+            if content:
+                yield content
+
+            return
+
+        try:
+            decoder = get_content_decoder(resp.headers, timings)
+        except RuntimeError:
+            # e.g. brotli sent for '*', which urllib3 would decompress without recording its size over the wire
+            self._close_response(resp)
+            raise
+
+        if decoder is None or not isinstance(resp.raw, HTTPResponse):
+            yield from resp.iter_content(STREAM_CHUNK_SIZE)
+            return
+
+        for raw_chunk in resp.raw.stream(STREAM_CHUNK_SIZE, decode_content=False):
+            chunk = decoder.decompress(raw_chunk)
+
+            if len(chunk):
+                yield chunk
+
+        chunk = decoder.flush()
+
+        if len(chunk):
+            yield chunk
+
+    def _close_response(self, resp: Optional[requests.Response]) -> None:
+        "drops the connection of a response that is not read to the end, a body already read has nothing to close"
+        if resp is not None:
+            resp.close()
 
-    def _encode_request_body(self, content_type: str, request_data: Dict[str, Any]) -> str:
+    def _stream_response_body(self, resp: Optional[requests.Response], content: Optional[bytes], stream_decoder: Callable,
+                              stream_paths: Tuple[str, ...], timings: RequestTimings, method: str = "", url: str = "", max_bytes: int = 0) -> Any:
+        """
+        decodes the response body chunk by chunk as it downloads (or the 'content' already read), the time spent waiting
+            for chunks (less decompressing them) is the download phase and the rest is the decode phase. A
+            ResponseTooLargeError is raised once more than 'max_bytes' (if given) has downloaded
+        """
+        download_ns = 0
+        decompress_ns = timings.durations_ns["decompress"]
+
+        def read_chunks() -> Iterator[bytes]:
+            nonlocal download_ns
+            chunks = self._iter_body(resp, content, timings)
+
+            while True:
+                start = time.perf_counter_ns()
+                chunk = next(chunks, None)
+                download_ns += time.perf_counter_ns() - start
+
+                if chunk is None:
+                    return
+
+                timings.response_bytes += len(chunk)
+
+                if max_bytes > 0 and timings.response_bytes > max_bytes:
+                    raise ResponseTooLargeError(method, url, max_bytes, timings.response_bytes)
+
+                yield chunk
+
+        start = time.perf_counter_ns()
+
+        try:
+            resp_body = stream_decoder(read_chunks(), stream_paths)
+        finally:
+            # the decoder stops reading once every path is found, closing drops the connection rather than reading the rest
+            self._close_response(resp)
+
+        decompress_ns = timings.durations_ns["decompress"] - decompress_ns
+        timings.add("download", download_ns - decompress_ns)
+        timings.add("decode", time.perf_counter_ns() - start - download_ns)
+        return resp_body
+
+    def _get_response_data(self, resp_content_type: str, content: bytes, resp_headers: Dict[str, Any]) -> Union[bytes, str]:
+        """
+        returns the raw bytes of the body if the decoder of the content type takes bytes, otherwise the body as text in
+            the charset of its Content-Type
+        """
+        if self.supported_content_types.get(resp_content_type, {}).get("decode_bytes", False):
+            return content
+
+        return content.decode(get_encoding_from_headers(CaseInsensitiveDict(resp_headers)) or "utf-8", errors="replace")
+
+    def _encode_request_body(self, content_type: str, request_data: Dict[str, Any]) -> Union[bytes, str]:
         "encodes and returns the body for the request if the content_type is supported"
         if content_type not in self.supported_content_types:
             raise ValueError(f"Unsupported Content Type: {content_type}")
@@ -107,7 +621,7 @@ class RequestRunner():
         encoder = type_data['encode']
         return encoder(request_data)
 
-    def _decode_response_body(self, resp_content_type: str, resp_data: str) -> Dict[str, Any]:
+    def _decode_response_body(self, resp_content_type: str, resp_data: Union[bytes, str]) -> Dict[str, Any]:
         "decodes a response body from the returned MIME type to a Python data structure"
         if resp_content_type not in self.supported_content_types:
             raise ValueError(f"Response Content-Type Is Not Supported: {resp_content_type}")
@@ -116,44 +630,52 @@ class RequestRunner():
         decoder = type_data['decode']
         return decoder(resp_data)
 
-    def _encode_data_to_json(self, data: Dict[str, Any]) -> str:
-        "encodes the given dict to a json string"
+    def _encode_data_to_json(self, data: Dict[str, Any]) -> bytes:
+        "encodes the given dict to UTF-8 json with the configured json codec, the standard library's unless one is set"
         try:
-            return json.dumps(data)
+            return json_codecs.encoder.dumps(data)
         except Exception as ex:
             raise ValueError(f"Ex Dumps JSON: {data}")
 
-    def _decode_json_to_data(self, raw_json: str) -> Dict[str, Any]:
-        "decodes the given json string to a dict"
+    def _decode_json_to_data(self, raw_json: Union[bytes, str]) -> Dict[str, Any]:
+        "decodes the given json bytes or string to a dict with the configured json codec"
         try:
-            return json.loads(raw_json)
+            return json_codecs.default.loads(raw_json)
         except Exception as ex:
             raise ValueError(f"Ex Decoding JSON: {str(ex)}")
 
+    def _stream_json_to_data(self, chunks: Iterator[bytes], dot_paths: Tuple[str, ...]) -> Optional[PartialJSONBody]:
+        "decodes only the data at the given dot paths from a json body read in chunks"
+        return extract_json_paths(chunks, dot_paths)
+
+    def _get_session(self, url: str) -> requests.Session:
+        "returns the pooled keep-alive session for the given url, derived classes can override this to use their own"
+        return session_pool.get_session(url)
+
     def _get_request(self, url: str = "", query_params: Dict[str, Any] = {}, headers: Dict[str, Any] = {}, **kwargs) -> requests.Response:
         "make a generic GET request"
         try:
-            return requests.get(url, headers=headers, params=query_params)
+            return self._get_session(url).get(url, headers=headers, params=query_params, stream=True)
         except Exception as ex:
             raise RuntimeError(str(ex))
 
-    def _post_request(self, url: str = "", headers: Dict[str, Any] = {}, body: Dict[str, Any] = {}, **kwargs) -> requests.Response:
+    def _post_request(self, url: str = "", headers: Dict[str, Any] = {}, body: Any = {}, **kwargs) -> requests.Response:
         "make a generic POST request"
         try:
-            return requests.post(url, headers=headers, data=body)
+            return self._get_session(url).post(url, headers=headers, data=body, stream=True)
         except Exception as ex:
             raise RuntimeError(str(ex))
 
     def _delete_request(self, url: str = "", query_params: Dict[str, Any] = {}, headers: Dict[str, Any] = {}, **kwargs) -> requests.Response:
         "make a generic DELETE request"
         try:
-            return requests.delete(url, headers=headers, params=query_params)
+            return self._get_session(url).delete(url, headers=headers, params=query_params, stream=True)
         except Exception as ex:
             raise RuntimeError(str(ex))
 
-    def _put_request(self, url: str = "", headers: Dict[str, Any] = {}, body: Dict[str, Any] = {}, **kwargs) -> requests.Response:
+    def _put_request(self, url: str = "", headers: Dict[str, Any] = {}, body: Any = {}, **kwargs) -> requests.Response:
         "make a generic PUT request"
         try:
-            return requests.put(url, headers=headers, data=body)
+            return self._get_session(url).put(url, headers=headers, data=body, stream=True)
         except Exception as ex:
             raise RuntimeError(str(ex))
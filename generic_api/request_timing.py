@@ -0,0 +1,151 @@
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# the timings currently being recorded by this thread, set by 'timing_scope' around a request
+_active = threading.local()
+
+
+class RequestTimings():
+    """
+    Monotonic, nanosecond durations of each phase of a single request. The phases do not overlap:
+        dns:        resolving the host name
+        connect:    opening the TCP connection
+        tls:        the TLS handshake
+        ttfb:       sending the request and waiting for the first byte of the response
+        download:   reading the response body
+        decompress: decompressing a compressed response body as it downloads
+        decode:     decoding the response body
+        total:      from sending the request until the body is downloaded, excludes encoding & decoding
+    dns, connect and tls are 0 when a pooled connection is re-used. The size of the response body is also recorded,
+        both as read over the wire and after decompression
+    """
+
+    PHASES = ("dns", "connect", "tls", "ttfb", "download", "decompress", "decode", "total")
+
+    def __init__(self) -> None:
+        self.durations_ns: Dict[str, int] = {phase: 0 for phase in self.PHASES}
+        self.response_bytes = 0
+        self.wire_bytes = 0
+
+    def compression_ratio(self) -> float:
+        "returns how many times smaller the response body was over the wire than after decompression, 1.0 if it was not compressed"
+        if not self.wire_bytes:
+            return 1.0
+
+        return self.response_bytes / self.wire_bytes
+
+    def add(self, phase: str, duration_ns: int) -> None:
+        "adds the given duration to the phase"
+        if phase not in self.durations_ns:
+            raise ValueError(f"Unknown Timing Phase: {phase}")
+
+        self.durations_ns[phase] += duration_ns
+
+    def get_ms(self, phase: str) -> float:
+        "returns the duration of the phase in milliseconds"
+        if phase not in self.durations_ns:
+            raise ValueError(f"Unknown Timing Phase: {phase}")
+
+        return self.durations_ns[phase] / 1_000_000
+
+    def connection_ns(self) -> int:
+        "returns the total time spent establishing the connection"
+        return self.durations_ns["dns"] + self.durations_ns["connect"] + self.durations_ns["tls"]
+
+    def as_dict(self) -> Dict[str, float]:
+        "returns every phase in milliseconds"
+        return {phase: self.get_ms(phase) for phase in self.PHASES}
+
+
+@contextmanager
+def timing_scope(timings: RequestTimings) -> Iterator[RequestTimings]:
+    "connections opened by this thread whilst in the scope record their dns/connect/tls phases into the given timings"
+    previous = getattr(_active, "timings", None)
+    _active.timings = timings
+
+    try:
+        yield timings
+    finally:
+        _active.timings = previous
+
+
+def _record(phase: str, duration_ns: int) -> None:
+    "records the phase against the timings of the current scope, if there is one"
+    timings: Optional[RequestTimings] = getattr(_active, "timings", None)
+
+    if timings is not None:
+        timings.add(phase, duration_ns)
+
+
+class TimedHTTPConnection(HTTPConnection):
+    "HTTP connection recording the dns and connect phases of new connections"
+
+    def _new_conn(self) -> socket.socket:
+        dns_host = self._dns_host
+        start = time.perf_counter_ns()
+
+        try:
+            addresses: List[str] = [str(info[4][0]) for info in socket.getaddrinfo(dns_host, self.port, 0, socket.SOCK_STREAM)]
+        except OSError:
+            # let urllib3 resolve again so the usual NameResolutionError is raised
+            addresses = [dns_host]
+
+        resolved = time.perf_counter_ns()
+        _record("dns", resolved - start)
+
+        try:
+            for i, address in enumerate(addresses):
+                self._dns_host = address
+
+                try:
+                    return super()._new_conn()
+                except Exception:
+                    if i == len(addresses) - 1:
+                        raise
+            raise RuntimeError(f"No Addresses Resolved For {dns_host}")
+        finally:
+            self._dns_host = dns_host
+            _record("connect", time.perf_counter_ns() - resolved)
+
+
+class TimedHTTPSConnection(HTTPSConnection, TimedHTTPConnection):
+    "HTTPS connection additionally recording the TLS handshake phase"
+
+    def connect(self) -> None:
+        timings = RequestTimings()
+        start = time.perf_counter_ns()
+
+        # record the dns/connect phases separately so they can be subtracted from the handshake
+        with timing_scope(timings):
+            super().connect()
+
+        elapsed = time.perf_counter_ns() - start
+        _record("dns", timings.durations_ns["dns"])
+        _record("connect", timings.durations_ns["connect"])
+        _record("tls", elapsed - timings.connection_ns())
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    "requests adapter whose connections record their dns, connect and tls phases"
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
@@ -0,0 +1,101 @@
+import http.cookiejar
+import threading
+from collections import OrderedDict
+from typing import Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from generic_api.request_timing import TimedHTTPAdapter
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_PER_HOST = 10
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+class SessionPool():
+    """
+    Process-wide pool of keep-alive HTTP sessions, keyed by scheme/host/port
+    Each host gets one session holding up to 'max_per_host' open connections, at most 'pool_size' hosts are kept open
+        at once - the least recently used host is closed when the limit is reached
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, max_per_host: int = DEFAULT_MAX_PER_HOST):
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[Tuple[str, str, int], requests.Session]" = OrderedDict()
+        self.pool_size = DEFAULT_POOL_SIZE
+        self.max_per_host = DEFAULT_MAX_PER_HOST
+        self.configure(pool_size, max_per_host)
+
+    def configure(self, pool_size: int, max_per_host: int) -> None:
+        "sets the pool limits, any open sessions are closed so the new limits apply to every host"
+        if int(pool_size) <= 0 or int(max_per_host) <= 0:
+            raise ValueError(f"Invalid Pool Limits; pool_size: {pool_size}; max_per_host: {max_per_host}")
+
+        with self._lock:
+            self.pool_size = int(pool_size)
+            self.max_per_host = int(max_per_host)
+            self._close_all()
+
+    def get_session(self, url: str) -> requests.Session:
+        "returns the keep-alive session for the scheme/host/port of the given url, creating it if required"
+        key = self._pool_key(url)
+
+        with self._lock:
+            session = self._sessions.get(key)
+
+            if session is not None:
+                self._sessions.move_to_end(key)
+                return session
+
+            session = self._new_session()
+            self._sessions[key] = session
+
+            while len(self._sessions) > self.pool_size:
+                _, evicted = self._sessions.popitem(last=False)
+                evicted.close()
+
+            return session
+
+    def close(self) -> None:
+        "closes every open session and its connections"
+        with self._lock:
+            self._close_all()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _new_session(self) -> requests.Session:
+        """
+        creates a session whose adapter holds up to max_per_host connections, and times the setup of each connection.
+            The session only pools connections, it never stores cookies so no state leaks between scenarios or runners
+        """
+        session = requests.Session()
+        session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+        adapter = TimedHTTPAdapter(pool_connections=1, pool_maxsize=self.max_per_host)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _close_all(self) -> None:
+        "closes all sessions, caller must hold the lock"
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
+
+    @staticmethod
+    def _pool_key(url: str) -> Tuple[str, str, int]:
+        "returns the (scheme, host, port) tuple for the given url"
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+
+        if not len(scheme) or not parts.hostname:
+            raise ValueError(f"Invalid URL: {url}")
+
+        port = parts.port if parts.port is not None else _DEFAULT_PORTS.get(scheme, 0)
+        return scheme, parts.hostname.lower(), port
+
+
+# shared by every RequestRunner so connections survive across scenarios and runners
+session_pool = SessionPool()
@@ -0,0 +1,380 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest import main, mock, skipIf, TestCase
+
+from generic_api.async_request_runner import AsyncRequestRunner, SyncRunnerAdapter, aiohttp
+from generic_api.lazy_body import LazyResponseBody
+from generic_api.request_runner import RequestRunner, ResponseTooLargeError
+from generic_api.request_timing import RequestTimings
+from generic_api.token_cache import token_cache
+from generic_api.tests.test_request_runner import _UploadHandler
+
+
+class _Handler(BaseHTTPRequestHandler):
+    "echoes the method, path & body of every request back as JSON, keeping the connection alive"
+    protocol_version = "HTTP/1.1"
+
+    def _respond(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode("utf-8") if length else ""
+        status_code = 401 if self.path.startswith("/secure") and self.headers.get("Authorization") != "Bearer token" else 200
+        data = json.dumps({"method": self.command, "path": self.path, "body": body}).encode("utf-8")
+
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+
+        if self.path.startswith("/compressed"):
+            data = json.dumps({"path": self.path, "data": "x" * 4000}).encode("utf-8")
+
+            if "gzip" in self.headers.get("Accept-Encoding", "") or "*" in self.headers.get("Accept-Encoding", ""):
+                data = gzip.compress(data)
+                self.send_header("Content-Encoding", "gzip")
+
+        if self.path.startswith("/br"):
+            self.send_header("Content-Encoding", "br")
+
+        if self.path.startswith("/chunked"):
+            # the size of the body is not known up front, so it is only found out as it downloads
+            data = json.dumps({"path": self.path, "data": "x" * 4000}).encode("utf-8")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            for i in range(0, len(data), 1000):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data[i:i + 1000]), data[i:i + 1000]))
+
+            self.wfile.write(b"0\r\n\r\n")
+            return
+
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+class _AuthAsyncRequestRunner(AsyncRequestRunner):
+    "async runner with a bearer token auth hook, counting its logins"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.logins = 0
+        self.tokens = ["token"]
+
+    async def authenticate(self):
+        self.logins += 1
+        await asyncio.sleep(0.01)
+        return self.tokens.pop(0) if len(self.tokens) > 1 else self.tokens[0]
+
+    async def set_request_token(self, request_headers, auth_token):
+        request_headers["Authorization"] = f"Bearer {auth_token}"
+        return request_headers
+
+
+@skipIf(aiohttp is None, "aiohttp is not installed")
+class TestAsyncRequestRunner(TestCase):
+    "test class for the coroutine 'run_request' of AsyncRequestRunner"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+
+    def _run(self, runner, *args, **kwargs):
+        "runs a single request on a new event loop, closing the runner's session after"
+        async def run():
+            try:
+                return await runner.run_request(*args, **kwargs)
+            finally:
+                await runner.close()
+
+        return asyncio.run(run())
+
+    def test_valid_1(self):
+        "succesfully make a request with a JSON body, recording its timings"
+        timings = RequestTimings()
+        resp_body, resp_headers, status_code = self._run(AsyncRequestRunner(), "POST", self.url + "/test", "application/json",
+                                                         {"key": "value"}, authenticate=False, timings=timings)
+
+        self.assertEqual(status_code, 200)
+        self.assertEqual(resp_body["method"], "POST")
+        self.assertEqual(resp_body["path"], "/test")
+        self.assertEqual(resp_body, {"method": "POST", "path": "/test", "body": json.dumps({"key": "value"})})
+        self.assertEqual(resp_headers["Content-Type"], "application/json")
+        self.assertGreater(timings.durations_ns["total"], 0)
+        self.assertGreater(timings.response_bytes, 0)
+
+    def test_valid_2(self):
+        "many concurrent requests log in once and share the token"
+        runner = _AuthAsyncRequestRunner("http://localhost/login", "user", "pass", max_concurrency=5)
+
+        async def run():
+            try:
+                return await asyncio.gather(*[runner.run_request("GET", self.url + "/secure") for _ in range(20)])
+            finally:
+                await runner.close()
+
+        results = asyncio.run(run())
+
+        self.assertEqual([status_code for _, _, status_code in results], [200] * 20)
+        self.assertEqual(runner.logins, 1)
+
+    def test_valid_3(self):
+        "the runner can be used again in a new event loop after being closed"
+        runner = AsyncRequestRunner()
+
+        self.assertEqual(self._run(runner, "GET", self.url, authenticate=False)[2], 200)
+        self.assertEqual(self._run(runner, "DELETE", self.url, authenticate=False)[2], 200)
+
+    def test_valid_4(self):
+        "a response body within 'max_response_bytes' is read whole, whether or not its length is known up front"
+        resp_body, _, _ = self._run(AsyncRequestRunner(), "GET", self.url + "/chunked", authenticate=False, max_response_bytes=5000)
+
+        self.assertEqual(len(resp_body["data"]), 4000)
+        self.assertEqual(self._run(AsyncRequestRunner(), "GET", self.url, authenticate=False, max_response_bytes=1000)[2], 200)
+
+    def test_valid_5(self):
+        "a gzipped body is decompressed as it downloads recording its size over the wire, an uncompressed body is the same size over the wire"
+        timings = RequestTimings()
+        resp_body, resp_headers, _ = self._run(AsyncRequestRunner(), "GET", self.url + "/compressed", authenticate=False, timings=timings,
+                                               accept_encoding="gzip")
+
+        self.assertEqual(resp_headers["Content-Encoding"], "gzip")
+        self.assertEqual(len(resp_body["data"]), 4000)
+        self.assertLess(timings.wire_bytes, timings.response_bytes / 5)
+        self.assertGreater(timings.durations_ns["decompress"], 0)
+
+        timings = RequestTimings()
+        _, resp_headers, _ = self._run(AsyncRequestRunner(), "GET", self.url + "/compressed", authenticate=False, timings=timings,
+                                       accept_encoding="identity")
+
+        self.assertNotIn("Content-Encoding", resp_headers)
+        self.assertEqual(timings.wire_bytes, timings.response_bytes)
+        self.assertEqual(timings.durations_ns["decompress"], 0)
+
+        timings = RequestTimings()
+        _, resp_headers, _ = self._run(AsyncRequestRunner(), "GET", self.url + "/compressed", authenticate=False, timings=timings,
+                                       accept_encoding="*")
+
+        self.assertEqual(resp_headers["Content-Encoding"], "gzip")
+        self.assertGreater(timings.durations_ns["decompress"], 0)
+
+    def test_valid_6(self):
+        "tokens are shared with other runners through the token cache, a rejected token is dropped from it"
+        runner = _AuthAsyncRequestRunner("http://localhost/login", "user", "pass")
+        runner.tokens = ["expired", "token"]
+
+        self.assertEqual(self._run(runner, "GET", self.url + "/secure")[2], 401)
+        self.assertEqual(len(token_cache), 0)
+        self.assertEqual(self._run(runner, "GET", self.url + "/secure")[2], 200)
+        self.assertEqual(self._run(_AuthAsyncRequestRunner("http://localhost/login", "user", "pass"), "GET", self.url + "/secure")[2], 200)
+        self.assertEqual(runner.logins, 2)
+
+    def test_valid_7(self):
+        "the body is only decoded when first used if 'lazy_decode' is set"
+        timings = RequestTimings()
+        resp_body, _, _ = self._run(AsyncRequestRunner(), "GET", self.url + "/test", authenticate=False, timings=timings, lazy_decode=True)
+
+        self.assertIsInstance(resp_body, LazyResponseBody)
+        self.assertEqual(timings.durations_ns["decode"], 0)
+        self.assertEqual(resp_body.decode()["path"], "/test")
+        self.assertGreater(timings.durations_ns["decode"], 0)
+
+    @mock.patch("generic_api.request_runner.metrics")
+    @mock.patch("generic_api.async_request_runner.metrics")
+    def test_valid_8(self, m_metrics, m_shared_metrics):
+        "the login, body encoding and phases of a request are added to the run's metrics"
+        runner = _AuthAsyncRequestRunner("http://localhost/login", "user", "pass")
+        timings = RequestTimings()
+        self._run(runner, "POST", self.url + "/secure", "application/json", {"key": "value"}, timings=timings)
+
+        m_metrics.span.assert_called_once_with("auth")
+        m_shared_metrics.span.assert_called_once_with("encode")
+        m_metrics.add_timings.assert_called_once_with(timings)
+
+    def test_invalid_1(self):
+        "unsupported method given"
+        with self.assertRaises(ValueError):
+            self._run(AsyncRequestRunner(), "PATCH", self.url, authenticate=False)
+
+    def test_invalid_2(self):
+        "empty URL given"
+        with self.assertRaises(ValueError):
+            self._run(AsyncRequestRunner(), "GET", "", authenticate=False)
+
+    def test_invalid_3(self):
+        "body given without a content type"
+        with self.assertRaises(ValueError):
+            self._run(AsyncRequestRunner(), "POST", self.url, body={"key": "value"}, authenticate=False)
+
+    def test_invalid_4(self):
+        "authenticated request without auth details"
+        with self.assertRaises(ValueError):
+            self._run(AsyncRequestRunner(), "GET", self.url)
+
+    def test_invalid_5(self):
+        "auth hook returns an empty token"
+        with self.assertRaises(ValueError):
+            self._run(AsyncRequestRunner("http://localhost/login", "user", "pass"), "GET", self.url)
+
+    def test_invalid_6(self):
+        "connection refused"
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        server.server_close()
+
+        with self.assertRaises(RuntimeError):
+            self._run(AsyncRequestRunner(), "GET", url, authenticate=False)
+
+    def test_invalid_7(self):
+        "invalid max_concurrency given"
+        with self.assertRaises(ValueError):
+            AsyncRequestRunner(max_concurrency=0)
+
+    def test_invalid_8(self):
+        "the response body is larger than 'max_response_bytes', from its Content-Length or as it downloads"
+        with self.assertRaisesRegex(ResponseTooLargeError, "Max: 10 Bytes"):
+            self._run(AsyncRequestRunner(), "GET", self.url + "/large", authenticate=False, max_response_bytes=10)
+
+        with self.assertRaisesRegex(ResponseTooLargeError, "Max: 2000 Bytes"):
+            self._run(AsyncRequestRunner(), "GET", self.url + "/chunked", authenticate=False, max_response_bytes=2000)
+
+        with self.assertRaises(ValueError):
+            self._run(AsyncRequestRunner(), "GET", self.url, authenticate=False, max_response_bytes=-1)
+
+    def test_invalid_9(self):
+        "an encoding that cannot be decompressed is asked for, or sent by the server"
+        with self.assertRaisesRegex(ValueError, "Unsupported Content Encoding br"):
+            self._run(AsyncRequestRunner(), "GET", self.url, authenticate=False, accept_encoding="gzip, br")
+
+        with self.assertRaisesRegex(RuntimeError, "Unsupported Content Encoding br"):
+            self._run(AsyncRequestRunner(), "GET", self.url + "/br", authenticate=False, accept_encoding="*")
+
+
+@skipIf(aiohttp is None, "aiohttp is not installed")
+class TestAsyncBodyFile(TestCase):
+    "test class for streaming request bodies from a file with AsyncRequestRunner"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _UploadHandler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/ingest"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.content = json.dumps(os.urandom(256 * 1024).hex()).encode("utf-8")
+        self.filepath = os.path.join(self.tmp_dir.name, "bulk.json")
+
+        with open(self.filepath, "wb") as fhandle:
+            fhandle.write(self.content)
+
+    def _run(self, *args, **kwargs):
+        runner = AsyncRequestRunner()
+
+        async def run():
+            try:
+                return await runner.run_request(*args, **kwargs)
+            finally:
+                await runner.close()
+
+        return asyncio.run(run())
+
+    def test_valid_1(self):
+        "the file is streamed as the body with its size as the Content-Length, or compressed with chunked transfer-encoding"
+        body, _, status_code = self._run("POST", self.url, "application/json", authenticate=False, body_file=self.filepath)
+
+        self.assertEqual(status_code, 200)
+        self.assertEqual(body["sha256"], hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(body["content_type"], "application/json")
+        self.assertFalse(body["chunked"])
+        self.assertEqual(body["wire_bytes"], len(self.content))
+
+        body, _, _ = self._run("POST", self.url, "application/json", authenticate=False, body_file=self.filepath, request_encoding="gzip")
+
+        self.assertEqual(body["sha256"], hashlib.sha256(self.content).hexdigest())
+        self.assertTrue(body["chunked"])
+        self.assertLess(body["wire_bytes"], len(self.content) * 0.6)
+
+    def test_valid_2(self):
+        "an in-memory body is compressed with the request encoding"
+        body, _, _ = self._run("POST", self.url, "application/json", {"key": "value"}, authenticate=False, request_encoding="deflate")
+
+        self.assertEqual(body["sha256"], hashlib.sha256(json.dumps({"key": "value"}).encode("utf-8")).hexdigest())
+
+    def test_invalid_1(self):
+        "the body file does not exist, both a body and a body file are given, or the request encoding is not supported"
+        with self.assertRaisesRegex(ValueError, "Body File Not Found"):
+            self._run("POST", self.url, "application/json", authenticate=False, body_file=self.filepath + ".missing")
+
+        with self.assertRaises(ValueError):
+            self._run("POST", self.url, "application/json", {"a": 1}, authenticate=False, body_file=self.filepath)
+
+        with self.assertRaises(ValueError):
+            self._run("POST", self.url, "application/json", authenticate=False, body_file=self.filepath, request_encoding="br")
+
+
+class TestSyncRunnerAdapter(TestCase):
+    "test class for SyncRunnerAdapter"
+
+    def test_valid_1(self):
+        "requests are passed to the wrapped runner on a worker thread"
+        runner = mock.MagicMock(spec=RequestRunner, auth_url="", username="", password="")
+        runner.run_request.return_value = ({"key": "value"}, {}, 200)
+        adapter = SyncRunnerAdapter(runner, max_concurrency=2)
+        timings = RequestTimings()
+
+        async def run():
+            try:
+                return await adapter.run_request("GET", "http://localhost", query_params={"q": 1}, authenticate=False, timings=timings,
+                                                 max_response_bytes=10, accept_encoding="gzip", body_file="/tmp/bulk.json", request_encoding="gzip",
+                                                 lazy_decode=True)
+            finally:
+                await adapter.close()
+
+        self.assertEqual(asyncio.run(run()), ({"key": "value"}, {}, 200))
+        runner.run_request.assert_called_once_with("GET", "http://localhost", "", {}, {"q": 1}, {}, False, timings=timings, max_response_bytes=10,
+                                                   accept_encoding="gzip", body_file="/tmp/bulk.json", request_encoding="gzip", lazy_decode=True)
+
+    def test_invalid_1(self):
+        "errors raised by the wrapped runner are passed on"
+        runner = mock.MagicMock(spec=RequestRunner, auth_url="", username="", password="")
+        runner.run_request.side_effect = ValueError("Invalid URL")
+        adapter = SyncRunnerAdapter(runner)
+
+        async def run():
+            try:
+                return await adapter.run_request("GET", "")
+            finally:
+                await adapter.close()
+
+        with self.assertRaises(ValueError):
+            asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
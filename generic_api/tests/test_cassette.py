@@ -0,0 +1,180 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest import main, mock, skipIf, TestCase
+
+from generic_api.async_request_runner import AsyncRequestRunner, aiohttp
+from generic_api.cassette import Cassette, request_key, INDEX_FILENAME
+from generic_api.request_runner import RequestRunner
+from generic_api.request_timing import RequestTimings
+
+
+class _Handler(BaseHTTPRequestHandler):
+    "echoes the method, path & body of every request back as JSON, counting the requests made"
+    protocol_version = "HTTP/1.1"
+    requests_made = 0
+
+    def _respond(self):
+        _Handler.requests_made += 1
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode("utf-8") if length else ""
+        data = json.dumps({"method": self.command, "path": self.path, "body": body, "é": "ü"}).encode("utf-8")
+
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+class TestRequestKey(TestCase):
+    "test class for the method 'request_key'"
+
+    def test_valid_1(self):
+        "the same request has the same key whatever order its params are in, and whatever its auth token"
+        key = request_key("get", "http://a/b", {"x": "1", "y": "2"}, {"Accept": "json", "Authorization": "Bearer 1"}, {"a": [1]})
+
+        self.assertEqual(key, request_key("GET", "http://a/b", {"y": "2", "x": "1"}, {"accept": "json", "Authorization": "Bearer 2"}, {"a": [1]}))
+        self.assertNotEqual(key, request_key("GET", "http://a/b", {"x": "1", "y": "2"}, {"Accept": "json"}, {"a": [2]}))
+        self.assertNotEqual(key, request_key("POST", "http://a/b", {"x": "1", "y": "2"}, {"Accept": "json"}, {"a": [1]}))
+
+
+class TestCassette(TestCase):
+    "test class for recording & replaying requests through the cassette"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cassette = Cassette()
+        for target in ("generic_api.request_runner.cassette", "generic_api.async_request_runner.cassette"):
+            patcher = mock.patch(target, self.cassette)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.addCleanup(self.cassette.close)
+
+    def _run(self, path, body, **kwargs):
+        return RequestRunner().run_request("POST", self.url + path, "application/json", body, {"q": "1"}, {}, False, **kwargs)
+
+    def _run_async(self, path, body, **kwargs):
+        "runs the request with the asyncio runner on a new event loop"
+        runner = AsyncRequestRunner()
+
+        async def run():
+            try:
+                return await runner.run_request("POST", self.url + path, "application/json", body, {"q": "1"}, {}, False, **kwargs)
+            finally:
+                await runner.close()
+
+        return asyncio.run(run())
+
+    def test_valid_1(self):
+        "a recorded response is replayed without any network, with its recorded timings"
+        self.cassette.configure("record", self.tmp_dir.name)
+        record_timings = RequestTimings()
+        recorded = self._run("/a", {"key": "value"}, timings=record_timings)
+        self._run("/b", {"key": "value"})
+        self.cassette.close()
+
+        self.cassette.configure("replay", self.tmp_dir.name)
+        requests_made = _Handler.requests_made
+        replay_timings = RequestTimings()
+        replayed = self._run("/a", {"key": "value"}, timings=replay_timings)
+
+        self.assertEqual(_Handler.requests_made, requests_made)
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(replayed[2], 201)
+        self.assertEqual(replay_timings.durations_ns["total"], record_timings.durations_ns["total"])
+        self.assertEqual(len(self.cassette), 2)
+
+    def test_valid_2(self):
+        "replayed responses are decoded lazily or streamed like any other"
+        self.cassette.configure("record", self.tmp_dir.name)
+        self._run("/a", {"key": "value"})
+        self.cassette.close()
+
+        self.cassette.configure("replay", self.tmp_dir.name)
+        lazy_body, _, _ = self._run("/a", {"key": "value"}, lazy_decode=True)
+        partial_body, _, _ = self._run("/a", {"key": "value"}, stream_paths=("path", "é"))
+
+        self.assertEqual(lazy_body.decode()["path"], "/a")
+        self.assertEqual(partial_body.values, {"path": "/a", "é": "ü"})
+
+    def test_valid_3(self):
+        "the index is rebuilt if it does not match the cassette, later recordings replace earlier ones"
+        self.cassette.configure("record", self.tmp_dir.name)
+        self._run("/a", {"key": "value"})
+        self.cassette.close()
+        self.cassette.configure("record", self.tmp_dir.name)
+        self._run("/a", {"key": "value"})
+        self.cassette.close()
+        os.remove(os.path.join(self.tmp_dir.name, INDEX_FILENAME))
+
+        self.cassette.configure("replay", self.tmp_dir.name)
+
+        self.assertEqual(len(self.cassette), 1)
+        self.assertEqual(self._run("/a", {"key": "value"})[0]["path"], "/a")
+
+    @skipIf(aiohttp is None, "aiohttp is not installed")
+    def test_valid_4(self):
+        "the asyncio runner records & replays through the cassette, under the same keys as RequestRunner"
+        self.cassette.configure("record", self.tmp_dir.name)
+        record_timings = RequestTimings()
+        recorded = self._run_async("/a", {"key": "value"}, timings=record_timings)
+        self._run("/b", {"key": "value"})
+        self.cassette.close()
+
+        self.cassette.configure("replay", self.tmp_dir.name)
+        requests_made = _Handler.requests_made
+        replay_timings = RequestTimings()
+
+        self.assertEqual(self._run_async("/a", {"key": "value"}, timings=replay_timings), recorded)
+        self.assertEqual(self._run_async("/b", {"key": "value"})[0]["path"], "/b")
+        self.assertEqual(self._run("/a", {"key": "value"})[0], recorded[0])
+        self.assertEqual(_Handler.requests_made, requests_made)
+        self.assertEqual(replay_timings.durations_ns["total"], record_timings.durations_ns["total"])
+
+        with self.assertRaisesRegex(RuntimeError, "No Recorded Response"):
+            self._run_async("/a", {"key": "other"})
+
+    def test_invalid_1(self):
+        "the request was never recorded"
+        self.cassette.configure("record", self.tmp_dir.name)
+        self._run("/a", {"key": "value"})
+        self.cassette.close()
+
+        self.cassette.configure("replay", self.tmp_dir.name)
+
+        with self.assertRaisesRegex(RuntimeError, "No Recorded Response"):
+            self._run("/a", {"key": "other"})
+
+    def test_invalid_2(self):
+        "the mode is invalid, or there is no cassette to replay"
+        with self.assertRaises(ValueError):
+            self.cassette.configure("rewind", self.tmp_dir.name)
+
+        with self.assertRaises(RuntimeError):
+            self.cassette.configure("replay", os.path.join(self.tmp_dir.name, "missing"))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,34 @@
+import threading
+import time
 from unittest import main, mock, TestCase
 
-from generic_api.factory import request_factory
+from generic_api import factory
+from generic_api.factory import request_factory, register_runner, clear_runner_cache, async_request_factory, register_async_runner
+from generic_api.async_request_runner import AsyncRequestRunner, SyncRunnerAdapter
 from generic_api.request_runner import RequestRunner
 from generic_api.example_request_runner import ExampleRequestRunner
 
 
+class _CustomRequestRunner(RequestRunner):
+    "custom runner registered by the tests"
+
+
+class _SlowRequestRunner(RequestRunner):
+    "runner that takes a while to create, counting its instances"
+    instances = 0
+
+    def __init__(self, *args, **kwargs):
+        time.sleep(0.01)
+        type(self).instances += 1
+        super().__init__(*args, **kwargs)
+
+
 class TestRequestFactory(TestCase):
     "test class for the method 'request_factory'"
 
+    def setUp(self):
+        clear_runner_cache()
+
     def test_valid_1(self):
         "succesfully create a base class, no-auth request object"
         result = request_factory("HtTp", "http://localhost/login", "user", "pass")
@@ -21,11 +42,137 @@ class TestRequestFactory(TestCase):
         self.assertIsInstance(result, RequestRunner)
         self.assertIsInstance(result, ExampleRequestRunner)
 
+    def test_valid_3(self):
+        "runner instances are re-used per protocol, auth url and username"
+        result = request_factory("http", "http://localhost/login", "user", "pass")
+
+        self.assertIs(request_factory("http", "http://localhost/login", "user", "pass"), result)
+        self.assertIsNot(request_factory("http", "http://localhost/login", "other", "pass"), result)
+        self.assertIsNot(request_factory("http_example", "http://localhost/login", "user", "pass"), result)
+
+    def test_valid_4(self):
+        "each password of a user has a runner of its own, so alternating between them re-uses both"
+        result = request_factory("http", "http://localhost/login", "user", "pass")
+        other = request_factory("http", "http://localhost/login", "user", "new-pass")
+
+        self.assertIsNot(other, result)
+        self.assertEqual(other.password, "new-pass")
+        self.assertIs(request_factory("http", "http://localhost/login", "user", "pass"), result)
+        self.assertIs(request_factory("http", "http://localhost/login", "user", "new-pass"), other)
+        self.assertFalse(any("pass" in key for key in factory._runners))
+
+    @mock.patch.dict("generic_api.factory.runner_registry")
+    def test_valid_5(self):
+        "succesfully create a runner for a registered custom protocol"
+        self.assertIs(register_runner("HTTP_Custom", _CustomRequestRunner), _CustomRequestRunner)
+
+        self.assertIsInstance(request_factory("http_custom", "", "", ""), _CustomRequestRunner)
+
+    @mock.patch.dict("generic_api.factory.runner_registry")
+    def test_valid_6(self):
+        "registering a protocol again drops its cached instances"
+        register_runner("http_custom", _CustomRequestRunner)
+        result = request_factory("http_custom", "", "", "")
+
+        register_runner("http_custom", RequestRunner)
+
+        self.assertIsNot(request_factory("http_custom", "", "", ""), result)
+        self.assertNotIsInstance(request_factory("http_custom", "", "", ""), _CustomRequestRunner)
+
+    def test_valid_7(self):
+        "the protocol is matched case insensitively, so differently cased protocols share a runner"
+        result = request_factory("HTTP", "http://localhost/login", "user", "pass")
+
+        self.assertIs(request_factory("http", "http://localhost/login", "user", "pass"), result)
+        self.assertIs(request_factory("Http", "http://localhost/login", "user", "pass"), result)
+        self.assertEqual(len(factory._runners), 1)
+
+    @mock.patch.dict("generic_api.factory.runner_registry")
+    def test_valid_8(self):
+        "threads asking for the same runner at once all get a single instance"
+        register_runner("http_slow", _SlowRequestRunner)
+        _SlowRequestRunner.instances = 0
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(request_factory("http_slow", "", "user", "pass"))) for _ in range(10)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(_SlowRequestRunner.instances, 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
     def test_invalid_1(self):
         "requested unsupported type create"
         with self.assertRaises(TypeError):
             request_factory("unsupported type", "", "", "")
 
 
+class TestAsyncRequestFactory(TestCase):
+    "test class for the method 'async_request_factory'"
+
+    def setUp(self):
+        clear_runner_cache()
+
+    def test_valid_1(self):
+        "the native asyncio runner is created and re-used for plain http"
+        result = async_request_factory("HTTP", "http://localhost/login", "user", "pass", max_concurrency=10)
+
+        self.assertIs(type(result), AsyncRequestRunner)
+        self.assertEqual(result.max_concurrency, 10)
+        self.assertIs(async_request_factory("HTTP", "http://localhost/login", "user", "pass", max_concurrency=10), result)
+        self.assertIsNot(async_request_factory("HTTP", "http://localhost/login", "user", "pass", max_concurrency=20), result)
+
+    def test_valid_2(self):
+        "protocols without a native asyncio runner wrap their cached RequestRunner"
+        result = async_request_factory("http_example", "", "", "")
+
+        self.assertIsInstance(result, SyncRunnerAdapter)
+        self.assertIs(result.runner, request_factory("http_example", "", "", ""))
+
+    @mock.patch.dict("generic_api.factory.runner_registry")
+    @mock.patch.dict("generic_api.factory.async_runner_registry")
+    def test_valid_3(self):
+        "registering a RequestRunner for a protocol replaces its native asyncio runner"
+        register_async_runner("http_custom", AsyncRequestRunner)
+        self.assertIs(type(async_request_factory("http_custom", "", "", "")), AsyncRequestRunner)
+
+        register_runner("http_custom", _CustomRequestRunner)
+        result = async_request_factory("http_custom", "", "", "")
+
+        self.assertIsInstance(result, SyncRunnerAdapter)
+        self.assertIsInstance(result.runner, _CustomRequestRunner)
+
+    def test_invalid_1(self):
+        "requested unsupported type create"
+        with self.assertRaises(TypeError):
+            async_request_factory("unsupported type", "", "", "")
+
+    def test_invalid_2(self):
+        "invalid async runner registered"
+        with self.assertRaises(ValueError):
+            register_async_runner("custom", AsyncRequestRunner)
+
+        with self.assertRaises(TypeError):
+            register_async_runner("http_custom", _CustomRequestRunner)  # type: ignore
+
+
+class TestRegisterRunner(TestCase):
+    "test class for the method 'register_runner'"
+
+    def test_invalid_1(self):
+        "protocol does not contain 'http'"
+        with self.assertRaises(ValueError):
+            register_runner("custom", _CustomRequestRunner)
+
+    def test_invalid_2(self):
+        "runner does not derive from RequestRunner"
+        with self.assertRaises(TypeError):
+            register_runner("http_custom", object)  # type: ignore
+
+        self.assertNotIn("http_custom", factory.runner_registry)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,88 @@
+import json
+from unittest import mock, main, TestCase
+
+from generic_api.json_codec import JSONCodec, JSONCodecRegistry, CODEC_PREFERENCE
+
+
+class TestJSONCodecRegistry(TestCase):
+    "test class for the class 'JSONCodecRegistry'"
+
+    data = {"id": 1, "name": "é \"quoted\"", "vals": [1.5, -2, True, None], "nested": {"a": []}}
+
+    def test_valid_1(self):
+        "every installed codec encodes to bytes and decodes both bytes and text to the same data"
+        registry = JSONCodecRegistry()
+        self.assertIn("json", registry.names())
+
+        for name in registry.names():
+            codec = registry.get(name)
+            raw = codec.dumps(self.data)
+
+            self.assertIsInstance(raw, bytes)
+            self.assertDictEqual(json.loads(raw), self.data)
+            self.assertDictEqual(codec.loads(raw), self.data)
+            self.assertDictEqual(codec.loads(raw.decode("utf-8")), self.data)
+
+    def test_valid_2(self):
+        "the fastest installed codec is used unless one is configured by name"
+        registry = JSONCodecRegistry()
+        preferred = next(name for name in CODEC_PREFERENCE if name in registry.names())
+        self.assertEqual(registry.default.name, preferred)
+
+        registry.configure("json")
+        self.assertEqual(registry.default.name, "json")
+
+        registry.configure("")
+        self.assertEqual(registry.default.name, preferred)
+
+    def test_valid_5(self):
+        "request bodies are encoded to the standard library's bytes unless a codec is configured by name"
+        registry = JSONCodecRegistry()
+        data = {"name": "é", "nan": float("nan"), "vals": [1, 2]}
+        self.assertEqual(registry.encoder.dumps(data), json.dumps(data).encode("utf-8"))
+
+        for name in registry.names():
+            registry.configure(name)
+            self.assertIs(registry.encoder, registry.get(name))
+
+        registry.configure("")
+        self.assertEqual(registry.encoder.name, "json")
+
+    def test_valid_3(self):
+        "a registered codec can be configured by name"
+        registry = JSONCodecRegistry()
+        codec = registry.register(JSONCodec("test", mock.MagicMock(), mock.MagicMock()))
+
+        registry.configure("test")
+        self.assertIs(registry.default, codec)
+
+    def test_valid_4(self):
+        "values a fast codec cannot handle fall back to the standard library"
+        registry = JSONCodecRegistry()
+
+        for name in registry.names():
+            codec = registry.get(name)
+            self.assertEqual(json.loads(codec.dumps({"big": 2 ** 70})), {"big": 2 ** 70})
+            self.assertEqual(codec.loads(b'{"big": 1180591620717411303424}'), {"big": 2 ** 70})
+
+    def test_invalid_1(self):
+        "the configured codec is not installed"
+        registry = JSONCodecRegistry()
+
+        with self.assertRaises(ValueError):
+            registry.configure("not-a-codec")
+
+        with self.assertRaises(ValueError):
+            registry.get("not-a-codec")
+
+    def test_invalid_2(self):
+        "invalid JSON raises ValueError whichever codec is used"
+        registry = JSONCodecRegistry()
+
+        for name in registry.names():
+            with self.assertRaises(ValueError):
+                registry.get(name).loads(b"<html></html>")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import json
+from unittest import main, TestCase
+
+from generic_api.json_stream import extract_json_paths, PartialJSONBody
+
+
+def _chunks(raw: bytes, size: int):
+    "splits the raw body into chunks of the given size"
+    return [raw[i:i + size] for i in range(0, len(raw), size)]
+
+
+class TestExtractJsonPaths(TestCase):
+    "test class for the method 'extract_json_paths'"
+
+    body = {
+        "meta": {"count": 3, "next": None, "tags": ["a", "b\"}]", "é"]},
+        "items": [{"id": i, "name": f"n{i}", "vals": [1.5, -2e3, True]} for i in range(20)],
+        "esc\"aped": "key",
+        "tail": "x",
+    }
+
+    def test_valid_1(self):
+        "only the requested paths are kept, whatever size the chunks are"
+        raw = json.dumps(self.body, indent=2, ensure_ascii=False).encode("utf-8")
+        paths = ["meta.count", "meta.tags.1", "meta.tags.2", "items.3.name", "items.19.vals.1", "esc\"aped", "tail", "meta.next"]
+
+        for size in (1, 2, 7, 64, len(raw)):
+            result = extract_json_paths(_chunks(raw, size), paths)
+
+            self.assertIsInstance(result, PartialJSONBody)
+            self.assertDictEqual(result.values, {
+                "meta.count": 3,
+                "meta.tags.1": "b\"}]",
+                "meta.tags.2": "é",
+                "items.3.name": "n3",
+                "items.19.vals.1": -2000.0,
+                "esc\"aped": "key",
+                "tail": "x",
+                "meta.next": None,
+            })
+            self.assertEqual(result.missing, ())
+
+    def test_valid_2(self):
+        "paths below a requested path are looked up in its value, missing paths are recorded"
+        raw = json.dumps(self.body).encode("utf-8")
+
+        result = extract_json_paths([raw], ["meta", "meta.tags.0", "meta.missing", "items.25.id", "items.-1.id"])
+
+        self.assertDictEqual(result.values, {"meta": self.body["meta"], "meta.tags.0": "a"})
+        self.assertEqual(set(result.missing), {"meta.missing", "items.25.id", "items.-1.id"})
+
+        with self.assertRaisesRegex(ValueError, "Not Found"):
+            result.get("items.25.id")
+
+        with self.assertRaisesRegex(ValueError, "Not Extracted"):
+            result.get("tail")
+
+    def test_valid_3(self):
+        "the body is only read until every requested path is found"
+        def chunks():
+            yield b'{"a": {"b": [1, 2]}, "c": '
+            raise AssertionError("Read Past The Requested Paths")
+
+        self.assertDictEqual(extract_json_paths(chunks(), ["a.b.1"]).values, {"a.b.1": 2})
+
+    def test_valid_4(self):
+        "an empty body returns None"
+        self.assertIsNone(extract_json_paths([b"", b"  \n"], ["a"]))
+
+    def test_invalid_1(self):
+        "the body ends part way through"
+        with self.assertRaises(ValueError):
+            extract_json_paths([b'{"a": [1, 2'], ["b"])
+
+    def test_invalid_2(self):
+        "the body is not JSON"
+        for raw in (b'{"a": 1} x', b'{"a" 1}', b"<html></html>", b'{"a": tru}'):
+            with self.assertRaises(ValueError):
+                extract_json_paths([raw], ["b"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+from unittest import main, mock, TestCase
+
+from generic_api.lazy_body import LazyResponseBody
+from generic_api.request_timing import RequestTimings
+
+
+class TestLazyResponseBody(TestCase):
+    "test class for LazyResponseBody"
+
+    def test_valid_1(self):
+        "the body is decoded on first use only, adding to the decode phase"
+        m_decoder = mock.MagicMock(return_value={"foo": "bar"})
+        timings = RequestTimings()
+        body = LazyResponseBody(b'{"foo": "bar"}', m_decoder, timings)
+
+        self.assertFalse(body.decoded)
+        self.assertEqual(len(body), 14)
+        m_decoder.assert_not_called()
+
+        self.assertDictEqual(body.decode(), {"foo": "bar"})
+        self.assertIs(body.decode(), body.decode())
+        self.assertTrue(body.decoded)
+        m_decoder.assert_called_once_with(b'{"foo": "bar"}')
+        self.assertGreater(timings.durations_ns["decode"], 0)
+
+    def test_valid_2(self):
+        "the raw bytes are dropped once decoded, keeping their size"
+        body = LazyResponseBody(b'{"foo": "bar"}', mock.MagicMock(return_value={"foo": "bar"}))
+        body.decode()
+
+        self.assertIsNone(body.raw)
+        self.assertEqual(len(body), 14)
+        self.assertEqual(repr(body), "LazyResponseBody(14 bytes, decoded)")
+
+    def test_invalid_1(self):
+        "decode errors are raised on use, and again on the next use"
+        m_decoder = mock.MagicMock(side_effect=ValueError("Ex Decoding JSON"))
+        body = LazyResponseBody(b"{", m_decoder)
+
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                body.decode()
+
+        self.assertFalse(body.decoded)
+        self.assertEqual(body.raw, b"{")
+
+
+if __name__ == "__main__":
+    main()
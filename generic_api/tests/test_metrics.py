@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+from unittest import main, TestCase
+
+from generic_api.metrics import MetricsRecorder
+from generic_api.request_timing import RequestTimings
+
+
+class TestMetricsRecorder(TestCase):
+    "test class for the class 'MetricsRecorder'"
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.recorder = MetricsRecorder()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.addCleanup(self.recorder.close)
+
+    def _run_scenario(self):
+        self.recorder.start_scenario("Feature", "Scenario")
+        self.recorder.start_step("Given a step", 3)
+
+        with self.recorder.span("render"):
+            pass
+
+        timings = RequestTimings()
+        timings.durations_ns["ttfb"] = 2_000_000
+        timings.durations_ns["total"] = 3_000_000
+        self.recorder.add_timings(timings)
+        self.recorder.end_step("passed")
+        self.recorder.end_scenario("passed")
+
+    def test_valid_1(self):
+        "steps & scenarios are appended to the JSON-lines file with their stages"
+        filepath = os.path.join(self.tmp_dir.name, "metrics.jsonl")
+        self.recorder.configure(filepath, "jsonl")
+        self._run_scenario()
+        self.recorder.close()
+
+        with open(filepath, "r") as fhandle:
+            step, scenario = [json.loads(line) for line in fhandle]
+
+        self.assertEqual(step["type"], "step")
+        self.assertEqual(step["step"], "Given a step")
+        self.assertEqual(step["line"], 3)
+        self.assertEqual(step["scenario"], "Scenario")
+        self.assertEqual(step["stages_ms"]["ttfb"], 2.0)
+        self.assertIn("render", step["stages_ms"])
+        self.assertNotIn("total", step["stages_ms"])
+        self.assertEqual(scenario["type"], "scenario")
+        self.assertEqual(scenario["status"], "passed")
+        self.assertEqual(scenario["stages_ms"]["ttfb"], 2.0)
+        self.assertEqual(step["run_id"], scenario["run_id"])
+
+    def test_valid_2(self):
+        "durations are summed into Prometheus summaries written when the recorder is closed"
+        filepath = os.path.join(self.tmp_dir.name, "metrics.prom")
+        self.recorder.configure(filepath, "prometheus")
+        self._run_scenario()
+        self._run_scenario()
+
+        self.assertFalse(os.path.isfile(filepath))
+        self.recorder.close()
+
+        with open(filepath, "r") as fhandle:
+            content = fhandle.read()
+
+        self.assertIn("# TYPE behave_step_duration_seconds summary", content)
+        self.assertIn('behave_step_duration_seconds_count{feature="Feature",scenario="Scenario",step="Given a step",status="passed"} 2', content)
+        self.assertIn('behave_scenario_stage_duration_seconds_sum{feature="Feature",scenario="Scenario",stage="ttfb"} 0.004000000', content)
+
+    def test_valid_3(self):
+        "nothing is recorded when no file is configured"
+        self.recorder.configure("", "jsonl")
+        self._run_scenario()
+        self.recorder.close()
+
+        self.assertFalse(self.recorder.enabled)
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+    def test_invalid_1(self):
+        "the metrics format is invalid"
+        with self.assertRaises(ValueError):
+            self.recorder.configure(os.path.join(self.tmp_dir.name, "metrics.csv"), "csv")
+
+
+if __name__ == "__main__":
+    main()
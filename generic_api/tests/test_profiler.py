@@ -0,0 +1,119 @@
+import os
+import pstats
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import main, TestCase
+
+from generic_api.profiler import Profiler, collapse_stack, is_network_wait, NETWORK_WAIT, CPU
+
+
+def _busy(duration: float) -> None:
+    end = time.perf_counter() + duration
+
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+
+class TestCollapseStack(TestCase):
+    "test class for the methods 'collapse_stack' and 'is_network_wait'"
+
+    def test_valid_1(self):
+        "the stack is listed outermost first, rooted at 'cpu' when not waiting on the network"
+        stack = collapse_stack(sys._getframe())
+
+        self.assertTrue(stack.startswith(f"{CPU};"))
+        self.assertTrue(stack.endswith("test_valid_1 (test_profiler.py)"))
+        self.assertFalse(is_network_wait(sys._getframe()))
+
+    def test_valid_2(self):
+        "a thread blocked reading a socket is waiting on the network"
+        reader, writer = socket.socketpair()
+        self.addCleanup(reader.close)
+        self.addCleanup(writer.close)
+        thread = threading.Thread(target=lambda: reader.makefile("rb").readline())
+        thread.start()
+        time.sleep(0.05)
+
+        frame = sys._current_frames()[thread.ident]
+        writer.sendall(b"done\n")
+        thread.join()
+
+        self.assertTrue(is_network_wait(frame))
+        self.assertTrue(collapse_stack(frame).startswith(f"{NETWORK_WAIT};"))
+
+    def test_valid_3(self):
+        "a thread blocked on the result of a worker thread, as the behave thread is under the threads load engine, is waiting"
+        done = threading.Event()
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(done.wait)
+            thread = threading.Thread(target=future.result)
+            thread.start()
+            time.sleep(0.05)
+
+            frame = sys._current_frames()[thread.ident]
+            done.set()
+            thread.join()
+
+        self.assertTrue(is_network_wait(frame))
+        self.assertTrue(collapse_stack(frame).startswith(f"{NETWORK_WAIT};"))
+        self.assertIn("result (_base.py)", collapse_stack(frame))
+
+
+class TestProfiler(TestCase):
+    "test class for the class 'Profiler'"
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.profiler = Profiler()
+        self.profiler.configure("scenario", self.tmp_dir.name, 1)
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.addCleanup(self.profiler.stop)
+
+    def test_valid_1(self):
+        "a profile writes its pstats & collapsed stacks"
+        self.assertTrue(self.profiler.start("Feature: a scenario"))
+        self.assertFalse(self.profiler.start("another"))
+        _busy(0.1)
+        filepath = self.profiler.stop()
+
+        self.assertEqual(os.path.basename(filepath), "0001-Feature_a_scenario")
+        self.assertFalse(self.profiler.active)
+        self.assertIn("_busy", str(pstats.Stats(f"{filepath}.pstats").stats))
+
+        with open(f"{filepath}.folded", "r") as fhandle:
+            lines = fhandle.read().splitlines()
+
+        self.assertTrue(any("_busy (test_profiler.py)" in line for line in lines))
+        self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+
+    def test_valid_2(self):
+        "a scenario is not profiled on its own while a tag's profile is being taken"
+        self.profiler.start("tagged feature")
+        self.profiler.start_scenario("scenario")
+        self.profiler.stop_scenario()
+
+        self.assertTrue(self.profiler.active)
+        self.profiler.stop()
+        self.assertEqual(len(os.listdir(self.tmp_dir.name)), 2)
+
+    def test_valid_3(self):
+        "nothing is written when there is no profile to stop"
+        self.assertEqual(self.profiler.stop(), "")
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+    def test_invalid_1(self):
+        "the mode or sample interval is invalid"
+        with self.assertRaises(ValueError):
+            self.profiler.configure("always")
+
+        with self.assertRaises(ValueError):
+            self.profiler.configure("run", self.tmp_dir.name, 0)
+
+
+if __name__ == "__main__":
+    main()
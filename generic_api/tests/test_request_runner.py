@@ -1,12 +1,135 @@
 from unittest import main, mock, TestCase
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import gzip
+import hashlib
+import io
 import json
+import os
+import tempfile
+import threading
+import tracemalloc
+import zlib
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from generic_api.json_stream import PartialJSONBody
+from generic_api.lazy_body import LazyResponseBody
+from generic_api.request_runner import RequestRunner, ContentDecoder, ResponseTooLargeError, parse_encodings, compress_chunks
+from generic_api.request_timing import RequestTimings
+from generic_api.token_cache import token_cache
 
-from generic_api.request_runner import RequestRunner
+
+def _make_response(chunks, headers):
+    "returns a real response whose body is read from the chunks as if it was downloading"
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.headers = CaseInsensitiveDict(headers)
+    resp.raw = io.BytesIO(b"".join(chunks))
+    return resp
+
+
+class _CompressingHandler(BaseHTTPRequestHandler):
+    "responds with a large JSON body, gzipped if the request accepts it, or labelled as brotli under '/br'"
+    protocol_version = "HTTP/1.1"
+    body = json.dumps({"items": [{"id": i, "name": f"item-{i}"} for i in range(2000)]}).encode("utf-8")
+
+    def do_GET(self):
+        accept_encoding = self.headers.get("Accept-Encoding", "")
+        compress = "gzip" in accept_encoding or "*" in accept_encoding
+        data = gzip.compress(self.body) if compress else self.body
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+
+        if self.path.startswith("/br"):
+            self.send_header("Content-Encoding", "br")
+        elif compress:
+            self.send_header("Content-Encoding", "gzip")
+
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class _UploadHandler(BaseHTTPRequestHandler):
+    "reads a request body sent whole or chunked, decompressing it if compressed, and responds with its size & hash"
+    protocol_version = "HTTP/1.1"
+
+    def _read_body(self):
+        if self.headers.get("Transfer-Encoding", "") == "chunked":
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                data = self.rfile.read(size)
+                self.rfile.readline()
+
+                if not size:
+                    return
+                yield data
+        else:
+            remaining = int(self.headers.get("Content-Length", 0))
+
+            while remaining > 0:
+                data = self.rfile.read(min(remaining, 64 * 1024))
+                remaining -= len(data)
+                yield data
+
+    def do_POST(self):
+        encoding = self.headers.get("Content-Encoding", "")
+        decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS)
+        digest = hashlib.sha256()
+        size = 0
+
+        for data in self._read_body():
+            size += len(data)
+            digest.update(decompressor.decompress(data) if encoding else data)
+
+        data = json.dumps({
+            "sha256": digest.hexdigest(),
+            "wire_bytes": size,
+            "chunked": self.headers.get("Transfer-Encoding", "") == "chunked",
+            "content_type": self.headers.get("Content-Type", ""),
+        }).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCompressChunks(TestCase):
+    "test class for the method 'compress_chunks'"
+
+    def test_valid_1(self):
+        "the chunks are compressed as one gzip or deflate stream"
+        chunks = [b"abc" * 100, b"", b"def" * 100]
+
+        self.assertEqual(gzip.decompress(b"".join(compress_chunks(chunks, "gzip"))), b"".join(chunks))
+        self.assertEqual(zlib.decompress(b"".join(compress_chunks(chunks, "deflate"))), b"".join(chunks))
+
+
+class TestParseEncodings(TestCase):
+    "test class for the method 'parse_encodings'"
+
+    def test_valid_1(self):
+        "the encodings of a header are listed without their q-values"
+        self.assertEqual(parse_encodings("br;q=1.0, GZIP ,, identity;q=0"), ["br", "gzip", "identity"])
+        self.assertEqual(parse_encodings(""), [])
 
 
 class TestRequestRunner(TestCase):
     "test class for RequestRunner"
 
+    def setUp(self):
+        token_cache.clear()
+
     def test_valid_constructor_1(self):
         "succesfully construct the required fields"
         result = RequestRunner(auth_url="http://auth", username="user", password="pass")
@@ -34,13 +157,13 @@ class TestRequestRunner(TestCase):
         client = RequestRunner()
         self.assertDictEqual(client.set_request_token({"foo": "bar"}, "token"), {"foo": "bar"})
 
-    @mock.patch("generic_api.request_runner.requests.get", return_value=mock.MagicMock())
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
     @mock.patch("generic_api.request_runner.RequestRunner.authenticate", return_value="testauthtoken")
     def test_valid_get_request_1(self, m_token, m_get):
         "use the 'run_request' method to succesfully run a GET request"
-        m_get.return_value.headers = {"Content-Type": "application/json"}
-        m_get.return_value.text = json.dumps({"blob": "blib"})
-        m_get.return_value.status_code = 200
+        m_get.return_value.get.return_value.headers = {"Content-Type": "application/json"}
+        m_get.return_value.get.return_value.iter_content.return_value = [json.dumps({"blob": "blib"}).encode("utf-8")]
+        m_get.return_value.get.return_value.status_code = 200
 
         client = RequestRunner(auth_url="http://auth", username="user", password="pass")
 
@@ -51,12 +174,12 @@ class TestRequestRunner(TestCase):
         self.assertDictEqual(result_headers, {"Content-Type": "application/json"})
         self.assertEqual(result_status_code, 200)
 
-    @mock.patch("generic_api.request_runner.requests.get", return_value=mock.MagicMock())
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
     def test_valid_get_request_2(self, m_get):
         "use the 'run_request' method to succesfully run a GET request, no content-type returned, and no auth requested"
-        m_get.return_value.headers = {}
-        m_get.return_value.text = json.dumps({"blob": "blib"})
-        m_get.return_value.status_code = 200
+        m_get.return_value.get.return_value.headers = {}
+        m_get.return_value.get.return_value.iter_content.return_value = [json.dumps({"blob": "blib"}).encode("utf-8")]
+        m_get.return_value.get.return_value.status_code = 200
 
         client = RequestRunner()
 
@@ -67,11 +190,11 @@ class TestRequestRunner(TestCase):
         self.assertDictEqual(result_headers, {})
         self.assertEqual(result_status_code, 200)
 
-    @mock.patch("generic_api.request_runner.requests.get", return_value=mock.MagicMock())
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
     def test_valid_get_request_3(self, m_get):
         "use the 'run_request' method to succesfully run a GET request, no auth, no body returned"
-        m_get.return_value.headers = {}
-        m_get.return_value.status_code = 200
+        m_get.return_value.get.return_value.headers = {}
+        m_get.return_value.get.return_value.status_code = 200
 
         client = RequestRunner()
 
@@ -82,22 +205,23 @@ class TestRequestRunner(TestCase):
         self.assertDictEqual(result_headers, {})
         self.assertEqual(result_status_code, 200)
 
-    @mock.patch("generic_api.request_runner.requests.get", side_effect=ConnectionError("Test Error"))
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
     def test_invalid_get_request_1(self, m_get):
         "exception encountered executing request"
+        m_get.return_value.get.side_effect = ConnectionError("Test Error")
         client = RequestRunner()
 
         with self.assertRaises(RuntimeError):
             result_body, result_headers, result_status_code = client.run_request(
                 "GET", "http://blob/blib", query_params={"foo": "bar"}, header_params={"bar": "foo"}, authenticate=False)
 
-    @mock.patch("generic_api.request_runner.requests.post", return_value=mock.MagicMock())
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
     @mock.patch("generic_api.request_runner.RequestRunner.authenticate", return_value="testauthtoken")
     def test_valid_post_request_1(self, m_token, m_post):
         "succesfully execute a post request using the 'run_request' method"
-        m_post.return_value.headers = {"Content-Type": "application/json"}
-        m_post.return_value.text = json.dumps({"bar": "foo"})
-        m_post.return_value.status_code = 200
+        m_post.return_value.post.return_value.headers = {"Content-Type": "application/json"}
+        m_post.return_value.post.return_value.iter_content.return_value = [json.dumps({"bar": "foo"}).encode("utf-8")]
+        m_post.return_value.post.return_value.status_code = 200
 
         client = RequestRunner(auth_url="http://auth", username="user", password="pass")
 
@@ -108,12 +232,12 @@ class TestRequestRunner(TestCase):
         self.assertDictEqual(result_headers, {"Content-Type": "application/json"})
         self.assertEqual(result_status_code, 200)
 
-    @mock.patch("generic_api.request_runner.requests.post", return_value=mock.MagicMock())
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
     def test_valid_post_request_2(self, m_post):
         "succesfully execute a post request using the 'run_request' method, no content type returned, no auth"
-        m_post.return_value.headers = {}
-        m_post.return_value.text = json.dumps({"bar": "foo"})
-        m_post.return_value.status_code = 200
+        m_post.return_value.post.return_value.headers = {}
+        m_post.return_value.post.return_value.iter_content.return_value = [json.dumps({"bar": "foo"}).encode("utf-8")]
+        m_post.return_value.post.return_value.status_code = 200
 
         client = RequestRunner()
 
@@ -124,21 +248,22 @@ class TestRequestRunner(TestCase):
         self.assertDictEqual(result_headers, {})
         self.assertEqual(result_status_code, 200)
 
-    @mock.patch("generic_api.request_runner.requests.post", side_effect=ConnectionError("Test Error"))
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
     def test_invalid_post_request_1(self, m_post):
         "exception making request"
+        m_post.return_value.post.side_effect = ConnectionError("Test Error")
         client = RequestRunner()
 
         with self.assertRaises(RuntimeError):
             result_body, result_headers, result_status_code = client.run_request(
                 "POST", "http://blob/blib", body={"foo": "bar"}, header_params={"Content-Type": "application/json"}, authenticate=False)
 
-    @mock.patch("generic_api.request_runner.requests.delete", return_value=mock.MagicMock())
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
     @mock.patch("generic_api.request_runner.RequestRunner.authenticate", return_value="testauthtoken")
     def test_valid_delete_request_1(self, m_token, m_get):
         "use the 'run_request' method to succesfully run a DELETE request"
-        m_get.return_value.headers = {}
-        m_get.return_value.status_code = 204
+        m_get.return_value.delete.return_value.headers = {}
+        m_get.return_value.delete.return_value.status_code = 204
 
         client = RequestRunner(auth_url="http://auth", username="user", password="pass")
 
@@ -149,19 +274,20 @@ class TestRequestRunner(TestCase):
         self.assertDictEqual(result_headers, {})
         self.assertEqual(result_status_code, 204)
 
-    @mock.patch("generic_api.request_runner.requests.delete", side_effect=ConnectionError("Test Error"))
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
     def test_invalid_delete_request_1(self, m_post):
         "exception making request"
+        m_post.return_value.delete.side_effect = ConnectionError("Test Error")
         with self.assertRaises(RuntimeError):
             result_body, result_headers, result_status_code = RequestRunner().run_request(
                 "DELETE", "http://blob/blib", body={"foo": "bar"}, header_params={"Content-Type": "application/json"}, authenticate=False)
 
-    @mock.patch("generic_api.request_runner.requests.put", return_value=mock.MagicMock())
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
     @mock.patch("generic_api.request_runner.RequestRunner.authenticate", return_value="testauthtoken")
     def test_valid_put_request_1(self, m_token, m_get):
         "use the 'run_request' method to succesfully run a DELETE request"
-        m_get.return_value.headers = {}
-        m_get.return_value.status_code = 201
+        m_get.return_value.put.return_value.headers = {}
+        m_get.return_value.put.return_value.status_code = 201
 
         client = RequestRunner(auth_url="http://auth", username="user", password="pass")
 
@@ -172,13 +298,110 @@ class TestRequestRunner(TestCase):
         self.assertDictEqual(result_headers, {})
         self.assertEqual(result_status_code, 201)
 
-    @mock.patch("generic_api.request_runner.requests.put", side_effect=ConnectionError("Test Error"))
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
     def test_invalid_put_request_1(self, m_post):
         "exception making request"
+        m_post.return_value.put.side_effect = ConnectionError("Test Error")
         with self.assertRaises(RuntimeError):
             result_body, result_headers, result_status_code = RequestRunner().run_request(
                 "PUT", "http://blob/blib", body={"foo": "bar"}, header_params={"Content-Type": "application/json"}, authenticate=False)
 
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
+    @mock.patch("generic_api.request_runner.RequestRunner.authenticate", return_value="testauthtoken")
+    def test_valid_run_request_1(self, m_token, m_get):
+        "the auth token is cached across requests and runner instances, and dropped once rejected"
+        m_get.return_value.get.return_value.headers = {}
+        m_get.return_value.get.return_value.status_code = 200
+
+        for _ in range(3):
+            RequestRunner(auth_url="http://auth", username="user", password="pass").run_request("GET", "http://blob/blib")
+
+        self.assertEqual(m_token.call_count, 1)
+
+        m_get.return_value.get.return_value.status_code = 401
+        RequestRunner(auth_url="http://auth", username="user", password="pass").run_request("GET", "http://blob/blib")
+        RequestRunner(auth_url="http://auth", username="user", password="pass").run_request("GET", "http://blob/blib")
+
+        self.assertEqual(m_token.call_count, 2)
+
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
+    def test_valid_run_request_2(self, m_get):
+        "a streamed response only keeps the requested paths, and is closed once they are found"
+        m_resp = m_get.return_value.get.return_value
+        m_resp.headers = {"Content-Type": "application/json"}
+        m_resp.status_code = 200
+        chunks = [b'{"items": [{"id": 1}, ', b'{"id": 2}], "total": 2}']
+        m_resp.iter_content.return_value = iter(chunks)
+        timings = RequestTimings()
+
+        result_body, _, result_status_code = RequestRunner().run_request(
+            "GET", "http://blob/blib", authenticate=False, timings=timings, stream_paths=("items.1.id", "missing"))
+
+        self.assertIsInstance(result_body, PartialJSONBody)
+        self.assertDictEqual(result_body.values, {"items.1.id": 2})
+        self.assertEqual(result_body.missing, ("missing",))
+        self.assertEqual(result_status_code, 200)
+        self.assertEqual(timings.response_bytes, sum(len(chunk) for chunk in chunks))
+        self.assertGreater(timings.durations_ns["total"], 0)
+        m_resp.close.assert_called_once_with()
+
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
+    def test_valid_run_request_3(self, m_get):
+        "stream paths are ignored for content types that cannot be streamed, which are decoded in full"
+        m_resp = m_get.return_value.get.return_value
+        m_resp.headers = {"Content-Type": "text/plain"}
+        m_resp.status_code = 200
+        m_resp.iter_content.return_value = []
+
+        result_body, _, _ = RequestRunner().run_request("GET", "http://blob/blib", authenticate=False, stream_paths=("items",))
+
+        self.assertIsNone(result_body)
+        m_resp.close.assert_not_called()
+
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
+    def test_valid_run_request_4(self, m_get):
+        "a lazily decoded body is kept as bytes until it is used, unsupported content types only fail when used"
+        m_resp = m_get.return_value.get.return_value
+        m_resp.headers = {"Content-Type": "text/html"}
+        m_resp.status_code = 200
+        m_resp.iter_content.return_value = [b"<html></html>"]
+
+        result_body, _, result_status_code = RequestRunner().run_request("GET", "http://blob/blib", authenticate=False, lazy_decode=True)
+
+        self.assertIsInstance(result_body, LazyResponseBody)
+        self.assertEqual(result_body.raw, b"<html></html>")
+        self.assertEqual(result_status_code, 200)
+
+        with self.assertRaises(ValueError):
+            result_body.decode()
+
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
+    def test_valid_run_request_5(self, m_get):
+        "a lazily decoded json body, and an empty body"
+        m_resp = m_get.return_value.get.return_value
+        m_resp.headers = {}
+        m_resp.iter_content.return_value = [b'{"blob": "blib"}']
+
+        result_body, _, _ = RequestRunner().run_request("GET", "http://blob/blib", authenticate=False, lazy_decode=True)
+
+        self.assertDictEqual(result_body.decode(), {"blob": "blib"})
+
+        m_resp.iter_content.return_value = []
+        result_body, _, _ = RequestRunner().run_request("GET", "http://blob/blib", authenticate=False, lazy_decode=True)
+
+        self.assertIsNone(result_body)
+
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
+    def test_valid_run_request_6(self, m_get):
+        "a body no larger than the maximum size is read in chunks and decoded"
+        m_get.return_value.get.return_value = _make_response([b'{"blob": ', b'"blib"}'], {"Content-Type": "application/json"})
+        timings = RequestTimings()
+
+        result_body, _, _ = RequestRunner().run_request("GET", "http://blob/blib", authenticate=False, timings=timings, max_response_bytes=16)
+
+        self.assertDictEqual(result_body, {"blob": "blib"})
+        self.assertEqual(timings.response_bytes, 16)
+
     def test_invalid_run_request_1(self):
         "returned auth token is empty"
         client = RequestRunner(auth_url="http://auth", username="user", password="pass")
@@ -227,12 +450,12 @@ class TestRequestRunner(TestCase):
             result_body, result_headers, result_status_code = client.run_request(
                 "POST", "http://blob/blib", body={"foo": "bar"}, header_params={}, content_type="UNSUPPORTED", authenticate=False)
 
-    @mock.patch("generic_api.request_runner.requests.post", return_value=mock.MagicMock())
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
     def test_invalid_run_request_7(self, m_post):
         "content_type of response body is not supported"
-        m_post.return_value.headers = {"Content-Type": "UNSUPPORTED"}
-        m_post.return_value.text = json.dumps({"bar": "foo"})
-        m_post.return_value.status_code = 200
+        m_post.return_value.post.return_value.headers = {"Content-Type": "UNSUPPORTED"}
+        m_post.return_value.post.return_value.iter_content.return_value = [json.dumps({"bar": "foo"}).encode("utf-8")]
+        m_post.return_value.post.return_value.status_code = 200
 
         client = RequestRunner()
 
@@ -240,21 +463,22 @@ class TestRequestRunner(TestCase):
             result_body, result_headers, result_status_code = client.run_request(
                 "POST", "http://blob/blib", body={"foo": "bar"}, header_params={"Content-Type": "application/json"}, authenticate=False)
 
-    @mock.patch("generic_api.request_runner.json.dumps", side_effect=RuntimeError("Test Error"))
-    def test_invalid_run_request_8(self, m_dumps):
+    @mock.patch("generic_api.request_runner.json_codecs")
+    def test_invalid_run_request_8(self, m_codecs):
         "invalid json given for body encode"
+        m_codecs.encoder.dumps.side_effect = RuntimeError("Test Error")
         client = RequestRunner()
 
         with self.assertRaises(ValueError):
             result_body, result_headers, result_status_code = client.run_request(
                 "POST", "http://blob/blib", body={"foo": "bar"}, header_params={}, content_type="application/json", authenticate=False)
 
-    @mock.patch("generic_api.request_runner.requests.post", return_value=mock.MagicMock())
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
     def test_invalid_run_request_9(self, m_post):
         "invalid json returned in the response body for decode"
-        m_post.return_value.headers = {"Content-Type": "application/json"}
-        m_post.return_value.text = "asdfhaetrjaetrhaer"
-        m_post.return_value.status_code = 200
+        m_post.return_value.post.return_value.headers = {"Content-Type": "application/json"}
+        m_post.return_value.post.return_value.iter_content.return_value = [b"asdfhaetrjaetrhaer"]
+        m_post.return_value.post.return_value.status_code = 200
 
         client = RequestRunner()
 
@@ -262,6 +486,230 @@ class TestRequestRunner(TestCase):
             result_body, result_headers, result_status_code = client.run_request(
                 "POST", "http://blob/blib", body={"foo": "bar"}, header_params={"Content-Type": "application/json"}, authenticate=False)
 
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
+    def test_invalid_run_request_10(self, m_get):
+        "invalid json returned in a streamed response body"
+        m_resp = m_get.return_value.get.return_value
+        m_resp.headers = {"Content-Type": "application/json"}
+        m_resp.iter_content.return_value = iter([b"asdfhaetrjaetrhaer"])
+
+        with self.assertRaises(ValueError):
+            RequestRunner().run_request("GET", "http://blob/blib", authenticate=False, stream_paths=("items",))
+
+        m_resp.close.assert_called_once_with()
+
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
+    def test_invalid_run_request_11(self, m_get):
+        "the Content-Length of the response is larger than the maximum size, so none of the body is downloaded"
+        m_resp = m_get.return_value.get.return_value
+        m_resp.headers = {"Content-Type": "application/json", "Content-Length": "2048"}
+
+        with self.assertRaisesRegex(ResponseTooLargeError, "Max: 1024 Bytes; Got: At Least 2048 Bytes; Request: GET http://blob/blib"):
+            RequestRunner().run_request("GET", "http://blob/blib", authenticate=False, max_response_bytes=1024)
+
+        m_resp.iter_content.assert_not_called()
+        m_resp.close.assert_called_once_with()
+
+    @mock.patch("generic_api.request_runner.session_pool.get_session", return_value=mock.MagicMock())
+    def test_invalid_run_request_12(self, m_get):
+        "the body grows larger than the maximum size as it downloads, whether it is read whole or streamed"
+        for stream_paths in (None, ("items",)):
+            m_resp = _make_response([b'{"items": [1, 2, 3, 4, 5, 6, 7, 8, 9]}'], {"Content-Type": "application/json"})
+            m_get.return_value.get.return_value = m_resp
+
+            with mock.patch("generic_api.request_runner.STREAM_CHUNK_SIZE", 8), self.assertRaises(ResponseTooLargeError):
+                RequestRunner().run_request("GET", "http://blob/blib", authenticate=False, stream_paths=stream_paths, max_response_bytes=20)
+
+            self.assertTrue(m_resp.raw.closed)
+
+    def test_invalid_run_request_13(self):
+        "the maximum response size is negative"
+        with self.assertRaises(ValueError):
+            RequestRunner().run_request("GET", "http://blob/blib", authenticate=False, max_response_bytes=-1)
+
+
+class TestCompression(TestCase):
+    "test class for negotiating & decompressing compressed responses with RequestRunner"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _CompressingHandler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/items"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_valid_1(self):
+        "a gzipped body is decompressed as it downloads, whether read whole or streamed, recording its size over the wire"
+        for stream_paths in (None, ("items.10.name",)):
+            timings = RequestTimings()
+            body, headers, _ = RequestRunner().run_request("GET", self.url, authenticate=False, timings=timings, stream_paths=stream_paths,
+                                                           accept_encoding="gzip")
+
+            self.assertEqual(headers["Content-Encoding"], "gzip")
+            self.assertEqual(body.values["items.10.name"] if stream_paths else body["items"][10]["name"], "item-10")
+            self.assertEqual(timings.wire_bytes, len(gzip.compress(_CompressingHandler.body)))
+            self.assertGreater(timings.compression_ratio(), 5)
+            self.assertGreater(timings.durations_ns["decompress"], 0)
+
+    def test_valid_2(self):
+        "an uncompressed body is the same size over the wire"
+        timings = RequestTimings()
+        _, headers, _ = RequestRunner().run_request("GET", self.url, authenticate=False, timings=timings, accept_encoding="identity")
+
+        self.assertNotIn("Content-Encoding", headers)
+        self.assertEqual(timings.wire_bytes, len(_CompressingHandler.body))
+        self.assertEqual(timings.compression_ratio(), 1.0)
+        self.assertEqual(timings.durations_ns["decompress"], 0)
+
+    def test_valid_3(self):
+        "the maximum response size applies to the decompressed body"
+        with self.assertRaises(ResponseTooLargeError):
+            RequestRunner().run_request("GET", self.url, authenticate=False, accept_encoding="gzip", max_response_bytes=len(_CompressingHandler.body) - 1)
+
+    def test_valid_4(self):
+        "the server may choose any encoding for '*', and gzip & deflate are asked for when no encodings are given"
+        for accept_encoding in ("*", ""):
+            timings = RequestTimings()
+            body, headers, _ = RequestRunner().run_request("GET", self.url, authenticate=False, timings=timings, accept_encoding=accept_encoding)
+
+            self.assertEqual(headers["Content-Encoding"], "gzip")
+            self.assertEqual(body["items"][10]["name"], "item-10")
+            self.assertGreater(timings.durations_ns["decompress"], 0)
+
+    def test_invalid_1(self):
+        "an encoding that cannot be decompressed is asked for"
+        for accept_encoding in ("gzip, compress", "br", "zstd"):
+            with self.assertRaisesRegex(ValueError, "Unsupported Content Encoding"):
+                RequestRunner().run_request("GET", self.url, authenticate=False, accept_encoding=accept_encoding)
+
+    def test_invalid_2(self):
+        "the server sends a body in an encoding that cannot be decompressed"
+        with self.assertRaisesRegex(RuntimeError, "Unsupported Content Encoding br"):
+            RequestRunner().run_request("GET", self.url.replace("/items", "/br"), authenticate=False, accept_encoding="*")
+
+
+class TestContentDecoder(TestCase):
+    "test class for decompressing response bodies chunk by chunk with ContentDecoder"
+
+    def _decode(self, data, encodings):
+        timings = RequestTimings()
+        decoder = ContentDecoder(encodings, timings)
+        body = b"".join(decoder.decompress(data[i:i + 7]) for i in range(0, len(data), 7)) + decoder.flush()
+        return body, timings
+
+    def test_valid_1(self):
+        "gzip bodies of several members, and deflate bodies zlib wrapped or raw, are decompressed recording their size over the wire"
+        raw_deflate = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        cases = [
+            (gzip.compress(b"first ") + gzip.compress(b"second"), ["gzip"]),
+            (zlib.compress(b"first second"), ["deflate"]),
+            (raw_deflate.compress(b"first second") + raw_deflate.flush(), ["deflate"]),
+            (zlib.compress(gzip.compress(b"first second")), ["gzip", "deflate"]),
+        ]
+
+        for data, encodings in cases:
+            body, timings = self._decode(data, encodings)
+
+            self.assertEqual(body, b"first second")
+            self.assertEqual(timings.wire_bytes, len(data))
+            self.assertGreater(timings.durations_ns["decompress"], 0)
+
+    def test_invalid_1(self):
+        "the body is not compressed with the encoding it claims"
+        with self.assertRaisesRegex(RuntimeError, "Ex Decompressing Response Body"):
+            self._decode(b"not gzipped at all", ["gzip"])
+
+    def test_invalid_2(self):
+        "an encoding that cannot be decompressed"
+        self.assertFalse(ContentDecoder.supports(["br"]))
+
+        with self.assertRaises(ValueError):
+            ContentDecoder(["gzip", "br"], RequestTimings())
+
+
+class TestBodyFile(TestCase):
+    "test class for streaming request bodies from a file with RequestRunner"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _UploadHandler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/ingest"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        # hex only compresses to about half its size, so the body never balloons when the server decompresses it
+        self.content = json.dumps(os.urandom(4 * 1024 * 1024).hex()).encode("utf-8")
+        self.filepath = os.path.join(self.tmp_dir.name, "bulk.json")
+
+        with open(self.filepath, "wb") as fhandle:
+            fhandle.write(self.content)
+
+    def _upload(self, request_encoding):
+        tracemalloc.start()
+
+        try:
+            body, _, status_code = RequestRunner().run_request("POST", self.url, "application/json", authenticate=False, body_file=self.filepath,
+                                                               request_encoding=request_encoding)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(status_code, 200)
+        self.assertEqual(body["sha256"], hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(body["content_type"], "application/json")
+        # only a few chunks of the file are ever held in memory, however large it is
+        self.assertLess(peak, 2 * 1024 * 1024)
+        return body
+
+    def test_valid_1(self):
+        "the file is streamed as the body with its size as the Content-Length"
+        body = self._upload("")
+
+        self.assertFalse(body["chunked"])
+        self.assertEqual(body["wire_bytes"], len(self.content))
+
+    def test_valid_2(self):
+        "the file is compressed as it is streamed, with chunked transfer-encoding"
+        body = self._upload("gzip")
+
+        self.assertTrue(body["chunked"])
+        self.assertLess(body["wire_bytes"], len(self.content) * 0.6)
+
+    def test_valid_3(self):
+        "an in-memory body is compressed with the request encoding"
+        body, _, _ = RequestRunner().run_request("POST", self.url, "application/json", {"key": "value"}, authenticate=False, request_encoding="deflate")
+
+        self.assertEqual(body["sha256"], hashlib.sha256(json.dumps({"key": "value"}).encode("utf-8")).hexdigest())
+
+    def test_valid_4(self):
+        "an in-memory body encoded to text is sent as UTF-8 when compressed"
+        with mock.patch.object(RequestRunner, "_encode_data_to_json", return_value='{"key": "välue"}'):
+            body, _, _ = RequestRunner().run_request("POST", self.url, "application/json", {"key": "välue"}, authenticate=False, request_encoding="gzip")
+
+        self.assertEqual(body["sha256"], hashlib.sha256('{"key": "välue"}'.encode("utf-8")).hexdigest())
+
+    def test_invalid_1(self):
+        "the body file does not exist, both a body and a body file are given, or the request encoding is not supported"
+        with self.assertRaisesRegex(ValueError, "Body File Not Found"):
+            RequestRunner().run_request("POST", self.url, "application/json", authenticate=False, body_file=self.filepath + ".missing")
+
+        with self.assertRaises(ValueError):
+            RequestRunner().run_request("POST", self.url, "application/json", {"a": 1}, authenticate=False, body_file=self.filepath)
+
+        with self.assertRaises(ValueError):
+            RequestRunner().run_request("POST", self.url, "application/json", authenticate=False, body_file=self.filepath, request_encoding="br")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,97 @@
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from unittest import main, mock, TestCase
+
+from generic_api.request_timing import RequestTimings, timing_scope, _record
+from generic_api.session_pool import SessionPool
+
+
+class _Handler(BaseHTTPRequestHandler):
+    "responds to every GET with a small body, keeping the connection alive"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+class TestRequestTimings(TestCase):
+    "test class for RequestTimings"
+
+    def test_valid_1(self):
+        "succesfully add durations to phases and read them back in ms"
+        timings = RequestTimings()
+        timings.add("dns", 1_000_000)
+        timings.add("dns", 500_000)
+        timings.add("tls", 2_000_000)
+
+        self.assertEqual(timings.get_ms("dns"), 1.5)
+        self.assertEqual(timings.get_ms("connect"), 0)
+        self.assertEqual(timings.connection_ns(), 3_500_000)
+        self.assertEqual(set(timings.as_dict()), set(RequestTimings.PHASES))
+
+    def test_invalid_1(self):
+        "unknown phase given"
+        with self.assertRaises(ValueError):
+            RequestTimings().add("unknown", 1)
+
+        with self.assertRaises(ValueError):
+            RequestTimings().get_ms("unknown")
+
+
+class TestTimingScope(TestCase):
+    "test class for the method 'timing_scope'"
+
+    def test_valid_1(self):
+        "phases are only recorded whilst inside the scope"
+        timings = RequestTimings()
+
+        with timing_scope(timings):
+            _record("connect", 10)
+
+        _record("connect", 10)
+
+        self.assertEqual(timings.durations_ns["connect"], 10)
+
+
+class TestTimedConnections(TestCase):
+    "test class for the timed connection classes, using a local HTTP server"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(("127.0.0.1", 0), _Handler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_valid_1(self):
+        "a new connection records the dns and connect phases, a re-used connection does not"
+        pool = SessionPool()
+        first, second = RequestTimings(), RequestTimings()
+
+        with timing_scope(first):
+            pool.get_session(self.url).get(self.url).content
+
+        with timing_scope(second):
+            pool.get_session(self.url).get(self.url).content
+
+        pool.close()
+
+        self.assertGreater(first.durations_ns["dns"], 0)
+        self.assertGreater(first.durations_ns["connect"], 0)
+        self.assertEqual(first.durations_ns["tls"], 0)
+        self.assertEqual(second.connection_ns(), 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+from unittest import main, mock, TestCase
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import json
+import threading
+
+from generic_api.session_pool import SessionPool
+
+
+class _CookieHandler(BaseHTTPRequestHandler):
+    "sets a session cookie on '/login', and echoes the Cookie header it was sent on every path"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        data = json.dumps({"cookie": self.headers.get("Cookie", "")}).encode("utf-8")
+        self.send_response(200)
+
+        if self.path == "/login":
+            self.send_header("Set-Cookie", "session=abc123; Path=/")
+
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSessionPool(TestCase):
+    "test class for SessionPool"
+
+    def test_valid_get_session_1(self):
+        "the same session is returned for urls sharing a scheme/host/port"
+        pool = SessionPool()
+
+        session = pool.get_session("http://localhost:8080/foo")
+
+        self.assertIs(pool.get_session("HTTP://LOCALHOST:8080/bar?x=1"), session)
+        self.assertEqual(len(pool), 1)
+
+    def test_valid_get_session_2(self):
+        "a different scheme, host or port gets a different session, default ports are filled in"
+        pool = SessionPool()
+
+        session = pool.get_session("http://localhost/foo")
+
+        self.assertIs(pool.get_session("http://localhost:80/foo"), session)
+        self.assertIsNot(pool.get_session("https://localhost/foo"), session)
+        self.assertIsNot(pool.get_session("http://localhost:8080/foo"), session)
+        self.assertIsNot(pool.get_session("http://example.com/foo"), session)
+        self.assertEqual(len(pool), 4)
+
+    def test_valid_get_session_3(self):
+        "the least recently used host is closed once pool_size is exceeded"
+        pool = SessionPool(pool_size=2)
+
+        first = pool.get_session("http://one")
+        second = pool.get_session("http://two")
+        pool.get_session("http://one")
+
+        with mock.patch.object(second, "close") as m_close:
+            pool.get_session("http://three")
+            m_close.assert_called_once()
+
+        self.assertEqual(len(pool), 2)
+        self.assertIs(pool.get_session("http://one"), first)
+
+    def test_valid_get_session_4(self):
+        "the session adapters are limited to max_per_host connections"
+        pool = SessionPool(max_per_host=3)
+
+        adapter = pool.get_session("https://localhost").get_adapter("https://localhost")
+
+        self.assertEqual(adapter._pool_maxsize, 3)
+
+    def test_valid_configure_1(self):
+        "reconfiguring the pool closes the open sessions"
+        pool = SessionPool()
+        pool.get_session("http://localhost")
+
+        pool.configure(5, 5)
+
+        self.assertEqual(len(pool), 0)
+        self.assertEqual(pool.pool_size, 5)
+        self.assertEqual(pool.max_per_host, 5)
+
+    def test_invalid_configure_1(self):
+        "invalid pool limits given"
+        with self.assertRaises(ValueError):
+            SessionPool(pool_size=0)
+
+        with self.assertRaises(ValueError):
+            SessionPool(max_per_host=-1)
+
+    def test_valid_get_session_5(self):
+        "a cookie set by one request is not sent on the next request through the same pooled session"
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _CookieHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        pool = SessionPool()
+        self.addCleanup(pool.close)
+
+        login = pool.get_session(url).get(url + "/login")
+        self.assertIn("session=abc123", login.headers["Set-Cookie"])
+
+        self.assertEqual(pool.get_session(url).get(url + "/other").json(), {"cookie": ""})
+        self.assertEqual(len(pool.get_session(url).cookies), 0)
+
+    def test_invalid_get_session_1(self):
+        "url has no scheme or host"
+        with self.assertRaises(ValueError):
+            SessionPool().get_session("localhost/foo")
+
+
+if __name__ == "__main__":
+    main()
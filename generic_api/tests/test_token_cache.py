@@ -0,0 +1,227 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+from unittest import main, mock, TestCase
+
+from generic_api.token_cache import TokenCache, get_token_expiry
+
+
+def _make_jwt(claims: dict) -> str:
+    "builds an unsigned JWT with the given claims"
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).decode().rstrip("=")
+    return f"header.{payload}.signature"
+
+
+class _Runner():
+    "minimal runner counting its logins"
+
+    def __init__(self, auth_url: str = "http://auth", username: str = "user", token: str = "token", password: str = "pass"):
+        self.auth_url = auth_url
+        self.username = username
+        self.password = password
+        self.token = token
+        self.logins = 0
+
+    def authenticate(self) -> str:
+        self.logins += 1
+        return self.token
+
+
+class TestGetTokenExpiry(TestCase):
+    "test class for the method 'get_token_expiry'"
+
+    def test_valid_1(self):
+        "succesfully read the expiry of a JWT"
+        self.assertEqual(get_token_expiry(_make_jwt({"exp": 1234})), 1234)
+
+    def test_valid_2(self):
+        "token is not a JWT, or has no expiry"
+        self.assertIsNone(get_token_expiry("opaque-token"))
+        self.assertIsNone(get_token_expiry(_make_jwt({"sub": "user"})))
+        self.assertIsNone(get_token_expiry("not.a.jwt"))
+
+
+class _AsyncRunner():
+    "minimal async runner counting its logins, each login yields to the event loop"
+
+    def __init__(self, auth_url: str = "http://auth", username: str = "user", token: str = "token", password: str = "pass"):
+        self.auth_url = auth_url
+        self.username = username
+        self.password = password
+        self.token = token
+        self.logins = 0
+
+    async def authenticate(self) -> str:
+        self.logins += 1
+        await asyncio.sleep(0.01)
+        return self.token
+
+
+class TestTokenCache(TestCase):
+    "test class for TokenCache"
+
+    def test_valid_get_token_1(self):
+        "the token is cached per runner class, auth url, username and password"
+        cache = TokenCache()
+        runner = _Runner()
+
+        self.assertEqual(cache.get_token(runner), "token")
+        self.assertEqual(cache.get_token(runner), "token")
+        self.assertEqual(cache.get_token(_Runner()), "token")
+        self.assertEqual(runner.logins, 1)
+
+        other_user = _Runner(username="other")
+        cache.get_token(other_user)
+
+        self.assertEqual(other_user.logins, 1)
+        self.assertEqual(len(cache), 2)
+
+    def test_valid_get_token_2(self):
+        "a token past its TTL is refreshed"
+        cache = TokenCache(ttl=10, refresh_margin=0)
+        runner = _Runner()
+
+        with mock.patch("generic_api.token_cache.time.monotonic", return_value=100):
+            cache.get_token(runner)
+
+        with mock.patch("generic_api.token_cache.time.monotonic", return_value=109):
+            cache.get_token(runner)
+
+        self.assertEqual(runner.logins, 1)
+
+        with mock.patch("generic_api.token_cache.time.monotonic", return_value=111):
+            cache.get_token(runner)
+
+        self.assertEqual(runner.logins, 2)
+
+    def test_valid_get_token_3(self):
+        "the expiry of a JWT is used rather than the TTL, and it is refreshed within the refresh margin"
+        cache = TokenCache(ttl=1000, refresh_margin=30)
+        runner = _Runner(token=_make_jwt({"exp": time.time() + 60}))
+
+        cache.get_token(runner)
+        cache.get_token(runner)
+        self.assertEqual(runner.logins, 1)
+
+        with mock.patch("generic_api.token_cache.time.monotonic", return_value=time.monotonic() + 35):
+            cache.get_token(runner)
+
+        self.assertEqual(runner.logins, 2)
+
+    def test_valid_get_token_4(self):
+        "concurrent callers of an expired token only trigger a single login"
+        cache = TokenCache()
+        runner = _Runner()
+        started = threading.Event()
+
+        def slow_authenticate() -> str:
+            started.set()
+            time.sleep(0.05)
+            runner.logins += 1
+            return "token"
+
+        runner.authenticate = slow_authenticate  # type: ignore
+        threads = [threading.Thread(target=cache.get_token, args=(runner,)) for _ in range(10)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(runner.logins, 1)
+
+    def test_valid_get_token_5(self):
+        "an empty token is returned but never cached"
+        cache = TokenCache()
+        runner = _Runner(token="")
+
+        self.assertEqual(cache.get_token(runner), "")
+        self.assertEqual(cache.get_token(runner), "")
+        self.assertEqual(runner.logins, 2)
+
+    def test_valid_get_token_6(self):
+        "a runner with a wrong password logs in itself rather than re-using the token of an earlier successful login"
+        cache = TokenCache()
+        runner = _Runner()
+        wrong_password = _Runner(password="wrong", token="")
+
+        self.assertEqual(cache.get_token(runner), "token")
+        self.assertEqual(cache.get_token(wrong_password), "")
+        self.assertEqual(wrong_password.logins, 1)
+        self.assertEqual(cache.get_token(runner), "token")
+        self.assertEqual(runner.logins, 1)
+
+    def test_valid_get_token_7(self):
+        "a token living for less than the refresh margin is re-used for half its lifetime, rather than refreshed at once"
+        cache = TokenCache(ttl=10, refresh_margin=30)
+        runner = _Runner()
+
+        with mock.patch("generic_api.token_cache.time.monotonic", return_value=1000.0):
+            cache.get_token(runner)
+            cache.get_token(runner)
+
+        self.assertEqual(runner.logins, 1)
+
+        with mock.patch("generic_api.token_cache.time.monotonic", return_value=1005.0):
+            cache.get_token(runner)
+
+        self.assertEqual(runner.logins, 2)
+
+    def test_valid_get_token_async_1(self):
+        "concurrent coroutines share a single login, re-used until it is invalidated"
+        cache = TokenCache()
+        runner = _AsyncRunner()
+
+        async def run() -> list:
+            lock = asyncio.Lock()
+            tokens = await asyncio.gather(*[cache.get_token_async(runner, lock) for _ in range(10)])
+            cache.invalidate(runner)
+            return tokens + [await cache.get_token_async(runner, lock)]
+
+        self.assertEqual(asyncio.run(run()), ["token"] * 11)
+        self.assertEqual(runner.logins, 2)
+
+    def test_valid_get_token_async_2(self):
+        "whilst one coroutine refreshes a token due for refresh, the others carry on with the still valid token"
+        cache = TokenCache(ttl=300, refresh_margin=30)
+        runner = _AsyncRunner()
+
+        async def run() -> list:
+            lock = asyncio.Lock()
+
+            await cache.get_token_async(runner, lock)
+            runner.token = "new-token"
+
+            # the event loop keeps time with the same clock, so the token is made due rather than the clock moved
+            for cached in cache._tokens.values():
+                cached.refresh_at = 0.0
+
+            return await asyncio.gather(*[cache.get_token_async(runner, lock) for _ in range(3)])
+
+        self.assertEqual(asyncio.run(run()), ["new-token", "token", "token"])
+        self.assertEqual(runner.logins, 2)
+
+    def test_valid_invalidate_1(self):
+        "an invalidated token is fetched again"
+        cache = TokenCache()
+        runner = _Runner()
+        cache.get_token(runner)
+
+        cache.invalidate(runner)
+        cache.get_token(runner)
+
+        self.assertEqual(runner.logins, 2)
+
+    def test_invalid_configure_1(self):
+        "invalid settings given"
+        with self.assertRaises(ValueError):
+            TokenCache(ttl=0)
+
+        with self.assertRaises(ValueError):
+            TokenCache(refresh_margin=-1)
+
+
+if __name__ == "__main__":
+    main()
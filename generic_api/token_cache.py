@@ -0,0 +1,166 @@
+import base64
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_TOKEN_TTL = 300
+DEFAULT_REFRESH_MARGIN = 30
+# the refresh margin never takes more than this fraction of a token's lifetime, so short-lived tokens are still re-used
+MAX_REFRESH_FRACTION = 0.5
+
+TokenKey = Tuple[type, str, str, str]
+
+
+class _CachedToken():
+    "an auth token and the monotonic times it is due for refresh & expires at"
+
+    def __init__(self, token: str, refresh_at: float, expires_at: float):
+        self.token = token
+        self.refresh_at = refresh_at
+        self.expires_at = expires_at
+
+
+def get_token_expiry(token: str) -> Optional[float]:
+    "returns the 'exp' claim (seconds since the epoch) of a JWT token, or None if the token is not a JWT or has no expiry"
+    parts = token.split(".")
+
+    if len(parts) != 3:
+        return None
+
+    try:
+        payload = parts[1] + "=" * (-len(parts[1]) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return float(claims["exp"])
+    except Exception:
+        return None
+
+
+class TokenCache():
+    """
+    Process-wide cache of auth tokens keyed by (runner class, auth url, username, password digest), shared by every
+        RequestRunner & AsyncRequestRunner, so a runner with other credentials for the same user never re-uses a token it did not log in for.
+    A token expires at the 'exp' claim if it is a JWT, otherwise after the configured TTL. Within 'refresh_margin'
+        seconds of expiry (at most half the token's lifetime) the token is refreshed proactively: one caller logs in
+        again whilst any others carry on with the still valid token. Once a token has expired concurrent callers wait for a single login (single-flight)
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TOKEN_TTL, refresh_margin: float = DEFAULT_REFRESH_MARGIN):
+        self._lock = threading.Lock()
+        self._tokens: Dict[TokenKey, _CachedToken] = {}
+        self._refresh_locks: Dict[TokenKey, threading.Lock] = {}
+        self.ttl = float(DEFAULT_TOKEN_TTL)
+        self.refresh_margin = float(DEFAULT_REFRESH_MARGIN)
+        self.configure(ttl, refresh_margin)
+
+    def configure(self, ttl: float, refresh_margin: float) -> None:
+        "sets the TTL of tokens without an expiry & the proactive refresh margin in seconds, clears any cached tokens"
+        if float(ttl) <= 0 or float(refresh_margin) < 0:
+            raise ValueError(f"Invalid Token Cache Settings; ttl: {ttl}; refresh_margin: {refresh_margin}")
+
+        with self._lock:
+            self.ttl = float(ttl)
+            self.refresh_margin = float(refresh_margin)
+            self._tokens.clear()
+
+    def get_token(self, runner: Any) -> str:
+        "returns a valid auth token for the runner, calling its 'authenticate' method only if the cached token needs refreshing"
+        key = self._key(runner)
+        cached = self._tokens.get(key)
+
+        if cached is not None and time.monotonic() < cached.refresh_at:
+            return cached.token
+
+        refresh_lock = self._refresh_lock(key)
+
+        if cached is not None and time.monotonic() < cached.expires_at:
+            # still valid, so if another caller is already refreshing carry on with the current token
+            if not refresh_lock.acquire(blocking=False):
+                return cached.token
+        else:
+            refresh_lock.acquire()
+
+        try:
+            # another caller may have refreshed the token whilst this one waited
+            cached = self._tokens.get(key)
+
+            if cached is not None and time.monotonic() < cached.refresh_at:
+                return cached.token
+
+            token = runner.authenticate()
+
+            # an empty token is an auth failure, so is never cached
+            if len(token):
+                self._tokens[key] = self._cached_token(token)
+
+            return token
+        finally:
+            refresh_lock.release()
+
+    async def get_token_async(self, runner: Any, refresh_lock: Any) -> str:
+        """
+        coroutine counterpart of 'get_token' for runners whose 'authenticate' is a coroutine, sharing the same tokens.
+            'refresh_lock' is an asyncio.Lock of the caller's event loop, held whilst logging in so waiting never blocks the loop
+        """
+        key = self._key(runner)
+        cached = self._tokens.get(key)
+
+        if cached is not None and time.monotonic() < cached.refresh_at:
+            return cached.token
+
+        # still valid, so if another coroutine is already refreshing carry on with the current token
+        if cached is not None and time.monotonic() < cached.expires_at and refresh_lock.locked():
+            return cached.token
+
+        async with refresh_lock:
+            # another coroutine may have refreshed the token whilst this one waited
+            cached = self._tokens.get(key)
+
+            if cached is not None and time.monotonic() < cached.refresh_at:
+                return cached.token
+
+            token = await runner.authenticate()
+
+            # an empty token is an auth failure, so is never cached
+            if len(token):
+                self._tokens[key] = self._cached_token(token)
+
+            return token
+
+    def invalidate(self, runner: Any) -> None:
+        "removes the cached token of the runner, e.g. after it was rejected"
+        with self._lock:
+            self._tokens.pop(self._key(runner), None)
+
+    def clear(self) -> None:
+        "removes every cached token"
+        with self._lock:
+            self._tokens.clear()
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def _cached_token(self, token: str) -> _CachedToken:
+        "returns the token with the monotonic times it is due for refresh & expires at"
+        now = time.monotonic()
+        expiry = get_token_expiry(token)
+        lifetime = self.ttl if expiry is None else expiry - time.time()
+        margin = min(self.refresh_margin, max(lifetime, 0.0) * MAX_REFRESH_FRACTION)
+        return _CachedToken(token, now + lifetime - margin, now + lifetime)
+
+    def _refresh_lock(self, key: TokenKey) -> threading.Lock:
+        "returns the lock held whilst refreshing the token of the key"
+        with self._lock:
+            if key not in self._refresh_locks:
+                self._refresh_locks[key] = threading.Lock()
+            return self._refresh_locks[key]
+
+    @staticmethod
+    def _key(runner: Any) -> TokenKey:
+        "the password is only held as a digest so it is not kept in the cache in plain text"
+        return type(runner), runner.auth_url, runner.username, hashlib.sha256(runner.password.encode()).hexdigest()
+
+
+# shared by every RequestRunner & AsyncRequestRunner so a login is re-used across requests, scenarios and runner instances
+token_cache = TokenCache()